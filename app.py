@@ -1,18 +1,41 @@
 import streamlit as st
-import yfinance as yf
-import pandas_ta as ta
 import pandas as pd
 import numpy as np
-import json
-import requests  # ★ 用於串接真實 API
-from datetime import datetime, timedelta
+from datetime import datetime
 from dateutil.relativedelta import relativedelta
-import streamlit.components.v1 as components
+from market_data import get_data, with_indicators, INDICATOR_SPECS
+from memcache import memory
+from prefetch import access_stats, prefetcher
+from strategies import STRATEGY_INDICATORS, check_5_strategies
+from backtest import backtest_frame, strategy_names
+from chart_component import kline_chart, chart_frame
+from downsample import bucket_size
+from metrics import metrics
+from profiler import SamplingProfiler, flame_svg, folded, save_profile, top_functions
+from config import CHART_MAX_POINTS, DEBUG_PANEL
+
+# 各階段耗時記入本輪明細 (見 metrics); 除錯面板要求剖析時, 對本輪整頁執行取樣
+metrics.begin_run()
+profiler = SamplingProfiler(root=__file__).start() if st.session_state.pop('profile_next', False) else None
+
+
+def finish_run():
+    """結束本輪: 停止剖析並保存結果、寫出本輪量測。頁面跑到底與每個 st.stop() 前都要呼叫, 否則取樣不會停止,
+    本輪明細也會留在執行緒上混入之後的 fragment 重跑; 重複呼叫 (例如 fragment 重跑中) 不做任何事, 回傳 None"""
+    global profiler
+    if profiler is not None:
+        samples = profiler.stop()
+        label = "_".join(str(v) for v in (metrics.current_run() or {}).get('labels', {}).values()) or "rerun"
+        st.session_state['profile'] = {'counts': samples, 'interval': profiler.interval, 'path': save_profile(samples, label)}
+        profiler = None
+    return metrics.end_run()
 
 # ---------------------------------------------------------
 # 1. 頁面設定與樣式 (日式極簡風)
 # ---------------------------------------------------------
 st.set_page_config(layout="wide", page_title="Futu Desktop Replica (Final)")
+prefetcher.start()  # 背景預熱, 每個程序只啟動一次
+metrics.serve()  # METRICS_PORT 非 0 時提供 Prometheus /metrics, 每個程序只啟動一次
 
 st.markdown("""
 <style>
@@ -90,275 +113,13 @@ with st.sidebar:
     is_tw_stock = ticker.endswith('.TW') or ticker.endswith('.TWO')
 
 # ---------------------------------------------------------
-# 3. 籌碼 API 串接層 (FinMind)
+# 3. 圖表區 (fragment): 區間按鈕、滑桿與 K 線圖
+# 這裡的互動 (按鈕、滑桿、圖表翻頁) 只重跑本函式, 沿用上一次完整執行傳入的資料與訊號,
+# 不重新讀取資料、計算指標與策略。參數即相依: 週期、股票、指標開關改變時才整頁重跑
 # ---------------------------------------------------------
-@st.cache_data(ttl=3600)  
-def get_real_chip_data(ticker, start_date_str):
-    """透過 FinMind API 獲取「外資買賣超」與「融資餘額」資料"""
-    ticker_no = ticker.split('.')[0] 
-    url = "https://api.finmindtrade.com/api/v4/data"
-    
-    # 準備空 DataFrame 以防 API 沒資料
-    df_foreign = pd.DataFrame(columns=['Date', 'foreign_buy'])
-    df_margin_res = pd.DataFrame(columns=['Date', 'margin_diff'])
-
-    # 1. 抓取外資買賣超
-    params_inst = {
-        "dataset": "TaiwanStockInstitutionalInvestorsBuySell",
-        "data_id": ticker_no,
-        "start_date": start_date_str,
-    }
-    try:
-        res = requests.get(url, params=params_inst, timeout=5)
-        data = res.json()
-        if data["msg"] == "success" and len(data["data"]) > 0:
-            df_inst = pd.DataFrame(data["data"])
-            df_f = df_inst[df_inst['name'].str.contains('外資')]
-            df_f = df_f.groupby('date')['buy_sell'].sum().reset_index()
-            df_f.rename(columns={'date': 'Date', 'buy_sell': 'foreign_buy'}, inplace=True)
-            df_f['Date'] = pd.to_datetime(df_f['Date'])
-            df_f['foreign_buy'] = df_f['foreign_buy'] / 1000 # 轉成張
-            df_foreign = df_f
-    except Exception as e:
-        print(f"外資 API Error: {e}")
-
-    # 2. 抓取融資餘額增減 (代表散戶)
-    params_margin = {
-        "dataset": "TaiwanStockMarginPurchaseShortSale",
-        "data_id": ticker_no,
-        "start_date": start_date_str,
-    }
-    try:
-        res2 = requests.get(url, params=params_margin, timeout=5)
-        data2 = res2.json()
-        if data2["msg"] == "success" and len(data2["data"]) > 0:
-            df_m = pd.DataFrame(data2["data"])
-            df_m = df_m[['date', 'MarginPurchaseTodayBalance']]
-            df_m.rename(columns={'date': 'Date'}, inplace=True)
-            df_m['Date'] = pd.to_datetime(df_m['Date'])
-            df_m = df_m.sort_values('Date')
-            # 計算每日融資增減張數
-            df_m['margin_diff'] = df_m['MarginPurchaseTodayBalance'].diff()
-            df_margin_res = df_m[['Date', 'margin_diff']]
-    except Exception as e:
-        print(f"融資 API Error: {e}")
-
-    # 合併外資與融資資料
-    df_chip = pd.merge(df_foreign, df_margin_res, on='Date', how='outer')
-    if not df_chip.empty:
-        df_chip = df_chip.set_index('Date')
-    else:
-        df_chip = pd.DataFrame(columns=['foreign_buy', 'margin_diff'])
-        
-    return df_chip
-
-# ---------------------------------------------------------
-# 4. K線資料層
-# ---------------------------------------------------------
-@st.cache_data(ttl=60)
-def get_data(ticker, period="max", interval="1d"):
-    try:
-        is_quarterly = (interval == "3mo")
-        dl_interval = "1mo" if (interval == "1y" or is_quarterly) else interval
-        
-        data = yf.download(ticker, period=period, interval=dl_interval, progress=False)
-        if data.empty: return None
-        
-        if isinstance(data.columns, pd.MultiIndex): data.columns = data.columns.get_level_values(0)
-        data.index = data.index.tz_localize(None)
-        data.columns = [c.capitalize() for c in data.columns]
-        
-        if interval == "1y":
-            data = data.resample('YE').agg({'Open':'first','High':'max','Low':'min','Close':'last','Volume':'sum'}).dropna()
-        elif is_quarterly:
-            data = data.resample('QE').agg({'Open':'first','High':'max','Low':'min','Close':'last','Volume':'sum'}).dropna()
-
-        data = data.dropna(subset=['Open', 'High', 'Low', 'Close'])
-        data.columns = [str(col).lower() for col in data.columns]
-        close_col = 'close' if 'close' in data.columns else 'adj close'
-        if close_col not in data.columns: return None
-
-        if ticker.endswith('.TW') or ticker.endswith('.TWO'):
-            data['volume'] = data['volume'] / 1000
-
-        # --- 指標計算 ---
-        data['MA5'] = ta.sma(data[close_col], length=5)
-        data['MA10'] = ta.sma(data[close_col], length=10)
-        data['MA20'] = ta.sma(data[close_col], length=20)
-        data['MA60'] = ta.sma(data[close_col], length=60)
-        data['MA120'] = ta.sma(data[close_col], length=120)
-        
-        data['boll_mid'] = data[close_col].rolling(window=20).mean()
-        data['boll_std'] = data[close_col].rolling(window=20).std()
-        data['boll_upper'] = data['boll_mid'] + (2 * data['boll_std'])
-        data['boll_lower'] = data['boll_mid'] - (2 * data['boll_std'])
-        
-        macd = ta.macd(data[close_col], fast=12, slow=26, signal=9)
-        if macd is not None: data = pd.concat([data, macd], axis=1)
-        
-        low_list = data['low'].rolling(9, min_periods=1).min()
-        high_list = data['high'].rolling(9, min_periods=1).max()
-        rsv = (data[close_col] - low_list) / (high_list - low_list) * 100
-        data['k'] = rsv.ewm(alpha=1/3, adjust=False).mean()
-        data['d'] = data['k'].ewm(alpha=1/3, adjust=False).mean()
-        data['j'] = 3 * data['k'] - 2 * data['d']
-
-        data['RSI6'] = ta.rsi(data[close_col], length=6)
-        data['RSI12'] = ta.rsi(data[close_col], length=12)
-        data['RSI24'] = ta.rsi(data[close_col], length=24)
-
-        sma6 = ta.sma(data[close_col], length=6)
-        sma12 = ta.sma(data[close_col], length=12)
-        sma24 = ta.sma(data[close_col], length=24)
-        data['BIAS6'] = (data[close_col] - sma6) / sma6 * 100
-        data['BIAS12'] = (data[close_col] - sma12) / sma12 * 100
-        data['BIAS24'] = (data[close_col] - sma24) / sma24 * 100
-
-        data['OBV'] = ta.obv(data[close_col], data['volume'])
-        data['OBV_MA10'] = ta.sma(data['OBV'], length=10)
-        
-        # --- ★ 真實籌碼資料合併 ---
-        if ticker.endswith('.TW') or ticker.endswith('.TWO'):
-            # 取 K 線圖最舊日期作為 API 抓取起點
-            start_dt_str = data.index.min().strftime('%Y-%m-%d')
-            df_chip = get_real_chip_data(ticker, start_dt_str)
-            
-            # 左合併資料
-            data = data.join(df_chip, how='left')
-            # 填補空值以防程式報錯
-            data['foreign_buy'] = data['foreign_buy'].fillna(0)
-            data['margin_diff'] = data['margin_diff'].fillna(0)
-        else:
-            data['foreign_buy'] = 0
-            data['margin_diff'] = 0
-        # ----------------------------------------
-        
-        data = data.reset_index()
-        data.columns = [str(col).lower() for col in data.columns]
-        
-        date_col = None
-        for name in ['date', 'datetime', 'timestamp', 'index']:
-            if name in data.columns: date_col = name; break
-        if date_col is None:
-            for col in data.columns:
-                if pd.api.types.is_datetime64_any_dtype(data[col]): date_col = col; break
-        if date_col is None: return None
-            
-        data['date_obj'] = pd.to_datetime(data[date_col])
-        data['time'] = data['date_obj'].astype('int64') // 10**9 
-        data = data.sort_values('time')
-        
-        return data
-    except Exception as e:
-        print(f"Data Error: {e}")
-        return None
-
-# --- 五大策略偵測邏輯 ---
-def check_5_strategies(df):
-    if len(df) < 30: return {}
-    curr = df.iloc[-1]
-    prev = df.iloc[-2]
-    results = {}
-    
-    # S1: 帶量突破
-    past_20 = df.iloc[-21:-1]
-    box_high = past_20['high'].max()
-    box_low = past_20['low'].min()
-    amp = (box_high - box_low) / box_low
-    vol_ma5 = df['volume'].iloc[-6:-1].mean()
-    if vol_ma5 == 0: vol_ma5 = 1
-    
-    cond1_box = amp < 0.15
-    cond1_break = curr['close'] > box_high
-    cond1_vol = curr['volume'] > (vol_ma5 * 2)
-    if cond1_box and cond1_break and cond1_vol: results['S1'] = {'active': True, 'msg': '🚀 帶量突破'}
-    elif not cond1_box: results['S1'] = {'active': False, 'msg': '波動過大'}
-    else: results['S1'] = {'active': False, 'msg': '整理中'}
-
-    # S2: 黃金交叉
-    cond2_cross = (prev['ma20'] < prev['ma60']) and (curr['ma20'] > curr['ma60'])
-    cond2_trend = curr['close'] > curr['ma120']
-    if cond2_cross and cond2_trend: results['S2'] = {'active': True, 'msg': '🌟 黃金交叉'}
-    elif curr['ma20'] > curr['ma60']: results['S2'] = {'active': False, 'msg': '多頭排列'}
-    else: results['S2'] = {'active': False, 'msg': '空頭/整理'}
-
-    # S3: 布林擠壓
-    bw = (curr['boll_upper'] - curr['boll_lower']) / curr['boll_mid']
-    cond3_squeeze = bw < 0.10
-    cond3_break = curr['close'] > curr['boll_upper']
-    if cond3_squeeze and cond3_break: results['S3'] = {'active': True, 'msg': '💥 擠壓噴出'}
-    elif cond3_squeeze: results['S3'] = {'active': False, 'msg': '壓縮蓄力'}
-    else: results['S3'] = {'active': False, 'msg': '通道張開'}
-
-    # S4: KD低檔金叉
-    cond4_low = curr['k'] < 20
-    cond4_cross = (prev['k'] < prev['d']) and (curr['k'] > curr['d'])
-    if cond4_low and cond4_cross: results['S4'] = {'active': True, 'msg': '🎣 低檔金叉'}
-    elif curr['k'] < 20: results['S4'] = {'active': False, 'msg': '超賣鈍化'}
-    else: results['S4'] = {'active': False, 'msg': '一般區間'}
-    
-    # S5: 主力籌碼集中 (外資真實買超 + 融資真實減少)
-    if 'margin_diff' in df.columns and 'foreign_buy' in df.columns:
-        cond5_margin = curr['margin_diff'] < 0  # 融資減少代表散戶退場
-        cond5_foreign = curr['foreign_buy'] > 0 # 外資大於零代表大戶進場
-        
-        if cond5_margin and cond5_foreign: 
-            results['S5'] = {'active': True, 'msg': '🔥 籌碼集中'}
-        elif cond5_margin: 
-            results['S5'] = {'active': False, 'msg': '散戶退場'}
-        elif cond5_foreign: 
-            results['S5'] = {'active': False, 'msg': '法人單買'}
-        else: 
-            results['S5'] = {'active': False, 'msg': '籌碼發散'}
-    else:
-        results['S5'] = {'active': False, 'msg': '無籌碼資料'}
-        
-    return results
-
-# ---------------------------------------------------------
-# 5. 前端渲染
-# ---------------------------------------------------------
-col_main, col_tools = st.columns([0.85, 0.15])
-
-with col_tools:
-    st.markdown("#### ⚙️ 指標")
-    st.caption("主圖")
-    show_ma = st.checkbox("MA (SMA)", value=True)
-    show_boll = st.checkbox("BOLL", value=True)
-    st.divider()
-    st.caption("副圖")
-    show_vol = st.checkbox("VOL 成交量", value=True)
-    show_macd = st.checkbox("MACD", value=True)
-    show_kdj = st.checkbox("KDJ", value=True)
-    show_rsi = st.checkbox("RSI", value=True)
-    show_obv = st.checkbox("OBV", value=False)
-    show_bias = st.checkbox("BIAS", value=False)
-
-with col_main:
-    c_top1, c_top2 = st.columns([0.6, 0.4])
-    with c_top1: st.markdown(f"### {ticker} 走勢圖")
-    with c_top2: interval_label = st.radio("週期", ["日K", "週K", "月K", "季K", "年K"], index=0, horizontal=True, label_visibility="collapsed")
-    
-    interval_map = {"日K": "1d", "週K": "1wk", "月K": "1mo", "季K": "3mo", "年K": "1y"}
-    full_df = get_data(ticker, period="max", interval=interval_map[interval_label])
-    
-    if full_df is None:
-        st.error(f"無數據: {ticker}")
-        st.stop()
-    
-    strats = check_5_strategies(full_df)
-    if strats:
-        s1, s2, s3, s4, s5 = strats['S1'], strats['S2'], strats['S3'], strats['S4'], strats['S5']
-        st.markdown(f"""
-        <div class="strategy-grid">
-            <div class="strat-card {'strat-active' if s1['active'] else ''}"><div class="strat-title">1. 盤整帶量突破</div><div class="strat-status { 'status-match' if s1['active'] else 'status-wait' }">{s1['msg']}</div></div>
-            <div class="strat-card {'strat-active' if s2['active'] else ''}"><div class="strat-title">2. 均線黃金交叉</div><div class="strat-status { 'status-match' if s2['active'] else 'status-wait' }">{s2['msg']}</div></div>
-            <div class="strat-card {'strat-active' if s3['active'] else ''}"><div class="strat-title">3. 布林通道擠壓</div><div class="strat-status { 'status-match' if s3['active'] else 'status-wait' }">{s3['msg']}</div></div>
-            <div class="strat-card {'strat-active' if s4['active'] else ''}"><div class="strat-title">4. KD低檔金叉</div><div class="strat-status { 'status-match' if s4['active'] else 'status-wait' }">{s4['msg']}</div></div>
-            <div class="strat-card {'strat-active' if s5['active'] else ''}"><div class="strat-title">5. 主力籌碼集中</div><div class="strat-status { 'status-match' if s5['active'] else 'status-wait' }">{s5['msg']}</div></div>
-        </div>
-        """, unsafe_allow_html=True)
-        
+@st.fragment
+@metrics.stage("chart")
+def chart_panel(full_df, signals, ticker, interval, panes, show_signals):
     min_d, max_d = full_df['date_obj'].min().to_pydatetime(), full_df['date_obj'].max().to_pydatetime()
     
     if 'slider_range' not in st.session_state:
@@ -375,6 +136,7 @@ with col_main:
         if curr_start >= curr_end: curr_start = min_d
         st.session_state['slider_range'] = (curr_start, curr_end)
 
+    # 按鈕以 on_click 設定區間: 回呼在本輪重跑前執行, 按鈕狀態與滑桿一次到位, 不需要再 st.rerun()
     def handle_btn_click(btn_key, months=0, years=0, ytd=False, is_max=False):
         st.session_state['active_btn'] = btn_key
         end = max_d
@@ -398,9 +160,8 @@ with col_main:
     for i, btn in enumerate(buttons):
         with btn_cols[i]:
             is_active = (st.session_state.get('active_btn') == btn['key'])
-            if st.button(btn['label'], key=f"btn_{btn['key']}", type="primary" if is_active else "secondary", use_container_width=True):
-                handle_btn_click(btn['key'], months=btn['m'], years=btn['y'], ytd=btn['ytd'], is_max=btn['max'])
-                st.rerun()
+            st.button(btn['label'], key=f"btn_{btn['key']}", type="primary" if is_active else "secondary", use_container_width=True,
+                      on_click=handle_btn_click, args=(btn['key'],), kwargs=dict(months=btn['m'], years=btn['y'], ytd=btn['ytd'], is_max=btn['max']))
 
     def on_slider_change(): st.session_state['active_btn'] = None
     
@@ -410,353 +171,132 @@ with col_main:
     ed_dt = pd.to_datetime(end_date)
     ed_dt = ed_dt.replace(hour=23, minute=59, second=59)
 
-    df = full_df[(full_df['date_obj'] >= sd_dt) & (full_df['date_obj'] <= ed_dt)]
-    if df.empty: st.stop()
+    # time 已排序: 二分搜尋區間起迄 (換算方式與 time 欄相同), 取得的是切片而非逐列比對後的複本
+    sd_ts, ed_ts = pd.Series([sd_dt, ed_dt]).astype(full_df['date_obj'].dtype).astype('int64') // 10**9
+    times = full_df['time'].to_numpy()
+    df = full_df.iloc[np.searchsorted(times, sd_ts, 'left'):np.searchsorted(times, ed_ts, 'right')]
+    if df.empty:
+        finish_run()
+        st.stop()
 
-    def to_json_list(df, cols):
-        res = []
-        df_clean = df.where(pd.notnull(df), None)
-        for _, row in df_clean.iterrows():
-            try:
-                item = {'time': int(row['time'])}
-                has_data = False
-                for k, v in cols.items():
-                    val = row.get(v)
-                    if k in ['open','high','low','close'] and val is None:
-                        has_data = False; break
-                    item[k] = float(val) if val is not None else None
-                    has_data = True
-                if has_data: res.append(item)
-            except: continue
-        return json.dumps(res)
+    # 長區間降採樣: 每點合併 2 的冪次根 K 棒 (從歷史第一根對齊), 級距不變時圖表元件只需補差異
+    size = bucket_size(len(df), CHART_MAX_POINTS)
+    # 同一 (ticker, 週期, 級距) 的降採樣與編碼結果跨 rerun 快取, 切換區間只做切片
+    frame, view_signals = chart_frame(full_df, (ticker, interval), size, signals)
+    # 固定輸出一行說明, 圖表元件在頁面中的位置不隨降採樣與否改變 (位置改變會重建 iframe)
+    st.caption(f"區間共 {len(df)} 根" + (f", 圖表每點合併 {size} 根 K 棒; 縮短區間可看原始 K 棒" if size > 1 else ""))
 
-    candles_json = to_json_list(df, {'open':'open', 'high':'high', 'low':'low', 'close':'close'})
-    
-    vol_data_list = []
-    if show_vol:
-        for _, row in df.iterrows():
-            try:
-                v = row.get('volume')
-                c = row.get('close')
-                o = row.get('open')
-                if pd.notnull(v) and pd.notnull(c) and pd.notnull(o):
-                    color = '#FF5252' if c >= o else '#00B746'
-                    vol_data_list.append({'time': int(row['time']), 'value': float(v), 'color': color})
-                else:
-                    vol_data_list.append({'time': int(row['time']), 'value': None}) 
-            except: continue
-    vol_json = json.dumps(vol_data_list)
+    # 常駐圖表元件: 只送出與上一輪的差異 (可見區間、指標開關、新 K 棒)
+    kline_chart(frame, source=(ticker, interval, size), panes=panes, visible=(int(df['time'].iloc[0]), int(df['time'].iloc[-1])),
+                signals=view_signals if show_signals else None)
+
+# ---------------------------------------------------------
+# 4. 前端渲染
+# ---------------------------------------------------------
+col_main, col_tools = st.columns([0.85, 0.15])
+
+with col_tools:
+    st.markdown("#### ⚙️ 指標")
+    st.caption("主圖")
+    show_ma = st.checkbox("MA (SMA)", value=True)
+    show_boll = st.checkbox("BOLL", value=True)
+    show_signals = st.checkbox("策略訊號", value=False)
+    st.divider()
+    st.caption("副圖")
+    show_vol = st.checkbox("VOL 成交量", value=True)
+    show_macd = st.checkbox("MACD", value=True)
+    show_kdj = st.checkbox("KDJ", value=True)
+    show_rsi = st.checkbox("RSI", value=True)
+    show_obv = st.checkbox("OBV", value=False)
+    show_bias = st.checkbox("BIAS", value=False)
+
+with col_main:
+    c_top1, c_top2 = st.columns([0.6, 0.4])
+    with c_top1: st.markdown(f"### {ticker} 走勢圖")
+    with c_top2: interval_label = st.radio("週期", ["日K", "週K", "月K", "季K", "年K"], index=0, horizontal=True, label_visibility="collapsed")
     
-    macd_data_list = []
-    if show_macd:
-        for _, row in df.iterrows():
-            try:
-                dif = row.get('macd_12_26_9')
-                dea = row.get('macds_12_26_9')
-                hist = row.get('macdh_12_26_9')
-                item = {'time': int(row['time'])}
-                if pd.notnull(dif) and pd.notnull(dea) and pd.notnull(hist):
-                    item.update({'dif': float(dif), 'dea': float(dea), 'hist': float(hist), 'color': '#FF5252' if hist >= 0 else '#00B746'})
-                else:
-                    item.update({'dif': None, 'dea': None, 'hist': None})
-                macd_data_list.append(item)
-            except: continue
-    macd_json = json.dumps(macd_data_list)
+    interval_map = {"日K": "1d", "週K": "1wk", "月K": "1mo", "季K": "3mo", "年K": "1y"}
+    interval = interval_map[interval_label]
+    metrics.label(ticker=ticker, interval=interval)
+    full_df = get_data(ticker, interval=interval)
     
-    ma_json = to_json_list(df, {'ma5':'ma5', 'ma10':'ma10', 'ma20':'ma20', 'ma60':'ma60'}) if show_ma else "[]"
-    boll_json = to_json_list(df, {'up':'boll_upper', 'mid':'boll_mid', 'low':'boll_lower'}) if show_boll else "[]"
-    kdj_json = to_json_list(df, {'k':'k', 'd':'d', 'j':'j'}) if show_kdj else "[]"
-    rsi_json = to_json_list(df, {'rsi6':'rsi6', 'rsi12':'rsi12', 'rsi24':'rsi24'}) if show_rsi else "[]"
+    if full_df is None:
+        st.error(f"無數據: {ticker}")
+        finish_run()
+        st.stop()
+    # 每個 session 換看一檔時記一次瀏覽, 背景預熱依此挑選熱門 ticker
+    if st.session_state.get('viewed_ticker') != ticker:
+        st.session_state['viewed_ticker'] = ticker
+        access_stats.record(ticker)
     
-    obv_data_list = []
-    if show_obv:
-        for _, row in df.iterrows():
-            item = {'time': int(row['time'])}
-            val = row.get('obv')
-            ma_val = row.get('obv_ma10')
-            if pd.notnull(val): item['obv'] = float(val)
-            else: item['obv'] = None
-            if pd.notnull(ma_val): item['obv_ma'] = float(ma_val)
-            else: item['obv_ma'] = None
-            obv_data_list.append(item)
-    obv_json = json.dumps(obv_data_list)
+    toggles = {'ma': show_ma, 'boll': show_boll, 'macd': show_macd, 'kdj': show_kdj, 'rsi': show_rsi, 'obv': show_obv, 'bias': show_bias}
+    wanted = STRATEGY_INDICATORS + [spec for name, on in toggles.items() if on for spec in INDICATOR_SPECS[name]]
+    full_df = with_indicators(full_df, ticker, interval, wanted)
     
-    bias_json = to_json_list(df, {'b6':'bias6', 'b12':'bias12', 'b24':'bias24'}) if show_bias else "[]"
-
-    # ---------------------------------------------------------
-    # 6. JavaScript (前端圖表)
-    # ---------------------------------------------------------
-    html_code = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <script src="https://unpkg.com/lightweight-charts@3.8.0/dist/lightweight-charts.standalone.production.js"></script>
-        <style>
-            body {{ margin: 0; padding: 0; background-color: #ffffff; overflow: hidden; font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Arial, sans-serif; }}
-            .sub-chart {{
-                background-color: #FFFFFF;
-                border-bottom: 1px solid #E0E0E0;
-                margin-bottom: 10px;
-            }}
-            .chart-container {{ position: relative; width: 100%; }}
-            .legend {{
-                position: absolute; top: 10px; left: 10px; z-index: 100;
-                font-size: 11px; line-height: 16px; font-weight: 500; pointer-events: none;
-            }}
-            .legend-small {{ font-size: 11.5px; line-height: 16px; }}
-            .legend-row {{ display: flex; gap: 10px; margin-bottom: 2px; }}
-            .legend-label {{ font-weight: bold; color: #333; margin-right: 5px; }}
-            .legend-value {{ font-family: 'Consolas', 'Monaco', monospace; }}
-        </style>
-    </head>
-    <body>
-        <div id="main-chart" class="chart-container" style="height: 450px; border-bottom: 1px solid #E0E0E0; margin-bottom: 10px;">
-            <div id="main-legend" class="legend"></div>
-        </div>
-        <div id="vol-chart" class="chart-container sub-chart" style="height: {'100px' if show_vol else '0px'}; display: {'block' if show_vol else 'none'};">
-            <div id="vol-legend" class="legend legend-small"></div>
-        </div>
-        <div id="macd-chart" class="chart-container sub-chart" style="height: {'150px' if show_macd else '0px'}; display: {'block' if show_macd else 'none'};">
-            <div id="macd-legend" class="legend"></div>
-        </div>
-        <div id="kdj-chart" class="chart-container sub-chart" style="height: {'120px' if show_kdj else '0px'}; display: {'block' if show_kdj else 'none'};">
-            <div id="kdj-legend" class="legend"></div>
-        </div>
-        <div id="rsi-chart" class="chart-container sub-chart" style="height: {'120px' if show_rsi else '0px'}; display: {'block' if show_rsi else 'none'};">
-            <div id="rsi-legend" class="legend"></div>
-        </div>
-        <div id="obv-chart" class="chart-container sub-chart" style="height: {'120px' if show_obv else '0px'}; display: {'block' if show_obv else 'none'};">
-            <div id="obv-legend" class="legend legend-small"></div>
-        </div>
-        <div id="bias-chart" class="chart-container sub-chart" style="height: {'120px' if show_bias else '0px'}; display: {'block' if show_bias else 'none'};">
-            <div id="bias-legend" class="legend"></div>
+    with metrics.stage("strategies"): strats = check_5_strategies(full_df)
+    if strats:
+        s1, s2, s3, s4, s5 = strats['S1'], strats['S2'], strats['S3'], strats['S4'], strats['S5']
+        st.markdown(f"""
+        <div class="strategy-grid">
+            <div class="strat-card {'strat-active' if s1['active'] else ''}"><div class="strat-title">1. 盤整帶量突破</div><div class="strat-status { 'status-match' if s1['active'] else 'status-wait' }">{s1['msg']}</div></div>
+            <div class="strat-card {'strat-active' if s2['active'] else ''}"><div class="strat-title">2. 均線黃金交叉</div><div class="strat-status { 'status-match' if s2['active'] else 'status-wait' }">{s2['msg']}</div></div>
+            <div class="strat-card {'strat-active' if s3['active'] else ''}"><div class="strat-title">3. 布林通道擠壓</div><div class="strat-status { 'status-match' if s3['active'] else 'status-wait' }">{s3['msg']}</div></div>
+            <div class="strat-card {'strat-active' if s4['active'] else ''}"><div class="strat-title">4. KD低檔金叉</div><div class="strat-status { 'status-match' if s4['active'] else 'status-wait' }">{s4['msg']}</div></div>
+            <div class="strat-card {'strat-active' if s5['active'] else ''}"><div class="strat-title">5. 主力籌碼集中</div><div class="strat-status { 'status-match' if s5['active'] else 'status-wait' }">{s5['msg']}</div></div>
         </div>
+        """, unsafe_allow_html=True)
 
-        <script>
-            try {{
-                const candlesData = {candles_json};
-                const maData = {ma_json};
-                const bollData = {boll_json};
-                const volData = {vol_json};
-                const macdData = {macd_json};
-                const kdjData = {kdj_json};
-                const rsiData = {rsi_json};
-                const obvData = {obv_json};
-                const biasData = {bias_json};
-                const isTW = {str(is_tw_stock).lower()};
-
-                if (!candlesData || candlesData.length === 0) throw new Error("No Data");
-
-                const FORCE_WIDTH = 60;
-                const lineOpts = {{ lineWidth: 1, priceLineVisible: false, lastValueVisible: false }};
-                const mainLayout = {{ backgroundColor: '#FFFFFF', textColor: '#333333', fontSize: 13.5 }};
-                
-                const indicatorLayout = {{ backgroundColor: 'transparent', textColor: '#333333', fontSize: 13 }}; 
-                const indicatorLayout125 = {{ backgroundColor: 'transparent', textColor: '#333333', fontSize: 12.5 }};
-                const volObvLayout = {{ backgroundColor: 'transparent', textColor: '#333333', fontSize: 11.5 }};
-                
-                const grid = {{ vertLines: {{ color: '#F0F0F0' }}, horzLines: {{ color: '#F0F0F0' }} }};
-                const crosshair = {{ mode: LightweightCharts.CrosshairMode.Normal }};
-
-                const fmtAxisInt = p => Math.round(p).toString();
-                const fmtAxisBigInt = p => {{
-                    let absVal = Math.abs(p);
-                    if (absVal >= 100000000) return Math.round(p/100000000).toString() + '億';
-                    if (absVal >= 10000) return Math.round(p/10000).toString() + '萬';
-                    return Math.round(p).toString();
-                }};
-
-                const fmtDec2 = p => p.toFixed(2);
-                const fmtDec3 = p => p.toFixed(3);
-                const fmtBigDec3 = p => {{
-                    let absVal = Math.abs(p);
-                    if (absVal >= 100000000) return (p/100000000).toFixed(3) + '億';
-                    if (absVal >= 10000) return (p/10000).toFixed(3) + '萬';
-                    return p.toFixed(3);
-                }};
-
-                const mainChart = LightweightCharts.createChart(document.getElementById('main-chart'), {{
-                    layout: mainLayout, grid: grid, crosshair: crosshair,
-                    timeScale: {{ borderColor: '#E0E0E0', timeVisible: true, rightOffset: 5 }},
-                    localization: {{ priceFormatter: fmtDec2 }}, 
-                    rightPriceScale: {{ 
-                        visible: true, borderColor: '#E0E0E0', minimumWidth: FORCE_WIDTH, scaleMargins: {{ top: 0.1, bottom: 0.1 }},
-                        tickMarkFormatter: fmtDec2 
-                    }}
-                }});
-                
-                const candleSeries = mainChart.addCandlestickSeries({{
-                    upColor: '#FF5252', downColor: '#00B746', borderUpColor: '#FF5252', borderDownColor: '#00B746', wickUpColor: '#FF5252', wickDownColor: '#00B746'
-                }});
-                candleSeries.setData(candlesData);
-
-                if (maData.length > 0) {{
-                    if (maData[0].ma5 !== undefined) {{ mainChart.addLineSeries({{ ...lineOpts, color: '#FFA500' }}).setData(maData.map(d=>({{time:d.time, value:d.ma5}}))); }}
-                    if (maData[0].ma10 !== undefined) {{ mainChart.addLineSeries({{ ...lineOpts, color: '#2196F3' }}).setData(maData.map(d=>({{time:d.time, value:d.ma10}}))); }}
-                    if (maData[0].ma20 !== undefined) {{ mainChart.addLineSeries({{ ...lineOpts, color: '#E040FB' }}).setData(maData.map(d=>({{time:d.time, value:d.ma20}}))); }}
-                    if (maData[0].ma60 !== undefined) {{ mainChart.addLineSeries({{ ...lineOpts, color: '#00E676' }}).setData(maData.map(d=>({{time:d.time, value:d.ma60}}))); }}
-                }}
-                if (bollData.length > 0) {{
-                    mainChart.addLineSeries({{ ...lineOpts, lineWidth: 1.5, color: '#FF4081' }}).setData(bollData.map(d=>({{time:d.time, value:d.mid}})));
-                    mainChart.addLineSeries({{ ...lineOpts, color: '#FFD700' }}).setData(bollData.map(d=>({{time:d.time, value:d.up}})));
-                    mainChart.addLineSeries({{ ...lineOpts, color: '#00E5FF' }}).setData(bollData.map(d=>({{time:d.time, value:d.low}})));
-                }}
-
-                const volChartEl = document.getElementById('vol-chart');
-                let volChart = null, volSeries = null;
-                if (volChartEl.style.display !== 'none') {{
-                    volChart = LightweightCharts.createChart(volChartEl, {{
-                        layout: volObvLayout, grid: grid, crosshair: crosshair,
-                        timeScale: {{ borderColor: '#E0E0E0', timeVisible: true, rightOffset: 5 }},
-                        localization: {{ priceFormatter: fmtBigDec3 }}, 
-                        rightPriceScale: {{ 
-                            borderColor: '#E0E0E0', visible: true, minimumWidth: FORCE_WIDTH, scaleMargins: {{top: 0.2, bottom: 0}},
-                            tickMarkFormatter: fmtAxisBigInt 
-                        }}
-                    }});
-                    volSeries = volChart.addHistogramSeries({{ title: 'VOL', priceLineVisible: false }});
-                    volSeries.setData(volData);
-                }}
-
-                function createSubChart(id, customLayout) {{
-                    const el = document.getElementById(id);
-                    if (el.style.display === 'none') return null;
-                    return LightweightCharts.createChart(el, {{
-                        layout: customLayout,
-                        grid: grid, crosshair: crosshair,
-                        timeScale: {{ borderColor: '#E0E0E0', timeVisible: true, rightOffset: 5 }},
-                        localization: {{ priceFormatter: fmtDec3 }}, 
-                        rightPriceScale: {{ 
-                            borderColor: '#E0E0E0', visible: true, minimumWidth: FORCE_WIDTH, scaleMargins: {{top: 0.1, bottom: 0.1}},
-                            tickMarkFormatter: fmtAxisInt 
-                        }}
-                    }});
-                }}
-
-                const macdChart = createSubChart('macd-chart', indicatorLayout);
-                if (macdChart && macdData.length > 0) {{
-                    macdChart.addLineSeries({{ ...lineOpts, color: '#E6A23C' }}).setData(macdData.map(d=>({{time:d.time, value:d.dif}})));
-                    macdChart.addLineSeries({{ ...lineOpts, color: '#2196F3' }}).setData(macdData.map(d=>({{time:d.time, value:d.dea}})));
-                    macdChart.addHistogramSeries().setData(macdData.map(d=>({{time:d.time, value:d.hist, color:d.color}})));
-                }}
-
-                const kdjChart = createSubChart('kdj-chart', indicatorLayout125);
-                if (kdjChart && kdjData.length > 0) {{
-                    kdjChart.addLineSeries({{ ...lineOpts, color: '#E6A23C' }}).setData(kdjData.map(d=>({{time:d.time, value:d.k}})));
-                    kdjChart.addLineSeries({{ ...lineOpts, color: '#2196F3' }}).setData(kdjData.map(d=>({{time:d.time, value:d.d}})));
-                    kdjChart.addLineSeries({{ ...lineOpts, color: '#E040FB' }}).setData(kdjData.map(d=>({{time:d.time, value:d.j}})));
-                }}
-
-                const rsiChart = createSubChart('rsi-chart', indicatorLayout125);
-                if (rsiChart && rsiData.length > 0) {{
-                    rsiChart.addLineSeries({{ ...lineOpts, color: '#E6A23C' }}).setData(rsiData.map(d=>({{time:d.time, value:d.rsi6}})));
-                    rsiChart.addLineSeries({{ ...lineOpts, color: '#2196F3' }}).setData(rsiData.map(d=>({{time:d.time, value:d.rsi12}})));
-                    rsiChart.addLineSeries({{ ...lineOpts, color: '#E040FB' }}).setData(rsiData.map(d=>({{time:d.time, value:d.rsi24}})));
-                }}
-
-                const biasChart = createSubChart('bias-chart', indicatorLayout);
-                if (biasChart && biasData.length > 0) {{
-                    biasChart.addLineSeries({{ ...lineOpts, color: '#2196F3' }}).setData(biasData.map(d=>({{time:d.time, value:d.b6}})));
-                    biasChart.addLineSeries({{ ...lineOpts, color: '#E6A23C' }}).setData(biasData.map(d=>({{time:d.time, value:d.b12}})));
-                    biasChart.addLineSeries({{ ...lineOpts, color: '#E040FB' }}).setData(biasData.map(d=>({{time:d.time, value:d.b24}})));
-                }}
-
-                const obvChartEl = document.getElementById('obv-chart');
-                let obvChart = null;
-                if (obvChartEl.style.display !== 'none') {{
-                    obvChart = LightweightCharts.createChart(obvChartEl, {{
-                        layout: volObvLayout, grid: grid, crosshair: crosshair,
-                        timeScale: {{ borderColor: '#E0E0E0', timeVisible: true, rightOffset: 5 }},
-                        localization: {{ priceFormatter: fmtBigDec3 }}, 
-                        rightPriceScale: {{ 
-                            borderColor: '#E0E0E0', visible: true, minimumWidth: FORCE_WIDTH, scaleMargins: {{top: 0.1, bottom: 0.1}},
-                            tickMarkFormatter: fmtAxisBigInt 
-                        }}
-                    }});
-                    
-                    if (obvData.length > 0) {{
-                        obvChart.addLineSeries({{ ...lineOpts, color: '#FFD700' }}).setData(obvData.map(d=>({{time:d.time, value:d.obv}})));
-                        obvChart.addLineSeries({{ ...lineOpts, color: '#29B6F6' }}).setData(obvData.map(d=>({{time:d.time, value:d.obv_ma}})));
-                    }}
-                }}
-
-                const allCharts = [mainChart, volChart, macdChart, kdjChart, rsiChart, obvChart, biasChart].filter(c => c !== null);
-                
-                function updateLegends(param) {{
-                    let t;
-                    if (!param || !param.time) {{
-                        if (candlesData.length > 0) t = candlesData[candlesData.length - 1].time;
-                        else return;
-                    }} else {{ t = param.time; }}
-
-                    const mainLegendEl = document.getElementById('main-legend');
-                    if (mainLegendEl && maData.length > 0) {{ const d = maData.find(x => x.time === t); if(d) {{ let h='<div class="legend-row"><span class="legend-label">MA(5,10,20,60)</span>'; if(d.ma5!=null)h+=`<span class="legend-value" style="color:#FFA500">MA5:${{fmtDec3(d.ma5)}}</span> `; if(d.ma10!=null)h+=`<span class="legend-value" style="color:#2196F3">MA10:${{fmtDec3(d.ma10)}}</span> `; if(d.ma20!=null)h+=`<span class="legend-value" style="color:#E040FB">MA20:${{fmtDec3(d.ma20)}}</span> `; if(d.ma60!=null)h+=`<span class="legend-value" style="color:#00E676">MA60:${{fmtDec3(d.ma60)}}</span>`; h+='</div>'; mainLegendEl.innerHTML=h; }} }}
-                    if (mainLegendEl && bollData.length > 0) {{ const d = bollData.find(x => x.time === t); if(d) mainLegendEl.innerHTML += `<div class="legend-row"><span class="legend-label">BOLL(20,2)</span><span class="legend-value" style="color:#FF4081">MID:${{fmtDec3(d.mid)}}</span><span class="legend-value" style="color:#FFD700">UP:${{fmtDec3(d.up)}}</span><span class="legend-value" style="color:#00E5FF">LOW:${{fmtDec3(d.low)}}</span></div>`; }}
-                    
-                    const volLegendEl = document.getElementById('vol-legend');
-                    if (volLegendEl && volData.length > 0) {{
-                        const d = volData.find(x => x.time === t);
-                        if (d && d.value != null) {{
-                            volLegendEl.innerHTML = `<div class="legend-row"><span class="legend-label">VOL</span><span class="legend-value" style="color: ${{d.color}}">VOL: ${{fmtBigDec3(d.value)}}</span></div>`;
-                        }}
-                    }}
-                    
-                    const macdLegendEl = document.getElementById('macd-legend');
-                    if (macdLegendEl && macdData.length > 0) {{ const d = macdData.find(x => x.time === t); if(d && d.dif!=null) macdLegendEl.innerHTML=`<div class="legend-row"><span class="legend-label">MACD(12,26,9)</span><span class="legend-value" style="color:#E6A23C">DIF: ${{fmtDec3(d.dif)}}</span><span class="legend-value" style="color:#2196F3">DEA: ${{fmtDec3(d.dea)}}</span><span class="legend-value" style="color:#E040FB">MACD: ${{fmtDec3(d.hist)}}</span></div>`; }}
-                    
-                    const kdjLegendEl = document.getElementById('kdj-legend');
-                    if (kdjLegendEl && kdjData.length > 0) {{ const d = kdjData.find(x => x.time === t); if(d && d.k!=null) kdjLegendEl.innerHTML=`<div class="legend-row"><span class="legend-label">KDJ(9,3,3)</span><span class="legend-value" style="color:#E6A23C">K: ${{fmtDec3(d.k)}}</span><span class="legend-value" style="color:#2196F3">D: ${{fmtDec3(d.d)}}</span><span class="legend-value" style="color:#E040FB">J: ${{fmtDec3(d.j)}}</span></div>`; }}
-                    
-                    const rsiLegendEl = document.getElementById('rsi-legend');
-                    if (rsiLegendEl && rsiData.length > 0) {{ const d = rsiData.find(x => x.time === t); if(d) rsiLegendEl.innerHTML=`<div class="legend-row"><span class="legend-label">RSI(6,12,24)</span><span class="legend-value" style="color:#E6A23C">RSI6: ${{fmtDec3(d.rsi6)}}</span><span class="legend-value" style="color:#2196F3">RSI12: ${{fmtDec3(d.rsi12)}}</span><span class="legend-value" style="color:#E040FB">RSI24: ${{fmtDec3(d.rsi24)}}</span></div>`; }}
-                    
-                    const obvLegendEl = document.getElementById('obv-legend');
-                    if (obvLegendEl && obvData.length > 0) {{
-                        const d = obvData.find(x => x.time === t);
-                        if (d && d.obv != null) {{
-                            obvLegendEl.innerHTML = `<div class="legend-row"><span class="legend-label">OBV(10)</span><span class="legend-value" style="color: #FFD700">OBV: ${{fmtBigDec3(d.obv)}}</span> <span class="legend-value" style="color: #29B6F6">MA10: ${{fmtBigDec3(d.obv_ma)}}</span></div>`;
-                        }}
-                    }}
-                    
-                    const biasLegendEl = document.getElementById('bias-legend');
-                    if (biasLegendEl && biasData.length > 0) {{
-                        const d = biasData.find(x => x.time === t);
-                        if (d) {{
-                            biasLegendEl.innerHTML = `<div class="legend-row"><span class="legend-label">BIAS(6,12,24)</span><span class="legend-value" style="color: #2196F3">BIAS1: ${{fmtDec3(d.b6)}}</span><span class="legend-value" style="color: #E6A23C">BIAS2: ${{fmtDec3(d.b12)}}</span><span class="legend-value" style="color: #E040FB">BIAS3: ${{fmtDec3(d.b24)}}</span></div>`;
-                        }}
-                    }}
-                }}
-
-                allCharts.forEach(c => {{
-                    c.priceScale('right').applyOptions({{ minimumWidth: FORCE_WIDTH }});
-                    c.subscribeCrosshairMove(updateLegends);
-                    c.timeScale().subscribeVisibleLogicalRangeChange(range => {{
-                        if (range) allCharts.forEach(other => {{ if (other !== c) other.timeScale().setVisibleLogicalRange(range); }});
-                    }});
-                }});
-                
-                updateLegends(null); 
-
-                window.addEventListener('resize', () => {{
-                    allCharts.forEach(c => c.resize(document.body.clientWidth, c.options().height));
-                }});
-
-            }} catch (e) {{
-                document.body.innerHTML = '<div style="color:red; padding:20px;">Chart Error: ' + e.message + '</div>';
-            }}
-        </script>
-    </body>
-    </html>
-    """
-    
-    total_height = 460
-    if show_vol: total_height += 100
-    if show_macd: total_height += 150
-    if show_kdj: total_height += 120
-    if show_rsi: total_height += 120
-    if show_obv: total_height += 120
-    if show_bias: total_height += 120
-    
-    total_height += 50
+    # 歷史回測: 每根 K 棒的五大策略條件一次算完, 同時供圖上訊號標記使用
+    with metrics.stage("backtest"): bt_stats, signals = backtest_frame(full_df)
+    with st.expander("📊 策略歷史回測"):
+        table = bt_stats.assign(strategy=strategy_names(bt_stats)).drop(columns='tickers')
+        for col in ('avg_return', 'hit_rate', 'avg_drawdown', 'max_drawdown'): table[col] = table[col] * 100
+        st.dataframe(table, hide_index=True, width="stretch", column_config={
+            "strategy": "策略", "horizon": st.column_config.NumberColumn("持有K棒"), "signals": "訊號數", "trades": "已完成",
+            "avg_return": st.column_config.NumberColumn("平均報酬", format="%.2f%%"),
+            "hit_rate": st.column_config.NumberColumn("勝率", format="%.1f%%"),
+            "avg_drawdown": st.column_config.NumberColumn("平均回撤", format="%.2f%%"),
+            "max_drawdown": st.column_config.NumberColumn("最大回撤", format="%.2f%%"),
+        })
+
+    panes = [name for name, on in (('ma', show_ma), ('boll', show_boll), ('vol', show_vol), ('macd', show_macd),
+                                   ('kdj', show_kdj), ('rsi', show_rsi), ('obv', show_obv), ('bias', show_bias)) if on]
+    chart_panel(full_df, signals, ticker, interval, panes, show_signals)
+
+# 記憶體快取狀態 (全程序共用, 見 memcache)
+cache = memory.stats()
+hits, misses, evictions = (sum(s[f] for s in cache['namespaces'].values()) for f in ('hits', 'misses', 'evictions'))
+st.sidebar.caption(f"快取 {cache['bytes'] / 2**20:.0f} / {cache['budget'] / 2**20:.0f} MB · {cache['entries']} 項 · "
+                   f"命中率 {hits / max(hits + misses, 1):.0%} · 淘汰 {evictions}")
 
-    components.html(html_code, height=total_height)
+# ---------------------------------------------------------
+# 5. 除錯面板 (DEBUG_PANEL 或網址加 ?debug=1): 本輪各階段耗時、全程序累計與單次 rerun 的取樣剖析
+# 圖表區的 fragment 重跑不經過這裡, 其耗時只計入累計值
+# ---------------------------------------------------------
+run = finish_run()
+
+if DEBUG_PANEL or st.query_params.get("debug") == "1":
+    with st.expander("🛠 效能除錯", expanded=True):
+        st.caption(f"本輪整頁執行 {run['total'] * 1e3:.0f} ms · " + " · ".join(f"{k} {v:,}" for k, v in sorted(run['counters'].items())))
+        c_run, c_all = st.columns(2)
+        with c_run:
+            st.markdown("**本輪各階段**")
+            st.dataframe(pd.DataFrame([{'階段': "　" * d + name, '開始 ms': t * 1e3, '耗時 ms': s * 1e3} for name, t, s, d in run['stages']]),
+                         hide_index=True, width="stretch", column_config={c: st.column_config.NumberColumn(c, format="%.1f") for c in ('開始 ms', '耗時 ms')})
+        with c_all:
+            st.markdown("**程序累計**")
+            snap = metrics.snapshot()
+            st.dataframe(pd.DataFrame([{'階段': name, '次數': s['count'], '平均 ms': s['total'] / s['count'] * 1e3, '最大 ms': s['max'] * 1e3}
+                                       for name, s in sorted(snap['stages'].items())]),
+                         hide_index=True, width="stretch", column_config={c: st.column_config.NumberColumn(c, format="%.1f") for c in ('平均 ms', '最大 ms')})
+
+        # 按下後的這次整頁重跑即被剖析 (on_click 在重跑前設定旗標)
+        st.button("🔥 剖析一次重跑", key="btn_profile", on_click=lambda: st.session_state.update(profile_next=True))
+        prof = st.session_state.get('profile')
+        if prof and prof['counts']:
+            counts = prof['counts']
+            st.caption(f"最近一次剖析: {sum(counts.values())} 個樣本, 每 {prof['interval'] * 1e3:g} ms 一次"
+                       + (f" · 已存到 {prof['path']}" if prof['path'] else ""))
+            st.html(flame_svg(counts, interval=prof['interval']))
+            st.dataframe(pd.DataFrame(top_functions(counts), columns=['函式', '自身樣本', '含子呼叫樣本']), hide_index=True, width="stretch")
+            st.download_button("下載 folded stacks (flamegraph.pl / speedscope)", folded(counts), file_name="rerun.folded")
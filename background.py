@@ -0,0 +1,21 @@
+import threading
+
+# ---------------------------------------------------------
+# 背景重新整理 (stale-while-revalidate): 過期資料先回傳給呼叫端,
+# 補抓交給背景執行緒; 以每個資料鍵既有的同步鎖保證同一份資料同時只有一個補抓在進行
+# ---------------------------------------------------------
+def revalidate(lock, fn, name):
+    """lock 未被占用時取得它並在背景執行 fn, 結束後釋放; 已被占用 (同一份資料正在同步) 則不重複觸發。
+    回傳是否啟動了新的背景補抓"""
+    if not lock.acquire(blocking=False): return False
+
+    def run():
+        try:
+            fn()
+        except Exception as e:
+            print(f"Refresh Error ({name}): {e}")
+        finally:
+            lock.release()
+
+    threading.Thread(target=run, name=f"refresh-{name}", daemon=True).start()
+    return True
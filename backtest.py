@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+from strategies import STRATEGY_TITLES, load_panel, panel_conditions, _rolling_extremum
+from chip_store import chips as chip_store, stock_id, to_chip_frame
+from chip_market import market_chips
+
+# ---------------------------------------------------------
+# 五大策略歷史回測: 每根 K 棒的條件一次算成布林陣列, 不逐根迴圈
+# ---------------------------------------------------------
+HORIZONS = (5, 10, 20, 60)  # 持有 K 棒數
+BASELINE = 'ALL'  # 每根有效 K 棒都進場, 作為比較基準
+
+
+def forward_metrics(close, low, h):
+    """以訊號當根收盤進場, 持有 h 根: 回傳 (報酬, 持有期間最大回撤); 超出資料尾端為 NaN"""
+    ret = np.full(close.shape, np.nan)
+    dd = np.full(close.shape, np.nan)
+    if close.shape[1] <= h: return ret, dd
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret[:, :-h] = close[:, h:] / close[:, :-h] - 1
+        # _rolling_extremum 第 t+h 根 = 第 t+1 ~ t+h 根的最低價
+        lowest = _rolling_extremum(low, h, False)
+        dd[:, :-h] = np.minimum(lowest[:, h:] / close[:, :-h] - 1, 0.0)
+    return ret, dd
+
+
+def _accumulate(acc, cond, close, low, horizons):
+    """累加各 (策略, 持有期) 的統計量; 只保留總和/次數/極值, 多批 ticker 可逐批累加。
+    tickers 為納入統計的檔數: S5 只算有籌碼資料的 ticker"""
+    with_chips = int(cond['s5_data'].any(axis=1).sum())
+    for h in horizons:
+        ret, dd = forward_metrics(close, low, h)
+        done = cond['valid'] & ~np.isnan(ret)
+        for s in (BASELINE, *STRATEGY_TITLES):
+            fired = cond['valid'] if s == BASELINE else cond['valid'] & cond[s]
+            sig = fired & done
+            r, d = ret[sig], dd[sig]
+            a = acc.setdefault((s, h), {'tickers': 0, 'signals': 0, 'trades': 0, 'ret': 0.0, 'hits': 0, 'dd': 0.0, 'worst': np.nan})
+            a['tickers'] += with_chips if s == 'S5' else close.shape[0]
+            a['signals'] += int(fired.sum())
+            a['trades'] += len(r)
+            a['ret'] += float(r.sum())
+            a['hits'] += int((r > 0).sum())
+            a['dd'] += float(d.sum())
+            if len(d): a['worst'] = float(np.fmin(a['worst'], d.min()))
+
+
+def _summary(acc):
+    rows = []
+    for (s, h), a in acc.items():
+        n = a['trades']
+        rows.append({
+            'strategy': s, 'horizon': h, 'tickers': a['tickers'], 'signals': a['signals'], 'trades': n,
+            'avg_return': a['ret'] / n if n else np.nan,
+            'hit_rate': a['hits'] / n if n else np.nan,
+            'avg_drawdown': a['dd'] / n if n else np.nan,
+            'max_drawdown': a['worst'],
+        })
+    cols = ['strategy', 'horizon', 'tickers', 'signals', 'trades', 'avg_return', 'hit_rate', 'avg_drawdown', 'max_drawdown']
+    out = pd.DataFrame(rows, columns=cols).astype({'signals': 'Int64', 'trades': 'Int64'})
+    # 沒有任何 ticker 可判斷 (S5 皆無籌碼資料) 時訊號數留空, 不當成 0 次觸發
+    out.loc[out['tickers'] == 0, ['signals', 'trades']] = pd.NA
+    return out
+
+
+def strategy_names(stats):
+    """統計表 strategy 欄的顯示名稱; 無籌碼資料的 S5 加註"""
+    names = stats['strategy'].map({**STRATEGY_TITLES, BASELINE: '全部 K 棒 (基準)'})
+    return names.where(stats['tickers'] > 0, names + ' (無籌碼資料)')
+
+
+def backtest_frame(df, horizons=HORIZONS):
+    """個股頁用: df 含 close/high/low/volume (與選用的 margin_diff/foreign_buy) 欄。
+    回傳 (統計表, 每根 K 棒 S1~S5 是否觸發的布林 DataFrame)"""
+    arr = lambda c: df[c].to_numpy(dtype=float)[None, :] if c in df.columns else None
+    close, low = arr('close'), arr('low')
+    cond = panel_conditions(close, arr('high'), low, arr('volume'), arr('margin_diff'), arr('foreign_buy'))
+    acc = {}
+    _accumulate(acc, cond, close, low, horizons)
+    signals = pd.DataFrame({s: cond[s][0] & cond['valid'][0] for s in STRATEGY_TITLES}, index=df.index)
+    return _summary(acc), signals
+
+
+def chip_history(tickers, market=None, store=None):
+    """各 ticker 的本地逐日籌碼 {ticker: 以日期為索引的 foreign_buy / margin_diff}, 不連網。
+    全市場倉庫 (python -m chip_market 匯入) 為主, 個股籌碼倉庫 (個股頁同步過的) 補上其餘日期; 兩者皆無的 ticker 不列入"""
+    market = market or market_chips
+    store = store or chip_store
+    rows = market.read(stock_ids=tickers, columns=['foreign_buy', 'margin_diff'])
+    by_id = {sid: df.droplevel('stock_id') for sid, df in rows.groupby(level='stock_id')} if len(rows) else {}
+    out = {}
+    for t in tickers:
+        hist = by_id.get(stock_id(t))
+        local = store.read(t)
+        if local is not None and not local.empty:
+            local = to_chip_frame(local)
+            hist = local if hist is None else hist.combine_first(local)
+        if hist is not None and len(hist): out[t] = hist
+    return out
+
+
+def chip_panel(history, names, dates):
+    """依各 ticker 的 K 棒日期 (load_panel(..., dates=True) 的 'date') 對齊逐日籌碼 -> (margin_diff, foreign_buy) 陣列。
+    有籌碼歷史的 ticker, 沒有當日資料的 K 棒補 0 (與個股頁 merge_chips 相同); 沒有歷史的 ticker 整列 NaN (無籌碼資料)"""
+    margin = np.full(dates.shape, np.nan)
+    foreign = np.full(dates.shape, np.nan)
+    for i, t in enumerate(names):
+        hist = history.get(t)
+        if hist is None: continue
+        ok = ~np.isnat(dates[i])
+        aligned = hist.reindex(pd.DatetimeIndex(dates[i][ok])).fillna(0)
+        margin[i, ok] = aligned['margin_diff'].to_numpy(dtype=float)
+        foreign[i, ok] = aligned['foreign_buy'].to_numpy(dtype=float)
+    return margin, foreign
+
+
+def backtest(tickers, interval="1d", horizons=HORIZONS, source=None, chunk=64, chips=None):
+    """批次回測一批 ticker 的完整歷史 (讀本地倉庫), 以 chunk 檔為一批控制記憶體。
+    S5 以本地逐日籌碼 (chip_history, 可由 chips 傳入) 對齊各 K 棒; 沒有籌碼歷史的 ticker 不列入 S5 統計"""
+    tickers = list(dict.fromkeys(tickers))
+    history = chip_history(tickers) if chips is None else chips
+    acc = {}
+    for i in range(0, len(tickers), chunk):
+        names, panel, _ = load_panel(tickers[i:i + chunk], interval, lookback=None, source=source, dates=True)
+        if not names: continue
+        margin, foreign = chip_panel(history, names, panel['date'])
+        cond = panel_conditions(panel['close'], panel['high'], panel['low'], panel['volume'], margin, foreign)
+        _accumulate(acc, cond, panel['close'], panel['low'], horizons)
+    return _summary(acc)
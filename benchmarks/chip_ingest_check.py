@@ -0,0 +1,71 @@
+"""全市場籌碼批次匯入的離線檢查 (chip_market, 不連網)
+
+    python -m benchmarks.chip_ingest_check [--fixtures benchmarks/fixtures/chip_market]
+
+fixture 目錄與 replay provider 相同版面: {dir}/finmind/*.json 為 RecordingSession 格式的回應,
+{dir}/expected.csv 為應寫出的籌碼 (date, stock_id, foreign_buy, margin_balance, margin_diff)。
+內附的一組為 2024-01-01 ~ 2024-01-08 三檔股票的小型回應: 元旦休市 (空資料)、某日缺法人資料、
+以及 01-08 只有法人回應 (融資請求失敗)。以 ReplaySession 匯入到暫存目錄後檢查:
+    rows        讀回的 Parquet 與 expected.csv 相同
+    partitions  休市日寫入空分區, 失敗的日期不寫分區並列在 failed
+    rerun       再次匯入只重抓最後一個已匯入日與失敗的日期
+任一項失敗時結束碼為 1
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import pandas as pd
+from chip_market import MarketChipStore
+from finmind import FinMindClient, Quota, ReplaySession
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "chip_market")
+START, END = "2024-01-01", "2024-01-08"
+
+
+def replay_client(directory):
+    return FinMindClient(session=ReplaySession(os.path.join(directory, "finmind")), retries=0, quota=Quota(limit=math.inf))
+
+
+def checks(directory):
+    """(名稱, 是否通過, 說明)"""
+    out = []
+    expected = pd.read_csv(os.path.join(directory, "expected.csv"), dtype={'stock_id': str}, parse_dates=['date'])
+    expected = expected.set_index(['date', 'stock_id']).sort_index()
+    with tempfile.TemporaryDirectory() as root:
+        store = MarketChipStore(root, replay_client(directory))
+        first = store.ingest(START, END)
+        got = store.read()
+        try:
+            pd.testing.assert_frame_equal(got, expected, check_dtype=False, check_index_type=False)
+            out.append(('rows', True, f"{len(got)} rows match expected.csv"))
+        except AssertionError as e:
+            out.append(('rows', False, str(e).replace("\n", " ")))
+
+        days = [d.strftime('%Y-%m-%d') for d in store.dates()]
+        holiday = pd.read_parquet(store.path("2024-01-01")) if os.path.exists(store.path("2024-01-01")) else None
+        failed = [d.strftime('%Y-%m-%d') for d in first['failed']]
+        out.append(('partitions', days == ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+                    and holiday is not None and holiday.empty and failed == ["2024-01-08"],
+                    f"partitions {days}, failed {failed}"))
+
+        second = store.ingest(START, END)
+        fetched = [d.strftime('%Y-%m-%d') for d in second['fetched']]
+        out.append(('rerun', fetched == ["2024-01-05"] and second['skipped'] == 4 and list(second['failed']) == list(first['failed']),
+                    f"fetched {fetched}, skipped {second['skipped']}, failed {len(second['failed'])}"))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=FIXTURES)
+    args = parser.parse_args()
+    results = checks(args.fixtures)
+    for name, ok, detail in results:
+        print(f"{'PASS' if ok else 'FAIL'} {name:<12} {detail}")
+    if not all(ok for _, ok, _ in results): sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
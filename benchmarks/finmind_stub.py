@@ -0,0 +1,129 @@
+"""FinMindClient 對本地 stub HTTP 伺服器的行為檢查 (不連網)
+
+    python -m benchmarks.finmind_stub
+
+stub 以 http.server 在 localhost 的隨機 port 上執行, 每個 dataset 依序回應預先排好的 (HTTP 狀態, 內容),
+用完後重複最後一個。檢查項目:
+    retry       503 / 429 之後成功: 重試次數與退避等待
+    give_up     持續 5xx: 重試 retries 次後丟出 FinMindError
+    quota_402   伺服器回報超額: FinMindQuotaError, 不重試, 本地額度標記為用盡且之後的請求不再送出
+    quota_local 本地額度用盡: 不送出請求直接丟出 FinMindQuotaError
+    errors      msg 不是 success、非 JSON 回應: FinMindError
+    get_many    並行抓取時失敗者在原位置回傳 Exception, 其餘照常
+    token       Authorization 標頭
+任一項失敗時結束碼為 1
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from finmind import FinMindClient, FinMindError, FinMindQuotaError, Quota
+
+OK = (200, {"msg": "success", "data": [{"date": "2024-01-02", "value": 1}]})
+
+
+class Stub:
+    """script: dataset -> [(狀態, dict 或原始字串), ...]; requests 記錄收到的 (dataset, Authorization)"""
+
+    def __init__(self, script):
+        self.script = {k: list(v) for k, v in script.items()}
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                dataset = parse_qs(urlparse(self.path).query).get("dataset", [""])[0]
+                with stub._lock:
+                    stub.requests.append((dataset, self.headers.get("Authorization")))
+                    queue = stub.script.get(dataset, [OK])
+                    status, body = queue.pop(0) if len(queue) > 1 else queue[0]
+                raw = (body if isinstance(body, str) else json.dumps(body)).encode()
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v4/data"
+
+    def count(self, dataset):
+        return sum(1 for d, _ in self.requests if d == dataset)
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def client(stub, **kwargs):
+    return FinMindClient(base_url=stub.url, **{'retries': 3, 'backoff': 0.01, 'quota': Quota(limit=100), **kwargs})
+
+
+def raises(exc, fn):
+    try:
+        fn()
+    except exc as e:
+        return e
+    return None
+
+
+def checks():
+    """(名稱, 是否通過, 說明)"""
+    out = []
+    with Stub({'retry': [(503, "busy"), (429, {"msg": "slow down"}), OK], 'down': [(502, "bad gateway")]}) as stub:
+        c = client(stub)
+        t = time.monotonic()
+        data = c.get('retry')
+        out.append(('retry', data == OK[1]['data'] and stub.count('retry') == 3,
+                    f"{stub.count('retry')} requests, {time.monotonic() - t:.3f} s"))
+        e = raises(FinMindError, lambda: c.get('down'))
+        out.append(('give_up', e is not None and stub.count('down') == 4, f"{stub.count('down')} requests: {e}"))
+
+    with Stub({'over': [(402, {"msg": "upper limit"})], 'after': [OK]}) as stub:
+        c = client(stub)
+        e = raises(FinMindQuotaError, lambda: c.get('over'))
+        blocked = c.quota.status()['blocked']
+        later = raises(FinMindQuotaError, lambda: c.get('after'))
+        out.append(('quota_402', e is not None and stub.count('over') == 1 and blocked and later is not None
+                    and stub.count('after') == 0, f"{stub.count('over')} request(s), blocked={blocked}: {e}"))
+
+    with Stub({}) as stub:
+        c = client(stub, quota=Quota(limit=2))
+        c.get('a'), c.get('b')
+        e = raises(FinMindQuotaError, lambda: c.get('c'))
+        out.append(('quota_local', e is not None and len(stub.requests) == 2, f"{len(stub.requests)} requests sent: {e}"))
+
+    with Stub({'bad_msg': [(200, {"msg": "token invalid"})], 'not_json': [(200, "<html>")]}) as stub:
+        c = client(stub)
+        e1 = raises(FinMindError, lambda: c.get('bad_msg'))
+        e2 = raises(FinMindError, lambda: c.get('not_json'))
+        out.append(('errors', e1 is not None and e2 is not None and stub.count('bad_msg') == stub.count('not_json') == 1,
+                    f"{e1}; {e2}"))
+
+    with Stub({'fail': [(400, {"msg": "bad request"})]}) as stub:
+        c = client(stub, token="secret")
+        res = c.get_many([('ok1', {}), ('fail', {}), ('ok2', {})])
+        out.append(('get_many', res[0] == res[2] == OK[1]['data'] and isinstance(res[1], FinMindError),
+                    f"{[type(r).__name__ for r in res]}"))
+        out.append(('token', {a for _, a in stub.requests} == {"Bearer secret"}, f"{sorted({str(a) for _, a in stub.requests})}"))
+    return out
+
+
+def main():
+    results = checks()
+    for name, ok, detail in results:
+        print(f"{'PASS' if ok else 'FAIL'} {name:<12} {detail}")
+    if not all(ok for _, ok, _ in results): sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""app 冷啟動的 import 時間 (每次在全新的 Python 程序中以 -X importtime 量測)
+
+    python -m benchmarks.imports [--repeat 5] [--top 15]
+    python -m benchmarks.imports --save              # 寫入基準線 (與 benchmarks.suite 共用同一個檔案)
+    python -m benchmarks.imports --tolerance 0.25    # 與基準線比對, 變慢超過 25% 時結束碼為 1
+
+匯入的模組取自 app.py 頂層的 import (與 server 啟動新 session 前的匯入相同), 取 repeat 次中最快的一次。
+輸出總時間、累計時間最長的套件, 並檢查 DEFERRED 中的套件沒有在啟動時被匯入 (有則結束碼為 1)
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+from benchmarks.suite import BASELINE, check, load_baseline, save_baseline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 只在第一次用到時才匯入的套件: yfinance (向上游抓 K 線)、requests (FinMind 連網)、pandas_ta (只有指標驗證腳本使用)
+DEFERRED = ('yfinance', 'requests', 'pandas_ta')
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def app_modules(app):
+    """app 頂層 import 的模組名稱 (依出現順序)"""
+    names = []
+    for node in ast.parse(open(app, encoding="utf-8").read()).body:
+        if isinstance(node, ast.Import): names += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0: names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def import_times(modules):
+    """在新程序中匯入 modules; 回傳 [(套件, 自身秒數, 累計秒數, 層數)]"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0: raise SystemExit(f"import failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m: rows.append((m.group(4), int(m.group(1)) / 1e6, int(m.group(2)) / 1e6, len(m.group(3)) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="列出累計時間最長的前幾個套件")
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="把結果寫入基準線")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允許的變慢比例")
+    parser.add_argument("--min-delta", type=float, default=50, help="差距小於此毫秒數不算退步")
+    args = parser.parse_args()
+
+    modules = app_modules(args.app)
+    best = None
+    for _ in range(args.repeat):
+        rows = import_times(modules)
+        total = sum(cum for _, _, cum, depth in rows if depth == 0)
+        if best is None or total < best[0]: best = (total, rows)
+    total, rows = best
+    print(f"cold import of {len(modules)} app modules: {total * 1e3:.0f} ms (best of {args.repeat})")
+    print(f"{'package':<40}{'cumulative':>12}{'self':>10}  (ms)")
+    top = {}
+    for name, own, cum, depth in rows:
+        root = name.split('.')[0]
+        if cum > top.get(root, (0, 0))[0]: top[root] = (cum, own)
+    for name, (cum, own) in sorted(top.items(), key=lambda kv: -kv[1][0])[:args.top]:
+        print(f"{name:<40}{cum * 1e3:>12.1f}{own * 1e3:>10.1f}")
+
+    results = {'cold_import': {'app': total}}
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"baseline saved to {args.baseline}")
+    else:
+        check(results, load_baseline(args.baseline), args.tolerance, args.min_delta / 1e3)
+    eager = sorted({name.split('.')[0] for name, *_ in rows} & set(DEFERRED))
+    if eager:
+        print(f"imported at startup but should be deferred: {', '.join(eager)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
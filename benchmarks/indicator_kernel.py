@@ -0,0 +1,46 @@
+"""融合指標核心 vs 參考實作 (pandas 逐項計算, 與 pandas_ta 組成方式相同) 的速度比較
+
+    python -m benchmarks.indicator_kernel [--repeat 5]
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.synthetic import synthetic_ohlcv
+import indicators
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    backend = "numba" if indicators._ewm_jit is not None else "numpy/pandas"
+    print(f"kernel backend: {backend}")
+    print(f"{'bars':>8} {'reference ms':>13} {'kernel ms':>10} {'speedup':>8} {'max rel err':>12}")
+    for n in args.sizes:
+        data = synthetic_ohlcv(n)
+        arrays = [data[c].to_numpy() for c in ('close', 'high', 'low', 'volume')]
+        out = np.empty((n, len(indicators.COLUMNS)), order='F')
+        indicators.indicator_kernel(*arrays, out=out)  # 預熱 (JIT 編譯)
+
+        t_ref = best_of(lambda: indicators.compute_indicators_reference(data), args.repeat)
+        t_new = best_of(lambda: indicators.indicator_kernel(*arrays, out=out), args.repeat)
+
+        ref = indicators.compute_indicators_reference(data)[0].to_numpy(dtype=float)
+        mask = ~np.isnan(ref)
+        err = np.max(np.abs(out[mask] - ref[mask]) / np.maximum(1.0, np.abs(ref[mask])))
+        print(f"{n:>8} {t_ref * 1e3:>13.2f} {t_new * 1e3:>10.2f} {t_ref / t_new:>7.1f}x {err:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
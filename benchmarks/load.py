@@ -0,0 +1,242 @@
+"""多個 session 同時操作 app 的負載測試 (不連網)
+
+    python -m benchmarks.load [--sessions 8] [--actions 30] [--tickers 6] [--bars 5000] [--fixtures DIR]
+
+每個 session 各自一個 streamlit AppTest, 在同一個程序的不同執行緒中同時執行 app.py
+(與 streamlit server 相同: 各 session 共用模組層級的倉庫與快取), 隨機換股、切換週期、拖動滑桿、點區間按鈕。
+資料來源為 replay provider: 未指定 --fixtures 時以合成 K 線產生 fixture 到暫存目錄;
+指定時使用錄製好的 fixture (DATA_PROVIDER=record 執行 app 即可錄製), ticker 取自其中的日 K。
+滑桿與區間按鈕只重跑圖表 fragment (同瀏覽器行為), 換股與切換週期整頁重跑。
+輸出各動作與全體的 rerun 延遲 p50/p95/p99、每秒 rerun 數、程序的 RSS 峰值與各階段耗時 (metrics)
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTERVAL_LABELS = ["日K", "週K", "月K", "季K", "年K"]
+PRESETS = ['1m', '3m', '6m', '1y', '3y', 'ytd', 'max']
+# 動作 -> 權重 (大致為實際使用比例: 圖表區互動最多, 換股最少)
+ACTIONS = {'ticker': 1, 'interval': 2, 'slider': 4, 'button': 3}
+
+
+def write_fixtures(directory, n_tickers, bars):
+    """合成日 K 寫成 replay fixture (yfinance 欄位格式), 最後一根為今天; 回傳 ticker 清單"""
+    import pandas as pd
+    from benchmarks.synthetic import synthetic_ohlcv
+    start = (pd.Timestamp.today().normalize() - pd.offsets.BDay(bars - 1)).strftime('%Y-%m-%d')
+    tickers = [f"SYN{i}" for i in range(n_tickers)]
+    os.makedirs(os.path.join(directory, "ohlcv", "1d"), exist_ok=True)
+    for i, t in enumerate(tickers):
+        data = synthetic_ohlcv(bars, seed=i, start=start)
+        data.columns = [c.capitalize() for c in data.columns]
+        data.to_parquet(os.path.join(directory, "ohlcv", "1d", f"{t}.parquet"))
+    return tickers
+
+
+def fixture_tickers(directory):
+    d = os.path.join(directory, "ohlcv", "1d")
+    return sorted(f[:-len(".parquet")] for f in os.listdir(d) if f.endswith(".parquet")) if os.path.isdir(d) else []
+
+
+def market_input(ticker):
+    """ticker -> (市場選項, 代碼輸入框內容)"""
+    if ticker.endswith(".TWO"): return "台股(櫃)", ticker[:-4]
+    if ticker.endswith(".TW"): return "台股(市)", ticker[:-3]
+    return "美股", ticker
+
+
+_scope = threading.local()
+
+
+def scoped_reruns():
+    """各執行緒 (session) 送出的 rerun 帶上自己 _scope.ids 中的 fragment id (未設定 = 整頁)"""
+    import streamlit.testing.v1.local_script_runner as lsr
+    from streamlit.runtime.scriptrunner import RerunData
+    lsr.RerunData = lambda **kwargs: RerunData(fragment_id_queue=list(getattr(_scope, 'ids', ())), **kwargs)
+
+
+def keep_globals():
+    """AppTest 假設同一時間只有一個 run: 每次 run 結束把 Runtime._instance 清成 None, 開始時把
+    PagesManager.uses_pages_directory 清成 None 再重新偵測, 並各自建一個 ScriptCache 重新編譯 app.py。
+    同時在其他執行緒跑的 session 會因此找不到 runtime、以另一種頁面模式執行 app (元件 id 改變, 狀態遺失),
+    或同時 ast.parse 而失敗 (Python 3.11 的 parser 非執行緒安全)。
+    改成只接受設定、忽略清除, 並共用一個 ScriptCache, 如同 server 中各 session 共用同一份"""
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    import streamlit.testing.v1.local_script_runner as lsr
+    from streamlit.testing.v1 import app_test
+
+    def ignore_reset(cls, attr):
+        class Meta(type):
+            def __setattr__(self, name, value):
+                if name != attr: return super().__setattr__(name, value)
+                if value is not None: setattr(cls, name, value)
+
+        return Meta(cls.__name__, (cls,), {})
+
+    app_test.Runtime = ignore_reset(Runtime, '_instance')
+    app_test.PagesManager = ignore_reset(PagesManager, 'uses_pages_directory')
+    script_cache = ScriptCache()
+    app_test.ScriptCache = lsr.ScriptCache = lambda: script_cache
+
+
+def slider_move(at, rng):
+    """滑桿拖到目前資料範圍內的隨機區間"""
+    s = at.slider(key='slider_range')
+    lo, hi = (datetime(1970, 1, 1) + timedelta(microseconds=v) for v in (s.min, s.max))
+    start = lo + (hi - lo) * rng.uniform(0, 0.95)
+    return s.set_value((datetime.combine(start.date(), datetime.min.time()), hi))
+
+
+def merge_fragment(full, partial, root=None):
+    """fragment 重跑後 AppTest 的元件樹只剩該 fragment 的輸出; 疊回上一次的完整樹 (如同瀏覽器中其餘元件維持原狀),
+    之後的換股、切換週期才找得到側欄與其他元件。只含子區塊的區塊往下合併, 含元件的區塊 (fragment 本身) 整個替換"""
+    from streamlit.testing.v1.element_tree import Block
+    root = root or full
+    for k, node in partial.children.items():
+        old = full.children.get(k)
+        if old is not None and isinstance(node, Block) and all(isinstance(c, Block) for c in node.children.values()):
+            merge_fragment(old, node, root)
+        else:
+            full.children[k] = node
+            stack = [node]
+            while stack:
+                n = stack.pop()
+                n.root = root
+                stack.extend(getattr(n, 'children', {}).values())
+    return full
+
+
+class Session(threading.Thread):
+    """一個模擬使用者: 開啟 app 後依權重隨機做 actions 個動作, 每個動作計時一次 rerun"""
+
+    def __init__(self, app, tickers, actions, seed, start):
+        super().__init__(daemon=True)
+        self.app, self.tickers, self.actions = app, tickers, actions
+        self.rng = random.Random(seed)
+        self.start_barrier = start
+        self.times = []  # (動作, 秒)
+        self.error = None
+        self.fragment = None
+
+    def act(self, at, kind):
+        """執行一個動作 (只設定元件值), 回傳 (待執行的 AppTest, 是否只重跑 fragment)"""
+        if kind == 'ticker':
+            mkt, symbol = market_input(self.rng.choice(self.tickers))
+            [r for r in at.radio if r.label == "市場"][0].set_value(mkt)
+            return at.text_input[0].input(symbol), False
+        if kind == 'interval':
+            return [r for r in at.radio if r.label == "週期"][0].set_value(self.rng.choice(INTERVAL_LABELS)), False
+        if kind == 'slider': return slider_move(at, self.rng), True
+        return at.button(key=f"btn_{self.rng.choice(PRESETS)}").click(), True
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+        try:
+            at = AppTest.from_file(self.app, default_timeout=300)
+            # fragment id 含其在版面中的位置, 版面變動 (例如換股後多一則提示) 就會換一個, 舊的仍留在 storage 中;
+            # 瀏覽器只送出目前畫面上那一個, 這裡記下最近一次整頁執行時登記的 id
+            register = at._fragment_storage.register
+
+            def track(key, *args, **kwargs):
+                self.fragment = key
+                return register(key, *args, **kwargs)
+
+            at._fragment_storage.register = track
+            self.start_barrier.wait()
+            t = time.perf_counter()
+            at.run()
+            self.times.append(('open', time.perf_counter() - t))
+            self._check(at)
+            kinds, weights = zip(*ACTIONS.items())
+            # 開啟後先換到 fixture 中的 ticker (app 預設代碼不一定有資料)
+            for kind in ['ticker', *self.rng.choices(kinds, weights, k=self.actions)]:
+                target, fragment = self.act(at, kind)
+                _scope.ids = [self.fragment] if fragment else []
+                full = at._tree
+                t = time.perf_counter()
+                target.run()
+                self.times.append((kind, time.perf_counter() - t))
+                if fragment: at._tree = merge_fragment(full, at._tree)
+                self._check(at)
+        except Exception as e:
+            self.error = e
+            self.start_barrier.abort()
+
+    @staticmethod
+    def _check(at):
+        if at.exception: raise RuntimeError(at.exception[0].message)
+
+
+def percentiles(values):
+    a = np.asarray(values) * 1e3
+    return len(a), *np.percentile(a, [50, 95, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--actions", type=int, default=30, help="每個 session 的動作數 (不含開啟 app)")
+    parser.add_argument("--tickers", type=int, default=6, help="合成 fixture 的 ticker 數")
+    parser.add_argument("--bars", type=int, default=5000, help="合成 fixture 的日 K 根數")
+    parser.add_argument("--fixtures", help="錄製好的 fixture 目錄 (預設產生合成 fixture)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = args.fixtures or os.path.join(tmp, "fixtures")
+        tickers = fixture_tickers(fixtures) if args.fixtures else write_fixtures(fixtures, args.tickers, args.bars)
+        if not tickers: raise SystemExit(f"no OHLCV fixtures in {fixtures}")
+        # 設定須在 app 模組第一次匯入前完成
+        os.environ.update(FUTU_DATA_DIR=os.path.join(tmp, "data"), DATA_PROVIDER="replay", PROVIDER_DIR=fixtures,
+                          PREFETCH_WORKERS="0")
+        scoped_reruns()
+        keep_globals()
+
+        start = threading.Barrier(args.sessions + 1)
+        sessions = [Session(args.app, tickers, args.actions, args.seed * 1000 + i, start) for i in range(args.sessions)]
+        for s in sessions: s.start()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        try:
+            start.wait()
+        except threading.BrokenBarrierError:
+            pass
+        t = time.perf_counter()
+        for s in sessions: s.join()
+        wall = time.perf_counter() - t
+
+    errors = [s.error for s in sessions if s.error is not None]
+    if errors: raise SystemExit(f"{len(errors)} session(s) failed: {errors[0]!r}")
+    times = [x for s in sessions for x in s.times]
+    print(f"{args.sessions} sessions x {args.actions} actions, {len(tickers)} tickers, {wall:.1f} s")
+    print(f"{'action':<10}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for kind in ['open', *ACTIONS, 'all']:
+        values = [dt for k, dt in times if kind in (k, 'all')]
+        if values: print(f"{kind:<10}" + "{:>6}{:>10.1f}{:>10.1f}{:>10.1f}".format(*percentiles(values)))
+    print(f"throughput {len(times) / wall:.1f} reruns/s")
+    # Linux 的 ru_maxrss 單位為 KB (macOS 為 bytes)
+    unit = 1 if sys.platform == "darwin" else 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"peak RSS {peak * unit / 2**20:.0f} MB (before sessions {rss_before * unit / 2**20:.0f} MB)")
+    # 各階段耗時 (app 以 metrics.stage 記錄, 全部 session 累計)
+    from metrics import metrics
+    stages = metrics.snapshot()['stages']
+    print(f"{'stage':<16}{'n':>6}{'mean':>10}{'max':>10}  (ms)")
+    for name, s in sorted(stages.items(), key=lambda kv: -kv[1]['total']):
+        print(f"{name:<16}{s['count']:>6}{s['total'] / s['count'] * 1e3:>10.1f}{s['max'] * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""圖表區互動 (區間按鈕、滑桿) 的 rerun 延遲
+
+    python -m benchmarks.rerun [--bars 8000] [--repeat 5] [--app app.py]
+
+以 streamlit AppTest 執行 app.py, 資料來自合成 K 線 (暫存目錄中的本地倉庫, 不連網)。
+瀏覽器在 fragment 內的互動只重跑該 fragment; AppTest 的互動一律整頁重跑, 這裡在送出時補上
+fragment id 模擬前者。兩種都量: full = 整頁重跑, fragment = 只重跑圖表區 (app 沒有 fragment 時略過)
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TICKER = "2330"  # app 預設代碼 (美股模式), 首次執行即讀到合成資料
+PRESETS = ['1m', '3m', '6m', '1y', '3y', 'ytd', 'max']
+
+
+def seed_store(bars):
+    """合成日 K 寫入本地倉庫; 上游抓取改為空結果, 同步時只讀本地"""
+    import pandas as pd
+    from benchmarks.synthetic import synthetic_ohlcv
+    import ohlcv_store
+    data = synthetic_ohlcv(bars, start=(pd.Timestamp.today().normalize() - pd.offsets.BDay(bars - 1)).strftime('%Y-%m-%d'))
+    ohlcv_store.store.fetch = lambda *args, **kwargs: pd.DataFrame()
+    ohlcv_store.store.write(TICKER, "1d", ohlcv_store.normalize_ohlcv(data))
+    return data.index[0].to_pydatetime(), data.index[-1].to_pydatetime()
+
+
+def scoped_reruns(scope):
+    """讓 AppTest 送出的 rerun 帶上 scope 中的 fragment id (空 list = 整頁)"""
+    import streamlit.testing.v1.local_script_runner as lsr
+    from streamlit.runtime.scriptrunner import RerunData
+    lsr.RerunData = lambda **kwargs: RerunData(fragment_id_queue=list(scope), **kwargs)
+
+
+def interactions(at, lo, hi):
+    """(名稱, 觸發函式): 每個區間按鈕, 以及把滑桿拖到幾個不同區間"""
+    out = [(f"btn {k}", lambda k=k: at.button(key=f"btn_{k}").click()) for k in PRESETS]
+    for frac in (0.5, 0.9, 0.97):
+        start = datetime.combine((lo + (hi - lo) * frac).date(), datetime.min.time())
+        out.append((f"slider {frac:.0%}", lambda s=start: at.slider(key='slider_range').set_value((s, hi))))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=8000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+    os.environ.setdefault("PREFETCH_WORKERS", "0")  # 量測時不啟動背景預熱
+    from streamlit.testing.v1 import AppTest
+    scope = []
+    scoped_reruns(scope)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["FUTU_DATA_DIR"] = tmp  # 倉庫、瀏覽統計都寫到暫存目錄
+        lo, hi = seed_store(args.bars)
+        at = AppTest.from_file(args.app, default_timeout=120)
+        at.run()
+        if at.exception: raise SystemExit(at.exception[0].message)
+        fragments = list(at._fragment_storage._fragments)
+
+        modes = [("full", [])] + ([("fragment", fragments)] if fragments else [])
+        steps = interactions(at, lo, hi)
+        times = {}
+        for mode, ids in modes:
+            scope[:] = ids
+            for _ in range(args.repeat):
+                for name, trigger in steps:
+                    t = time.perf_counter()
+                    trigger().run()
+                    times.setdefault(name, {}).setdefault(mode, []).append(time.perf_counter() - t)
+                    if at.exception: raise SystemExit(at.exception[0].message)
+
+    print(f"{args.bars} bars, median of {args.repeat} (ms)" + ("" if fragments else "; app has no fragment, full reruns only"))
+    print(f"{'interaction':<14}" + "".join(f"{m:>10}" for m, _ in modes))
+    for name, _ in steps:
+        print(f"{name:<14}" + "".join(f"{statistics.median(times[name][m]) * 1e3:>10.1f}" for m, _ in modes))
+
+
+if __name__ == "__main__":
+    main()
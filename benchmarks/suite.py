@@ -0,0 +1,194 @@
+"""資料、策略與序列化熱路徑的微基準, 附基準線比對
+
+    python -m benchmarks.suite [--sizes 1000 10000 100000 1000000] [--repeat 3] [--stages resample indicators ...]
+    python -m benchmarks.suite --save               # 量測並寫入基準線
+    python -m benchmarks.suite --tolerance 0.25     # 與基準線比對, 任一項變慢超過 25% 時結束碼為 1
+
+每個階段以合成 K 線 (benchmarks.synthetic) 在各 K 棒數下取 repeat 次中最快的一次。
+各階段對應 app 的載入與繪圖流程:
+    resample    日 K -> 週 K / 月 K 聚合 (resample.resample_ohlcv)
+    chip_join   K 線左合併籌碼並補 0 (market_data.merge_chips)
+    time_cols   日期欄偵測、date_obj / time 欄與排序 (market_data.with_time_columns)
+    indicators  預設指標全量計算 (IndicatorEngine, 與 app 勾選預設指標相同)
+    strategies  五大策略判斷 (strategies.check_5_strategies)
+    backtest    每根 K 棒的策略訊號與回測統計 (backtest.backtest_frame)
+    downsample  圖表降採樣到 CHART_MAX_POINTS (downsample.downsample_frame)
+    payload     圖表資料的二進位編碼 (chart_payload.ChartFrame, 全部欄位)
+基準線與機器有關 (CPU、numba 是否可用), 只和同一台機器上存的基準線比較; 太短的項目以 --min-delta 過濾雜訊
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import numpy as np
+import pandas as pd
+from benchmarks.indicator_kernel import best_of
+from benchmarks.synthetic import synthetic_ohlcv
+import indicators
+from backtest import backtest_frame
+from chart_component import chart_columns, PANES
+from chart_payload import ChartFrame
+from config import CHART_MAX_POINTS
+from downsample import bucket_size, downsample_frame
+from fileio import atomic_write
+from market_data import INDICATOR_SPECS, merge_chips, with_time_columns
+from ohlcv_store import normalize_ohlcv
+from resample import resample_ohlcv
+from strategies import STRATEGY_INDICATORS, check_5_strategies
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+STAGES = ('resample', 'chip_join', 'time_cols', 'indicators', 'strategies', 'backtest', 'downsample', 'payload')
+# app 預設勾選的指標 + 策略用到的指標
+SPECS = indicators.resolve(STRATEGY_INDICATORS + [s for name in ('ma', 'boll', 'macd', 'kdj', 'rsi') for s in INDICATOR_SPECS[name]])
+
+
+def daily_bars(n):
+    """n 根 K 棒, 與本地倉庫相同格式 (欄位首字大寫、Date index)。
+    從 datetime64[ns] 可表示的最早年份開始; 超過 15 萬根時改為小時 K (交易日 K 會超出可表示的年份範圍)"""
+    data = synthetic_ohlcv(n, start="1680-01-01", freq="B" if n <= 150_000 else "h")
+    return normalize_ohlcv(data)
+
+
+def chip_frame(index, seed=0):
+    """與 index 對齊的合成籌碼, 隨機缺 5% 的日子 (合併後需補 0)"""
+    rng = np.random.default_rng(seed)
+    keep = rng.random(len(index)) > 0.05
+    n = int(keep.sum())
+    return pd.DataFrame({'foreign_buy': rng.normal(0, 500, n), 'margin_diff': rng.normal(0, 200, n)}, index=index[keep])
+
+
+def prepare(n):
+    """各階段的輸入: 倉庫格式日 K、合併前的小寫欄位 K 線與籌碼、加上指標後的完整圖表資料"""
+    daily = daily_bars(n)
+    bars = daily.copy()
+    bars.columns = [c.lower() for c in bars.columns]
+    chips = chip_frame(bars.index)
+    framed = with_time_columns(merge_chips(bars, chips))
+    ind = indicators.IndicatorEngine().update(framed, SPECS, times=framed['time'].to_numpy())
+    ind.columns = [str(c).lower() for c in ind.columns]
+    full = pd.concat([framed, ind], axis=1)
+    return {'daily': daily, 'bars': bars, 'chips': chips, 'framed': framed, 'full': full}
+
+
+def stages(d):
+    """階段名稱 -> 無引數的量測函式"""
+    framed, full = d['framed'], d['full']
+    times = framed['time'].to_numpy()
+    cols = {k: c for k, c in chart_columns(PANES).items() if c in full.columns}
+    lines = list(dict.fromkeys(c for c in cols.values() if c not in ('open', 'high', 'low', 'close', 'volume')))
+    size = bucket_size(len(full), CHART_MAX_POINTS)
+    chart = full[['time', *dict.fromkeys(cols.values())]]
+    return {
+        'resample': lambda: (resample_ohlcv(d['daily'], "1wk"), resample_ohlcv(d['daily'], "1mo")),
+        'chip_join': lambda: merge_chips(d['bars'], d['chips']),
+        'time_cols': lambda: with_time_columns(merge_chips(d['bars'], d['chips'])),
+        'indicators': lambda: indicators.IndicatorEngine().update(framed, SPECS, times=times),
+        'strategies': lambda: check_5_strategies(full),
+        'backtest': lambda: backtest_frame(full),
+        'downsample': lambda: downsample_frame(full, size, lines),
+        'payload': lambda: ChartFrame(chart).payload(cols, 0, len(chart)),
+    }
+
+
+def measure(sizes, names, repeat):
+    """{階段: {K 棒數(字串): 秒}}"""
+    results = {}
+    for n in sizes:
+        runs = stages(prepare(n))
+        for name in names:
+            fn = runs[name]
+            fn()  # 預熱 (JIT 編譯、首次配置)
+            results.setdefault(name, {})[str(n)] = best_of(fn, repeat)
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(),
+            'backend': "numba" if indicators._ewm_jit is not None else "numpy/pandas"}
+
+
+def load_baseline(path):
+    """{'environment': ..., 'results': {項目: {規模: 秒}}}; 檔案不存在時為空的基準線"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'environment': None, 'results': {}}
+
+
+def save_baseline(path, results):
+    """results 合併進基準線檔 (其他項目保留, 例如 benchmarks.imports 的冷啟動時間)"""
+    baseline = load_baseline(path).get('results', {})
+    for name, by_size in results.items(): baseline.setdefault(name, {}).update(by_size)
+    with atomic_write(path) as tmp, open(tmp, "w", encoding="utf-8") as f:
+        json.dump({'environment': environment(), 'results': baseline}, f, indent=1, sort_keys=True)
+
+
+def check(results, saved, tolerance, min_delta):
+    """與 load_baseline() 的結果比對並印出退步項目; 有退步時結束碼為 1"""
+    baseline = saved.get('results', {})
+    if not baseline:
+        print("no baseline yet; run with --save to record one")
+        return
+    if saved.get('environment') != environment():
+        print(f"warning: baseline recorded on a different environment: {saved.get('environment')}")
+    slower = compare(results, baseline, tolerance, min_delta)
+    for name, n, base, now in slower:
+        print(f"REGRESSION {name} @ {n}: {base * 1e3:.2f} -> {now * 1e3:.2f} ms ({now / base:.2f}x)")
+    if slower: sys.exit(1)
+    print(f"no regressions beyond {tolerance:.0%}")
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """回傳 [(階段, K 棒數, 基準秒, 目前秒)]: 慢於基準 (1 + tolerance) 倍且差距超過 min_delta 秒者"""
+    out = []
+    for name, by_size in results.items():
+        for n, now in by_size.items():
+            base = baseline.get(name, {}).get(n)
+            if base is not None and now > base * (1 + tolerance) and now - base > min_delta:
+                out.append((name, n, base, now))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--stages", nargs="+", help="只量這些階段 (預設全部)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="把結果寫入基準線 (與既有基準線合併)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允許的變慢比例")
+    parser.add_argument("--min-delta", type=float, default=0.5, help="差距小於此毫秒數不算退步")
+    args = parser.parse_args()
+
+    names = list(STAGES)
+    if args.stages:
+        unknown = set(args.stages) - set(STAGES)
+        if unknown: parser.error(f"unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+        names = [s for s in STAGES if s in args.stages]
+
+    saved = load_baseline(args.baseline)
+    baseline = saved.get('results', {})
+
+    results = measure(args.sizes, names, args.repeat)
+    print(f"best of {args.repeat} (ms); vs = 目前 / 基準線")
+    print(f"{'stage':<12}" + "".join(f"{n:>18}" for n in args.sizes))
+    for name in names:
+        cells = []
+        for n in args.sizes:
+            now, base = results[name][str(n)], baseline.get(name, {}).get(str(n))
+            cells.append(f"{now * 1e3:>10.2f}" + (f" ({now / base:4.2f}x)" if base else " " * 8))
+        print(f"{name:<12}" + "".join(cells))
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"baseline saved to {args.baseline}")
+        return
+    check(results, saved, args.tolerance, args.min_delta / 1e3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# 合成 K 線 (隨機漫步), 供效能量測使用
+# ---------------------------------------------------------
+def synthetic_ohlcv(n, seed=0, start="1990-01-01", freq="B"):
+    """產生 n 根日 K: index 為日期, 欄位為小寫 open/high/low/close/volume"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    open_ = close * np.exp(rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.01)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.01)
+    volume = rng.integers(1_000, 10_000_000, n).astype(float)
+    index = pd.date_range(start, periods=n, freq=freq, name="Date")
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
@@ -0,0 +1,116 @@
+"""自製指標與 pandas_ta 的數值比對 (pandas_ta 已不是執行期依賴)
+
+    pip install -r requirements-bench.txt && python -m benchmarks.validate_indicators --record   # 與 pandas_ta 比對並寫入 golden 檔
+    python -m benchmarks.validate_indicators [--sizes 5 30 1000 10000] [--tolerance 1e-9]           # 有 pandas_ta 時直接比對
+    python -m benchmarks.validate_indicators                                                        # 沒有 pandas_ta: 改與 golden 檔比對
+
+以合成 K 線 (benchmarks.synthetic) 在各 K 棒數下比較兩組結果與 pandas_ta 原版組成方式
+(indicators.compute_indicators_reference(data, ta=pandas_ta)):
+    reference  同一函式改用 indicators.ReferenceTA 的 sma / ema / rma / obv
+    kernel     app 實際使用的融合核心 (indicators.compute_indicators)
+另以收盤價取到小數一位的資料 (常見平盤, OBV 與RSI 的零變動路徑) 各跑一次。
+NaN 位置須一致, 其餘以 |差| / max(1, |pandas_ta|) 計算相對誤差; 任一欄超過 tolerance 時結束碼為 1。
+
+--record 把 GOLDEN_SIZES 各案例的輸入 K 線與 pandas_ta 結果存到 GOLDEN (附 pandas_ta 版本),
+之後在沒有安裝 pandas_ta 的環境也能以同一組輸入比對 (輸入一併保存, 不依賴亂數產生器跨版本一致)
+"""
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import synthetic_ohlcv
+import indicators
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "indicators", "pandas_ta_golden.npz")
+GOLDEN_SIZES = (5, 30, 500)  # 控制檔案大小; 長序列的累積誤差由有 pandas_ta 時的 --sizes 比對涵蓋
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+def compare(expected, actual):
+    """{欄位: 最大相對誤差}; NaN 位置不一致的欄位為 inf"""
+    out = {}
+    for i, col in enumerate(indicators.COLUMNS):
+        e, a = expected[:, i], actual[:, i]
+        mask = np.isnan(e)
+        if not np.array_equal(mask, np.isnan(a)):
+            out[col] = np.inf
+            continue
+        out[col] = float(np.max(np.abs(a[~mask] - e[~mask]) / np.maximum(1.0, np.abs(e[~mask])), initial=0.0))
+    return out
+
+
+def cases(sizes):
+    """[(名稱, K 棒數, 輸入 K 線)]"""
+    return [(case, n, data) for n in sizes for case, data in (('random', synthetic_ohlcv(n)), ('rounded', synthetic_ohlcv(n).round(1)))]
+
+
+def record(pandas_ta, path):
+    arrays, meta = {}, {'pandas_ta': getattr(pandas_ta, 'version', '?'), 'columns': indicators.COLUMNS, 'cases': []}
+    for case, n, data in cases(GOLDEN_SIZES):
+        name = f"{case}_{n}"
+        arrays[f"{name}__input"] = data[OHLCV].to_numpy(dtype=float)
+        arrays[f"{name}__expected"] = indicators.compute_indicators_reference(data, ta=pandas_ta)[0].to_numpy(dtype=float)
+        meta['cases'].append([case, n])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+    print(f"golden outputs ({len(meta['cases'])} cases, pandas_ta {meta['pandas_ta']}) saved to {path}")
+
+
+def golden(path):
+    """golden 檔 -> (pandas_ta 版本, [(名稱, K 棒數, 輸入 K 線, pandas_ta 結果)])"""
+    with np.load(path) as f:
+        meta = json.loads(str(f['meta']))
+        if meta['columns'] != indicators.COLUMNS: raise SystemExit(f"{path}: 指標欄位已變更, 請在有 pandas_ta 的環境以 --record 重建")
+        out = []
+        for case, n in meta['cases']:
+            data = pd.DataFrame(f[f"{case}_{n}__input"], columns=OHLCV, index=pd.date_range("1990-01-01", periods=n, freq="B", name="Date"))
+            out.append((case, n, data, f[f"{case}_{n}__expected"]))
+    return meta['pandas_ta'], out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 30, 1_000, 10_000])
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--golden", default=GOLDEN)
+    parser.add_argument("--record", action="store_true", help="以 pandas_ta 的結果寫入 golden 檔")
+    args = parser.parse_args()
+    try:
+        import pandas_ta
+    except ImportError:
+        pandas_ta = None
+    if args.record:
+        if pandas_ta is None: raise SystemExit("--record needs pandas_ta (pip install -r requirements-bench.txt)")
+        record(pandas_ta, args.golden)
+
+    if pandas_ta is not None:
+        version = getattr(pandas_ta, 'version', '?')
+        runs = [(case, n, data, indicators.compute_indicators_reference(data, ta=pandas_ta)[0].to_numpy(dtype=float))
+                for case, n, data in cases(args.sizes)]
+        print(f"pandas_ta {version}; max relative error per case (worst column)")
+    elif os.path.exists(args.golden):
+        version, runs = golden(args.golden)
+        print(f"pandas_ta not installed: comparing against {os.path.relpath(args.golden)} (pandas_ta {version}); max relative error per case (worst column)")
+    else:
+        raise SystemExit(f"pandas_ta is not installed and {args.golden} does not exist "
+                         "(pip install -r requirements-bench.txt, then run with --record)")
+
+    failed = False
+    for case, n, data, expected in runs:
+        reference = indicators.compute_indicators_reference(data)[0].to_numpy(dtype=float)
+        kernel = indicators.compute_indicators(data)[0].to_numpy(dtype=float)
+        for name, actual in (('reference', reference), ('kernel', kernel)):
+            errors = compare(expected, actual)
+            worst = max(errors, key=errors.get)
+            bad = {c: e for c, e in errors.items() if e > args.tolerance}
+            failed |= bool(bad)
+            print(f"{n:>8} {case:<8} {name:<10} {errors[worst]:>10.2e} ({worst})"
+                  + (f"  FAIL: {', '.join(f'{c}={e:.2e}' for c, e in bad.items())}" if bad else ""))
+    if failed: sys.exit(1)
+    print(f"all within {args.tolerance:g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import os
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+from chart_payload import ChartFrame, markers
+from downsample import downsample_frame, downsample_signals
+from memcache import memory, compact_frame
+from metrics import metrics
+from config import CACHE_COMPACT
+
+# ---------------------------------------------------------
+# 常駐 K 線圖元件: iframe 與圖表只建立一次, 之後每次 rerun 只送出差異操作 (ops)
+#   reset       整份重送 (資料來源改變、前端要求重同步)
+#   prepend     補上較舊的 K 棒          append   補上較新的 K 棒 (含更新中的最後一根)
+#   addPane     開啟指標 (只送該指標欄位)  removePane 關閉指標
+#   markers     策略訊號標記               range    設定可見區間
+# 前端回傳值:
+#   {"resync": n}              自身狀態與 Python 記錄不符 (例如 iframe 被重建), 下一輪改送 reset
+#   {"page": n, "before": t}   使用者捲動/縮放到已載入資料的左緣, 要求 t 之前的一頁歷史
+# ---------------------------------------------------------
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "kline_chart")
+_component = components.declare_component("kline_chart", path=FRONTEND_DIR)
+
+CANDLE_COLS = {'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close'}
+# 指標面板: 名稱 -> {前端鍵: 欄位}; ma/boll 疊在主圖, 其餘為副圖 (前端依此順序由上而下排列)
+PANES = {
+    'ma': {'ma5': 'ma5', 'ma10': 'ma10', 'ma20': 'ma20', 'ma60': 'ma60'},
+    'boll': {'up': 'boll_upper', 'mid': 'boll_mid', 'low_band': 'boll_lower'},
+    'vol': {'volume': 'volume'},
+    'macd': {'dif': 'macd_12_26_9', 'dea': 'macds_12_26_9', 'hist': 'macdh_12_26_9'},
+    'kdj': {'k': 'k', 'd': 'd', 'j': 'j'},
+    'rsi': {'rsi6': 'rsi6', 'rsi12': 'rsi12', 'rsi24': 'rsi24'},
+    'obv': {'obv': 'obv', 'obv_ma': 'obv_ma10'},
+    'bias': {'b6': 'bias6', 'b12': 'bias12', 'b24': 'bias24'},
+}
+TAIL_ROWS = 2  # 最後幾根可能仍在變動 (盤中 K 棒、降採樣最後一桶), 每輪比對後重送
+MARGIN_BARS = 250  # 可見區間左側多帶的 K 棒數, 小幅向左捲動不必等下一頁
+PAGE_BARS = 500  # 前端捲到左緣時每次補送的 K 棒數
+
+
+def chart_columns(panes):
+    cols = dict(CANDLE_COLS)
+    for p in panes: cols.update(PANES[p])
+    return cols
+
+
+# ---------------------------------------------------------
+# 圖表資料快取: (ticker, 週期, 降採樣級距) -> ChartFrame
+# 降採樣一次算好當時已計算的所有面板指標線, 之後切換區間、關閉指標都只是在同一份資料上切片;
+# 指標依勾選按需計算, 開啟快取中沒有的指標 (例如首次勾選 OBV) 時整份重建。
+# 存在共用記憶體快取 (ChartFrame 會累積已編碼區段, 每次取用重新量測大小)
+# ---------------------------------------------------------
+_frames = memory.view("chart", mutable=True)
+
+
+def _fingerprint(df):
+    """資料版本: 長度、首尾時間、第一根收盤 (除權息/分割還原後整段改寫, 時間不變但它會變) 與最後幾根 OHLCV (指標由這些推得)"""
+    if df.empty: return (0,)
+    # 逐欄取 numpy 尾端: 每輪都會執行, 避免 DataFrame 多欄切片的額外開銷
+    times = df['time'].to_numpy()
+    tail = [df[c].to_numpy(dtype=float)[-TAIL_ROWS:].tobytes() for c in ('open', 'high', 'low', 'close', 'volume') if c in df.columns]
+    return (len(df), int(times[0]), int(times[-1]), history_anchor(df), *tail)
+
+
+def history_anchor(df):
+    """歷史版本標記: 第一根收盤 (與 TimeframeCache 相同); 還原價位移時整段歷史改寫, 首根收盤隨之改變"""
+    return float(df['close'].iat[0]) if len(df) else None
+
+
+@metrics.stage("chart.frame")
+def chart_frame(full_df, source, size, signals=None):
+    """full_df 依 size 降採樣後的 ChartFrame 與對應訊號; 同一 source 資料未變、
+    且 full_df 的圖表欄位都已在上次的結果中時直接取用"""
+    key = (source, size)
+    fp = _fingerprint(full_df)
+    cols = frozenset(c for c in chart_columns(PANES).values() if c in full_df.columns)
+    hit = _frames.get(key)
+    if hit is not None and hit[0] == fp and cols <= hit[3]:
+        metrics.count("chart.frame.hit")
+        return hit[1], hit[2]
+    metrics.count("chart.frame.miss")
+    lines = [c for p in PANES.values() for c in p.values() if c not in ('open', 'high', 'low', 'close', 'volume')]
+    data = downsample_frame(full_df, size, lines)
+    # 精簡格式: 只留圖表用到的欄位, 指標線轉 float32 (前端本來就以 Float32 接收)
+    if CACHE_COMPACT: data = compact_frame(data, ['time', *chart_columns(PANES).values()])
+    frame = ChartFrame(data)
+    sig = downsample_signals(signals, full_df, size) if signals is not None else None
+    _frames[key] = (fp, frame, sig, cols)
+    return frame, sig
+
+
+def _tail(data, hi, cols):
+    rows = data.iloc[max(hi - TAIL_ROWS, 0):hi]
+    return {k: rows[c].to_numpy(dtype=float) if c in rows.columns else np.full(len(rows), np.nan) for k, c in cols.items()}
+
+
+def _first_change(old, new):
+    """尾端區段中第一根有變動的位置 (相對區段起點); 都沒變回傳 None"""
+    keys = old.keys() & new.keys()
+    n = len(new['close'])
+    if len(old['close']) != n: return 0
+    for r in range(n):
+        if any(not np.array_equal(old[k][r:r + 1], new[k][r:r + 1], equal_nan=True) for k in keys): return r
+    return None
+
+
+def _payload_bytes(ops):
+    """ops 中 K 線資料 (base64) 的位元組數, 約為送往前端的主要傳輸量"""
+    return sum(len(op['data']['time']) + sum(len(b) for _, b in op['data']['cols'].values()) for op in ops if 'data' in op)
+
+
+@metrics.stage("chart.render")
+def kline_chart(frame, source, panes, visible, signals=None, key="kline_chart"):
+    """frame: chart_frame() 取得的 ChartFrame (依時間排序、含 time 與各面板欄位); source: 資料識別 (如 ticker, 週期, 降採樣級距), 改變時整份重送;
+    panes: 開啟的 PANES 名稱; visible: 可見區間 (起, 迄) 的 time; signals: 與 data 同索引的策略訊號 (選用)。
+    首次只載入可見區間與左側 MARGIN_BARS 根, 之後區間變寬或前端捲到左緣才補送缺少的 K 棒"""
+    state_key = f"{key}__sent"
+    prev = last = st.session_state.get(state_key)
+    reply = st.session_state.get(key)
+    if not isinstance(reply, dict): reply = {}
+    resync, page = reply.get('resync'), reply.get('page')
+    if prev is not None and resync is not None and resync != prev['resync']: prev = None
+
+    data, times = frame.data, frame.time
+    i0, i1 = frame.index(*visible)
+    i1 = max(i1, i0 + 1)
+    want = max(i0 - MARGIN_BARS, 0)  # 需要載入的左界
+    panes = [p for p in PANES if p in panes]
+    cols = chart_columns(panes)
+
+    ops = []
+    lo = hi = None
+    anchor = history_anchor(data)
+    # 還原價位移會改寫整段歷史但時間不變: 首根收盤不同時視為新資料, 整份重送
+    if prev is not None and prev['source'] == source and prev['anchor'] == anchor:
+        lo = int(np.searchsorted(times, prev['lo'], 'left'))
+        hi = int(np.searchsorted(times, prev['hi'], 'right'))
+        if lo >= len(times) or hi == 0 or times[lo] != prev['lo'] or times[hi - 1] != prev['hi']: lo = hi = None  # 歷史被改寫
+
+    reset = lo is None
+    if reset:
+        lo, hi = want, i1
+        ops.append({'op': 'reset', 'panes': panes, 'data': frame.payload(cols, lo, hi)})
+    else:
+        for p in prev['panes']:
+            if p not in panes: ops.append({'op': 'removePane', 'pane': p})
+        for p in panes:
+            if p not in prev['panes']:
+                ops.append({'op': 'addPane', 'pane': p, 'data': frame.payload(PANES[p], lo, hi)})
+        if page is not None and page != prev['page']:
+            want = min(want, max(int(np.searchsorted(times, reply['before'], 'left')) - PAGE_BARS, 0))
+        if want < lo:
+            ops.append({'op': 'prepend', 'data': frame.payload(cols, want, lo)})
+            lo = want
+        # 最後幾根有變動 (同一 K 棒更新) 時從第一根變動處重送
+        start = hi
+        changed = _first_change(prev['tail'], _tail(data, hi, cols))
+        if changed is not None: start = max(hi - len(prev['tail']['close']) + changed, lo)
+        if i1 > hi or start < hi:
+            hi = max(hi, i1)
+            ops.append({'op': 'append', 'data': frame.payload(cols, start, hi)})
+
+    marks = markers(data.iloc[lo:hi], signals) if signals is not None else []
+    if reset or marks != prev['markers']: ops.append({'op': 'markers', 'markers': marks})
+    view = (int(times[i0]), int(times[i1 - 1]))
+    # 只有區間改變時才設定可見區間; 翻頁與尾端更新不打斷使用者目前的捲動/縮放
+    if reset or view != prev['view']: ops.append({'op': 'range', 'from': view[0], 'to': view[1]})
+
+    # seq 跨 reset 仍遞增, 前端以此判斷是否已套用; base 為這批差異所根據的版本
+    base = prev['seq'] if prev is not None else 0
+    seq = (last['seq'] if last is not None else 0) + 1 if ops else base
+    st.session_state[state_key] = {'seq': seq, 'source': source, 'anchor': anchor, 'lo': int(times[lo]), 'hi': int(times[hi - 1]), 'panes': panes,
+                                   'tail': _tail(data, hi, cols), 'markers': marks, 'view': view, 'resync': resync, 'page': page}
+    metrics.count("chart.ops", len(ops))
+    metrics.count("chart.payload_bytes", _payload_bytes(ops))
+    _component(seq=seq, base=base, ops=ops, first=int(times[0]), key=key, default=None)
@@ -0,0 +1,106 @@
+import base64
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# ---------------------------------------------------------
+# 圖表資料序列化 (以欄為單位整批處理, 不逐列 iterrows)
+# ---------------------------------------------------------
+F32_LIMIT = 1e4  # 絕對值小於此值的欄位以 Float32 傳送 (圖例顯示到小數 3 位仍準確), 否則用 Float64
+
+
+def _values(df, col, keep_float32=False):
+    """取欄位為 float ndarray; 缺欄視為全 NaN。keep_float32 時 float32 欄不升精度 (直接沿用原緩衝區)"""
+    if col not in df.columns: return np.full(len(df), np.nan)
+    s = df[col]
+    return s.to_numpy() if keep_float32 and s.dtype == np.float32 else s.to_numpy(dtype=float)
+
+
+def _typed(arr):
+    """float ndarray -> (型別, little-endian 陣列); 型別相同時不複製"""
+    finite = np.abs(arr[~np.isnan(arr)])
+    kind = 'f4' if finite.size == 0 or finite.max() < F32_LIMIT else 'f8'
+    return kind, arr.astype(f'<{kind}', copy=False)
+
+
+def _b64(arr):
+    return base64.b64encode(arr.tobytes()).decode('ascii')
+
+
+def columnar_payload(df, cols):
+    """cols: {輸出鍵: 欄位}。共用時間軸只送一次 (Float64), 各欄為 little-endian Float32/Float64 的 base64,
+    前端以 TypedArray 直接解碼; NaN 原樣保留, 由前端轉成空白點。
+    回傳 {"time": b64, "cols": {鍵: [型別, b64]}}"""
+    out = {}
+    for key, col in cols.items():
+        kind, arr = _typed(_values(df, col))
+        out[key] = [kind, _b64(arr)]
+    return {'time': _b64(df['time'].to_numpy(dtype='<f8')), 'cols': out}
+
+
+class ChartFrame:
+    """一份時間排序的圖表資料: 各欄整段只轉成 Float32/Float64 一次 (型別依整段決定, 各區段一致),
+    任意 [lo, hi) 區段的 payload 只做切片 + base64, 送過的區段另外快取, 重複的區間切換直接查表"""
+
+    def __init__(self, data, max_segments=32):
+        self.data = data
+        self.time = data['time'].to_numpy()
+        self._time = self.time.astype('<f8')
+        self._cols = {}
+        self._segments = OrderedDict()
+        self._max_segments = max_segments
+        self._lock = threading.Lock()  # 同一份資料可能同時供多個 session 使用
+        self._data_bytes = int(data.memory_usage(index=True, deep=True).sum())
+        self._col_bytes = 0  # 已轉換欄位中不與 data 共用記憶體的部分
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def nbytes(self):
+        """資料、已轉換的欄位與快取區段的位元組數 (供記憶體快取計算預算)"""
+        with self._lock: segments = list(self._segments.values())
+        return (self._data_bytes + self._time.nbytes + self._col_bytes
+                + sum(len(p['time']) + sum(len(b) for _, b in p['cols'].values()) for p in segments))
+
+    def index(self, start, end):
+        """time 介於 [start, end] 的列範圍 [i0, i1) (二分搜尋)"""
+        return int(np.searchsorted(self.time, start, 'left')), int(np.searchsorted(self.time, end, 'right'))
+
+    def column(self, col):
+        # 精簡格式的 float32 欄與編碼結果共用同一塊記憶體
+        hit = self._cols.get(col)
+        if hit is None:
+            src = _values(self.data, col, keep_float32=True)
+            hit = self._cols[col] = _typed(src)
+            if not (col in self.data.columns and np.shares_memory(hit[1], src) and src.dtype == self.data[col].dtype):
+                self._col_bytes += hit[1].nbytes
+        return hit
+
+    def payload(self, cols, lo, hi):
+        """與 columnar_payload(data.iloc[lo:hi], cols) 相同格式"""
+        key = (tuple(cols.items()), lo, hi)
+        with self._lock:
+            hit = self._segments.get(key)
+            if hit is not None:
+                self._segments.move_to_end(key)
+                return hit
+        out = {}
+        for k, col in cols.items():
+            kind, arr = self.column(col)
+            out[k] = [kind, _b64(arr[lo:hi])]
+        hit = {'time': _b64(self._time[lo:hi]), 'cols': out}
+        with self._lock:
+            self._segments[key] = hit
+            if len(self._segments) > self._max_segments: self._segments.popitem(last=False)
+        return hit
+
+
+def markers(df, signals, color='#C24A3B'):
+    """signals: 與 df 同索引的布林 DataFrame (每欄一個策略); 同一根多個訊號合併成一個標記"""
+    names = list(signals.columns)
+    hit = signals.reindex(df.index, fill_value=False).to_numpy(dtype=bool)
+    rows = np.flatnonzero(hit.any(axis=1)) if len(names) else []
+    times = df['time'].to_numpy()
+    return [{'time': int(times[i]), 'position': 'belowBar', 'color': color, 'shape': 'arrowUp',
+             'text': ' '.join(n for n, on in zip(names, hit[i]) if on)} for i in rows]
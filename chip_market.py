@@ -0,0 +1,151 @@
+"""全市場籌碼批次匯入 (依交易日)
+
+    python -m chip_market --start 2024-01-01 --end 2024-12-31
+    python -m chip_market --start 2024-01-02 --end 2024-01-05 --record fixtures/finmind   # 錄製回應
+    python -m chip_market --start 2024-01-02 --end 2024-01-05 --replay fixtures/finmind   # 離線重播
+
+內附一組小型回應 (benchmarks/fixtures/chip_market), python -m benchmarks.chip_ingest_check 以它離線匯入並比對結果
+"""
+import argparse
+import math
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from config import DATA_DIR
+from fileio import atomic_write
+from finmind import FinMindClient, Quota, RecordingSession, ReplaySession, client as finmind_client
+from chip_store import INSTITUTIONAL, MARGIN, stock_id
+
+# ---------------------------------------------------------
+# 全市場籌碼倉庫: 每個交易日一個 Parquet 分區 (date, stock_id 為鍵, 欄式儲存)
+# ---------------------------------------------------------
+COLUMNS = ['date', 'stock_id', 'foreign_buy', 'margin_balance', 'margin_diff']
+SCHEMA = pa.schema([('date', pa.timestamp('ns')), ('stock_id', pa.string()), ('foreign_buy', pa.float64()),
+                    ('margin_balance', pa.float64()), ('margin_diff', pa.float64())])
+
+
+def market_frame(day, inst, margin):
+    """單一交易日全市場原始資料 -> (date, stock_id) 一列的籌碼表"""
+    foreign = pd.Series(dtype=float)
+    if inst:
+        df = pd.DataFrame(inst)
+        df = df[df['name'].str.contains('外資')]
+        foreign = df.groupby(df['stock_id'].astype(str))['buy_sell'].sum() / 1000  # 轉成張
+    bal = diff = pd.Series(dtype=float)
+    if margin:
+        df = pd.DataFrame(margin).drop_duplicates('stock_id', keep='last').set_index('stock_id')
+        df.index = df.index.astype(str)
+        bal = df['MarginPurchaseTodayBalance'].astype(float)
+        # 當日資料自帶前一日餘額, 單一分區即可算出融資增減
+        if 'MarginPurchaseYesterdayBalance' in df.columns: diff = bal - df['MarginPurchaseYesterdayBalance'].astype(float)
+    out = pd.DataFrame({'foreign_buy': foreign, 'margin_balance': bal, 'margin_diff': diff})
+    out.index = out.index.astype(str).rename('stock_id')
+    out = out.reset_index().sort_values('stock_id')
+    out.insert(0, 'date', pd.Timestamp(day))
+    return out[COLUMNS]
+
+
+class MarketChipStore:
+    """{root}/{YYYY}/{YYYY-MM-DD}.parquet; 休市日也寫入空分區, 之後不會重抓"""
+
+    def __init__(self, root=None, client=None):
+        self.root = root or os.path.join(DATA_DIR, "chips_market")
+        self.client = client or finmind_client
+
+    def path(self, day):
+        day = pd.Timestamp(day)
+        return os.path.join(self.root, f"{day.year}", f"{day.strftime('%Y-%m-%d')}.parquet")
+
+    def dates(self):
+        """已匯入的日期 (含休市日的空分區)"""
+        if not os.path.isdir(self.root): return []
+        out = []
+        for year in sorted(os.listdir(self.root)):
+            d = os.path.join(self.root, year)
+            if os.path.isdir(d): out += [pd.Timestamp(f[:-len(".parquet")]) for f in sorted(os.listdir(d)) if f.endswith(".parquet")]
+        return out
+
+    def write(self, day, frame):
+        with atomic_write(self.path(day)) as tmp:
+            pq.write_table(pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False), tmp)
+
+    def ingest(self, start, end, batch=16, refresh_last=True):
+        """匯入 start ~ end 的每個平日; 已有分區的日期略過 (refresh_last 時最後一個已匯入日重抓, 當日資料可能晚到)。
+        每批 batch 天的請求並行送出; 回傳 {'fetched': [...], 'skipped': n, 'failed': {日期: 錯誤}}"""
+        have = set(self.dates())
+        if refresh_last and have: have.discard(max(have))
+        days = [d for d in pd.bdate_range(start, end) if d not in have]
+        result = {'fetched': [], 'skipped': len(pd.bdate_range(start, end)) - len(days), 'failed': {}}
+        for i in range(0, len(days), batch):
+            chunk = days[i:i + batch]
+            queries = []
+            for d in chunk:
+                params = {"start_date": d.strftime('%Y-%m-%d'), "end_date": d.strftime('%Y-%m-%d')}
+                queries += [(INSTITUTIONAL, params), (MARGIN, params)]
+            res = self.client.get_many(queries)
+            for j, d in enumerate(chunk):
+                inst, margin = res[2 * j], res[2 * j + 1]
+                err = next((r for r in (inst, margin) if isinstance(r, Exception)), None)
+                if err is not None:
+                    result['failed'][d] = str(err)
+                    continue
+                self.write(d, market_frame(d, inst, margin))
+                result['fetched'].append(d)
+        return result
+
+    def read(self, start=None, end=None, stock_ids=None, columns=None):
+        """讀取日期區間 (可指定股票) 的籌碼, 索引為 (date, stock_id)"""
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        days = [d for d in self.dates() if (start is None or d >= start) and (end is None or d <= end)]
+        cols = ['date', 'stock_id', *(columns or COLUMNS[2:])]
+        tables = [pq.read_table(self.path(d), columns=cols) for d in days]
+        if not tables: return pd.DataFrame(columns=cols).set_index(['date', 'stock_id'])
+        table = pa.concat_tables(tables)
+        if stock_ids is not None:
+            ids = pa.array([stock_id(str(s)) for s in stock_ids], type=pa.string())
+            table = table.filter(pc.is_in(table['stock_id'], value_set=ids))
+        return table.to_pandas().set_index(['date', 'stock_id']).sort_index()
+
+    def latest(self, on=None):
+        """最近一個 (不晚於 on) 有資料的交易日全市場籌碼, 索引為 stock_id; 回傳 (日期, DataFrame)"""
+        on = pd.Timestamp(on) if on is not None else None
+        for d in reversed(self.dates()):
+            if on is not None and d > on: continue
+            df = pq.read_table(self.path(d)).to_pandas()
+            if len(df): return d, df.drop(columns='date').set_index('stock_id')
+        return None, pd.DataFrame(columns=COLUMNS[2:])
+
+    def for_tickers(self, tickers, on=None):
+        """screen() 用: 以 ticker 為索引的最新 margin_diff / foreign_buy"""
+        day, df = self.latest(on)
+        chips = df.reindex([stock_id(t) for t in tickers])
+        chips.index = list(tickers)
+        return day, chips
+
+
+market_chips = MarketChipStore()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="依交易日批次匯入全市場外資買賣超與融資餘額")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", default=pd.Timestamp.today().strftime('%Y-%m-%d'))
+    parser.add_argument("--root", default=None)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="DIR", help="同時把 FinMind 回應錄製到 DIR")
+    group.add_argument("--replay", metavar="DIR", help="不連網, 改用 DIR 中錄製的回應")
+    args = parser.parse_args()
+
+    client = finmind_client
+    if args.record: client = FinMindClient(session=RecordingSession(args.record))
+    elif args.replay: client = FinMindClient(session=ReplaySession(args.replay), retries=0, quota=Quota(limit=math.inf))
+    res = MarketChipStore(args.root, client).ingest(args.start, args.end)
+    print(f"fetched {len(res['fetched'])} days, skipped {res['skipped']}, failed {len(res['failed'])}")
+    for d, err in res['failed'].items(): print(f"  {d:%Y-%m-%d}: {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+import pandas as pd
+from config import DATA_DIR
+from fileio import atomic_write
+from background import revalidate
+from memcache import memory
+from metrics import metrics
+from finmind import FinMindError
+from providers import provider as default_provider
+
+# ---------------------------------------------------------
+# 本地籌碼倉庫 (每個股票一個 Parquet 檔, 保存原始外資買賣超與融資餘額)
+# ---------------------------------------------------------
+INSTITUTIONAL = "TaiwanStockInstitutionalInvestorsBuySell"
+MARGIN = "TaiwanStockMarginPurchaseShortSale"
+HISTORY_START = "2001-01-01"  # 首次同步抓取的起點 (FinMind 籌碼資料約從此開始)
+CHIP_COLUMNS = ['foreign_buy', 'margin_balance']
+
+
+def stock_id(ticker):
+    return ticker.split('.')[0]
+
+
+def foreign_net_buy(records):
+    """三大法人買賣超 -> 每日外資 (含外資自營商) 買賣超張數"""
+    if not records: return pd.Series(dtype=float, name='foreign_buy')
+    df = pd.DataFrame(records)
+    df = df[df['name'].str.contains('外資')]
+    s = df.groupby('date')['buy_sell'].sum() / 1000  # 轉成張
+    s.index = pd.to_datetime(s.index)
+    return s.rename('foreign_buy')
+
+
+def margin_balance(records):
+    """融資融券 -> 每日融資餘額"""
+    if not records: return pd.Series(dtype=float, name='margin_balance')
+    df = pd.DataFrame(records)
+    s = df.set_index(pd.to_datetime(df['date']))['MarginPurchaseTodayBalance'].astype(float)
+    return s[~s.index.duplicated(keep='last')].rename('margin_balance')
+
+
+def to_chip_frame(data):
+    """倉庫原始欄位 -> 圖表/策略用的 foreign_buy 與 margin_diff (每日融資增減張數)"""
+    out = pd.DataFrame(index=data.index)
+    out['foreign_buy'] = data['foreign_buy']
+    # 增減以完整歷史計算, 區間第一天也有正確的前一日餘額
+    out['margin_diff'] = data['margin_balance'].dropna().diff().reindex(data.index)
+    return out
+
+
+class ChipStore:
+    """保存完整籌碼歷史, 每次只向 FinMind 補抓最後一個交易日 (含) 之後的資料"""
+
+    def __init__(self, root=None, provider=None):
+        self.root = root or os.path.join(DATA_DIR, "chips")
+        self.provider = provider or default_provider
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._hot = memory.view("chips")  # ticker -> (同步時間, DataFrame)
+
+    def path(self, ticker):
+        return os.path.join(self.root, f"{stock_id(ticker)}.parquet")
+
+    def _lock(self, ticker):
+        with self._guard:
+            return self._locks.setdefault(stock_id(ticker), threading.Lock())
+
+    def read(self, ticker):
+        p = self.path(ticker)
+        if not os.path.exists(p): return None
+        try:
+            return pd.read_parquet(p)
+        except Exception as e:
+            print(f"Chip Store Read Error ({p}): {e}")
+            return None
+
+    def write(self, ticker, data):
+        with atomic_write(self.path(ticker)) as tmp: data.to_parquet(tmp)
+
+    @metrics.stage("fetch.chips")
+    def _fetch(self, ticker, start):
+        """兩個 dataset 並行抓取; 任一失敗丟出 FinMindError"""
+        params = {"data_id": stock_id(ticker), "start_date": start}
+        inst, margin = self.provider.chip_records([(INSTITUTIONAL, params), (MARGIN, params)])
+        for res in (inst, margin):
+            if isinstance(res, Exception): raise res if isinstance(res, FinMindError) else FinMindError(str(res))
+        fresh = pd.concat([foreign_net_buy(inst), margin_balance(margin)], axis=1).reindex(columns=CHIP_COLUMNS)
+        fresh.index.name = 'Date'
+        return fresh.sort_index()
+
+    def _cached(self, ticker):
+        key = stock_id(ticker)
+        hot = self._hot.get(key)
+        if hot is None:
+            stored = self.read(ticker)
+            # 程序重啟後以檔案修改時間作為上次同步時間
+            if stored is not None: hot = self._hot.setdefault(key, (os.path.getmtime(self.path(ticker)), stored))
+        return hot
+
+    def sync(self, ticker, max_age=0, stale=False):
+        """補齊本地資料後回傳完整歷史。max_age 秒內同步過 (含程序重啟前寫入的檔案) 直接回傳本地資料;
+        上游失敗時退回本地既有資料, 本地也沒有才丟出 FinMindError。
+        stale=True 時過期的本地資料也立即回傳, 補抓改在背景進行 (同一檔股票同時只有一個)"""
+        lock = self._lock(ticker)
+        if stale:
+            hot = self._cached(ticker)
+            if hot is not None:
+                if not (max_age and time.time() - hot[0] < max_age):
+                    revalidate(lock, lambda: self._refresh(ticker), stock_id(ticker))
+                return hot[1]
+        with lock:
+            hot = self._cached(ticker)
+            if hot is not None and max_age and time.time() - hot[0] < max_age: return hot[1]
+            return self._refresh(ticker)
+
+    def _refresh(self, ticker):
+        """與 FinMind 同步並更新記憶體副本; 呼叫端需持有該股票的鎖"""
+        key = stock_id(ticker)
+        hot = self._hot.get(key)
+        stored = hot[1] if hot is not None else None
+        try:
+            data = self._sync(ticker, stored)
+        except FinMindError as e:
+            if stored is None: raise
+            print(f"Chip Sync Error ({ticker}): {e}")
+            return stored
+        self._hot[key] = (time.time(), data)
+        return data
+
+    def _sync(self, ticker, stored):
+        if stored is None or stored.empty:
+            # 沒有籌碼資料的標的 (ETF 等): 以 attrs['checked_through'] (隨 Parquet 保存) 記錄已查到哪天, 下次從那天起查
+            since = stored.attrs.get('checked_through', HISTORY_START) if stored is not None else HISTORY_START
+            data = self._fetch(ticker, since)
+            if data.empty: data.attrs['checked_through'] = pd.Timestamp.today().strftime('%Y-%m-%d')
+        else:
+            # 從最後一個交易日重抓: 當日資料可能在盤後才補齊
+            since = stored.index[-1]
+            fresh = self._fetch(ticker, since.strftime('%Y-%m-%d'))
+            tail = fresh.combine_first(stored[stored.index >= since])
+            data = pd.concat([stored[stored.index < since], tail])
+        self.write(ticker, data)
+        return data
+
+    def range(self, ticker, start=None, end=None, max_age=3600, stale=False):
+        """任意日期區間的 foreign_buy / margin_diff, 皆由本地資料切出"""
+        data = to_chip_frame(self.sync(ticker, max_age=max_age, stale=stale))
+        return data.loc[pd.Timestamp(start) if start else None:pd.Timestamp(end) if end else None]
+
+
+chips = ChipStore()
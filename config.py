@@ -0,0 +1,44 @@
+import os
+
+# ---------------------------------------------------------
+# 全域設定 (皆可用環境變數覆寫)
+# ---------------------------------------------------------
+# 本地資料根目錄: K 線 / 籌碼等持久化資料都放在這裡
+DATA_DIR = os.environ.get("FUTU_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"))
+
+# FinMind API (可指向本地測試伺服器)
+FINMIND_API_URL = os.environ.get("FINMIND_API_URL", "https://api.finmindtrade.com/api/v4/data")
+FINMIND_TOKEN = os.environ.get("FINMIND_TOKEN", "")
+# 每小時請求上限: 免費帳號未登入 300, 帶 token 600
+FINMIND_QUOTA_PER_HOUR = int(os.environ.get("FINMIND_QUOTA_PER_HOUR", "600" if FINMIND_TOKEN else "300"))
+
+# 上游資料來源: live (yfinance + FinMind) / record (同 live, 並錄製回應) / replay (只讀錄製的 fixture, 不連網)
+DATA_PROVIDER = os.environ.get("DATA_PROVIDER", "live")
+PROVIDER_DIR = os.environ.get("PROVIDER_DIR", os.path.join(DATA_DIR, "fixtures"))
+
+# 圖表降採樣: 可見區間超過此點數 (約為圖表像素寬) 時, K 棒與指標線降到此點數
+CHART_MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", "1200"))
+
+# 背景預熱: 程序啟動時與各市場收盤後, 先把觀察清單與瀏覽次數最多的 ticker 各週期載入快取
+PREFETCH_WATCHLIST = [t.strip() for t in os.environ.get("PREFETCH_WATCHLIST", "").split(",") if t.strip()]
+PREFETCH_TOP_N = int(os.environ.get("PREFETCH_TOP_N", "10"))
+# 同時預熱的 ticker 數上限; 0 代表停用
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "2"))
+
+# 記憶體快取 (memcache): 全程序共用的位元組預算與淘汰策略 (lru / lfu)
+CACHE_MAX_MB = int(os.environ.get("CACHE_MAX_MB", "512"))
+CACHE_POLICY = os.environ.get("CACHE_POLICY", "lru")
+# 快取的圖表資料以精簡格式保存 (去掉冗餘欄、指標轉 float32); 設為 0 保留完整 float64
+CACHE_COMPACT = os.environ.get("CACHE_COMPACT", "1") != "0"
+
+# 多個 app 程序 (同主機的多個副本) 共用 get_data 結果: 寫成 {DATA_DIR}/frames 下的 Arrow 檔, 各程序唯讀 mmap;
+# 設為 0 則各程序自行載入並保存在自己的記憶體快取
+SHARED_FRAMES = os.environ.get("SHARED_FRAMES", "1") != "0"
+
+# 效能量測 (metrics): 各階段耗時、快取命中與圖表傳輸量
+# METRICS_PORT 非 0 時在該 port 提供 Prometheus 格式的 /metrics (每個程序一個; 同主機多副本請各設不同 port)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+# 每次 rerun 的各階段明細寫成一行 JSON: 檔案路徑, "-" 為標準輸出, 空字串不寫
+METRICS_LOG = os.environ.get("METRICS_LOG", "")
+# 頁面底部的除錯面板 (各階段耗時、單次 rerun 取樣剖析); 也可在網址加 ?debug=1 開啟
+DEBUG_PANEL = os.environ.get("DEBUG_PANEL", "0") != "0"
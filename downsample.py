@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit  # 選用: 有安裝時 LTTB 迴圈改用 JIT 編譯
+except ImportError:
+    njit = None
+
+# ---------------------------------------------------------
+# 長區間降採樣: K 棒依桶聚合 OHLC, 指標線以 LTTB 在每桶挑一個代表點。
+# 所有序列共用同一組桶 (時間取桶內第一根), 主圖與副圖的時間軸仍一一對應。
+# 桶大小取 2 的冪次並從歷史第一根起對齊: 同一級距下不同區間切出的桶完全相同, 前端可只補差異
+# ---------------------------------------------------------
+FIRST_COLS = ('time', 'date_obj', 'open')
+
+
+def bucket_size(n, target):
+    """n 根要壓到不超過 target 點時, 每桶的根數 (1, 2, 4, ...)"""
+    size = 1
+    while target > 0 and n > target * size: size *= 2
+    return size
+
+
+def bucket_bounds(n, size):
+    """從第 0 根起每 size 根一桶 (最後一桶可能不滿), 回傳 (起點, 終點) 陣列"""
+    starts = np.arange(0, n, size)
+    return starts, np.minimum(starts + size, n)
+
+
+def _lttb_loop(y, starts, ends, out):
+    """Largest-Triangle-Three-Buckets: 每桶挑與 (前一選點, 下一桶平均) 圍成面積最大的點; NaN 不入選"""
+    px, py = np.nan, np.nan
+    nb = len(starts)
+    for b in range(nb):
+        s, e = starts[b], ends[b]
+        if b + 1 < nb:
+            cs, ce = starts[b + 1], ends[b + 1]
+            cx, cy, cnt = 0.0, 0.0, 0
+            for i in range(cs, ce):
+                if y[i] == y[i]:
+                    cx += i
+                    cy += y[i]
+                    cnt += 1
+            if cnt: cx, cy = cx / cnt, cy / cnt
+            else: cx, cy = e - 1.0, y[e - 1]
+        else:
+            cx, cy = e - 1.0, y[e - 1]
+        best, best_area = s, -1.0
+        for i in range(s, e):
+            v = y[i]
+            if v != v: continue
+            if py != py: area = abs(v - cy) if cy == cy else 0.0
+            else: area = abs((px - cx) * (v - py) - (px - i) * (cy - py))
+            if area != area: area = 0.0
+            if area > best_area: best, best_area = i, area
+        out[b] = best
+        if y[best] == y[best]: px, py = float(best), y[best]
+    return out
+
+
+_lttb_jit = njit(cache=True)(_lttb_loop) if njit is not None else None
+
+
+def lttb_indices(y, starts, ends):
+    """每桶選出的列位置"""
+    out = np.empty(len(starts), dtype=np.int64)
+    y = np.ascontiguousarray(y, dtype=float)
+    if _lttb_jit is not None: return _lttb_jit(y, starts.astype(np.int64), ends.astype(np.int64), out)
+    return _lttb_loop(y, starts, ends, out)
+
+
+def downsample_frame(df, size, lines=()):
+    """每 size 根合併成一點: time/date_obj/open 取桶首, high/low 取極值, close 取桶尾, volume 加總,
+    lines 中的欄位各自以 LTTB 取值; 其餘欄位捨棄。size <= 1 時原樣回傳。索引為每桶第一根的原索引"""
+    n = len(df)
+    if size <= 1 or n == 0: return df
+    starts, ends = bucket_bounds(n, size)
+    out = {}
+    for c in FIRST_COLS:
+        if c in df.columns: out[c] = df[c].to_numpy()[starts]
+    if 'high' in df.columns: out['high'] = np.fmax.reduceat(df['high'].to_numpy(dtype=float), starts)
+    if 'low' in df.columns: out['low'] = np.fmin.reduceat(df['low'].to_numpy(dtype=float), starts)
+    if 'close' in df.columns: out['close'] = df['close'].to_numpy(dtype=float)[ends - 1]
+    if 'volume' in df.columns:
+        v = df['volume'].to_numpy(dtype=float)
+        total = np.add.reduceat(np.nan_to_num(v), starts)
+        counts = np.add.reduceat((~np.isnan(v)).astype(np.int64), starts)
+        out['volume'] = np.where(counts > 0, total, np.nan)
+    for c in lines:
+        if c not in df.columns or c in out: continue
+        y = df[c].to_numpy(dtype=float)
+        out[c] = y[lttb_indices(y, starts, ends)]
+    return pd.DataFrame(out, index=df.index[starts])
+
+
+def downsample_signals(signals, df, size):
+    """策略訊號跟著同一組桶合併: 桶內任一根觸發即視為該桶觸發"""
+    n = len(df)
+    if size <= 1 or n == 0 or signals.empty: return signals
+    starts, _ = bucket_bounds(n, size)
+    hit = signals.reindex(df.index, fill_value=False).to_numpy(dtype=bool)
+    return pd.DataFrame(np.logical_or.reduceat(hit, starts, axis=0), index=df.index[starts], columns=signals.columns)
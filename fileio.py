@@ -0,0 +1,19 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# ---------------------------------------------------------
+# 原子寫檔: 先寫到同目錄的暫存檔再 os.replace, 讀者看到的永遠是完整的舊檔或新檔。
+# 暫存檔名含 pid 與執行緒 id, 多個程序/執行緒同時寫同一個檔案時不會寫到同一個暫存檔
+# ---------------------------------------------------------
+@contextmanager
+def atomic_write(path):
+    """with atomic_write(p) as tmp: 把內容寫到 tmp; 區塊正常結束時以 os.replace 換上 p (目錄不存在時建立),
+    區塊內丟出例外時刪除暫存檔, p 維持原樣"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
@@ -0,0 +1,217 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import FINMIND_API_URL, FINMIND_TOKEN, FINMIND_QUOTA_PER_HOUR
+from fileio import atomic_write
+
+# ---------------------------------------------------------
+# FinMind 客戶端: 連線池 + 並行抓取 + 重試 (指數退避加抖動) + 額度追蹤
+# requests 在第一次連網時才匯入 (程序啟動、只讀本地資料或重播 fixture 時用不到)
+# ---------------------------------------------------------
+RETRY_STATUS = {429, 500, 502, 503, 504}
+QUOTA_STATUS = 402  # FinMind 超過每小時請求上限時回傳
+
+
+class FinMindError(Exception):
+    pass
+
+
+class FinMindQuotaError(FinMindError):
+    pass
+
+
+class Quota:
+    """以滑動一小時視窗記錄請求數; 伺服器回報超額時, 在視窗內最舊的請求過期前都視為用盡"""
+
+    WINDOW = 3600
+
+    def __init__(self, limit=FINMIND_QUOTA_PER_HOUR):
+        self.limit = limit
+        self._stamps = deque()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._stamps and self._stamps[0] <= now - self.WINDOW: self._stamps.popleft()
+
+    def acquire(self, max_wait=0.0):
+        """登記一次請求; 額度用盡且需等待超過 max_wait 秒時丟出 FinMindQuotaError"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._blocked_until - now
+                if len(self._stamps) >= self.limit: wait = max(wait, self._stamps[0] + self.WINDOW - now)
+                if wait <= 0:
+                    self._stamps.append(now)
+                    return
+            if wait > max_wait: raise FinMindQuotaError(f"FinMind 額度用盡, 約 {wait:.0f} 秒後恢復")
+            time.sleep(wait)
+
+    def exhausted(self):
+        """伺服器回報超額: 本地計數可能與伺服器不同步, 以視窗內最舊請求過期時間為恢復點"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._blocked_until = (self._stamps[0] + self.WINDOW) if self._stamps else now + self.WINDOW
+
+    def status(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            used = len(self._stamps)
+            return {'used': used, 'limit': self.limit, 'remaining': max(self.limit - used, 0),
+                    'blocked': self._blocked_until > time.monotonic()}
+
+
+_requests = None  # requests 模組, 第一次連網時才匯入
+
+
+def _requests_module():
+    """requests 只在這裡匯入一次 (第一次呼叫時), 之後沿用"""
+    global _requests
+    if _requests is None:
+        import requests
+        import requests.adapters
+        _requests = requests
+    return _requests
+
+
+def _network_errors():
+    requests = _requests_module()
+    return (requests.ConnectionError, requests.Timeout)
+
+
+def _http_session(pool_size):
+    requests = _requests_module()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class FinMindClient:
+    """base_url / session 可注入, 方便指向本地 stub 伺服器測試; 未注入時第一次請求才建立連線池"""
+
+    def __init__(self, base_url=FINMIND_API_URL, token=FINMIND_TOKEN, timeout=10, retries=3, backoff=0.5,
+                 pool_size=8, quota=None, session=None):
+        self.base_url = base_url
+        self.timeout, self.retries, self.backoff = timeout, retries, backoff
+        self.quota = quota or Quota()
+        self.pool_size = pool_size
+        self.token = token
+        self._session = None
+        self._session_lock = threading.Lock()
+        if session is not None: self._use(session)
+
+    def _use(self, session):
+        if self.token: session.headers["Authorization"] = f"Bearer {self.token}"
+        self._session = session
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None: self._use(_http_session(self.pool_size))
+        return self._session
+
+    def _sleep(self, attempt):
+        # full jitter: 多個執行緒同時失敗時錯開重試時間
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def get(self, dataset, **params):
+        """抓取單一 dataset, 回傳 data 欄的 list of dict; 重試後仍失敗丟出 FinMindError"""
+        params = {"dataset": dataset, **params}
+        last = None
+        for attempt in range(self.retries + 1):
+            self.quota.acquire()
+            try:
+                res = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except _network_errors() as e:  # except 的運算式只在有例外時才求值, 重播 fixture 時不會匯入 requests
+                last = e
+            else:
+                if res.status_code == QUOTA_STATUS:
+                    self.quota.exhausted()
+                    raise FinMindQuotaError(f"{dataset}: FinMind 回報超過請求上限")
+                if res.status_code not in RETRY_STATUS:
+                    try:
+                        body = res.json()
+                    except ValueError:
+                        raise FinMindError(f"{dataset}: 非 JSON 回應 (HTTP {res.status_code})")
+                    if res.status_code != 200 or body.get("msg") != "success":
+                        raise FinMindError(f"{dataset}: {body.get('msg', res.status_code)}")
+                    return body.get("data", [])
+                last = FinMindError(f"{dataset}: HTTP {res.status_code}")
+            if attempt < self.retries: self._sleep(attempt)
+        raise FinMindError(f"{dataset}: 重試 {self.retries} 次仍失敗 ({last})")
+
+    def get_many(self, queries):
+        """queries: [(dataset, params), ...] 並行抓取; 回傳同順序的結果, 失敗者為該 Exception"""
+        def run(q):
+            try:
+                return self.get(q[0], **q[1])
+            except Exception as e:
+                return e
+
+        if len(queries) <= 1: return [run(q) for q in queries]
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(queries))) as pool:
+            return list(pool.map(run, queries))
+
+
+# ---------------------------------------------------------
+# 錄製 / 重播: 把真實回應存成 JSON, 之後可完全離線重跑 (批次匯入、測試)
+# ---------------------------------------------------------
+def fixture_name(params):
+    parts = [params.get("dataset", "")] + [f"{k}={v}" for k, v in sorted(params.items()) if k != "dataset"]
+    return "__".join(str(p).replace(os.sep, "_") for p in parts) + ".json"
+
+
+class _FixtureResponse:
+    def __init__(self, status_code, body):
+        self.status_code, self._body = status_code, body
+
+    def json(self):
+        return self._body
+
+
+class RecordingSession:
+    """轉送到真正的 session, 並把每個 (status, body) 存到 directory"""
+
+    def __init__(self, directory, session=None):
+        self.directory = directory
+        if session is None: session = _requests_module().Session()
+        self.session = session
+        self.headers = self.session.headers
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, url, params=None, timeout=None):
+        res = self.session.get(url, params=params, timeout=timeout)
+        try:
+            body = res.json()
+        except ValueError:
+            return res
+        with atomic_write(os.path.join(self.directory, fixture_name(params or {}))) as tmp, open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"status": res.status_code, "body": body}, f, ensure_ascii=False)
+        return res
+
+
+class ReplaySession:
+    """從 directory 讀取錄製的回應, 不連網; 找不到對應檔案時回傳 404"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.headers = {}
+
+    def get(self, url, params=None, timeout=None):
+        p = os.path.join(self.directory, fixture_name(params or {}))
+        if not os.path.exists(p): return _FixtureResponse(404, {"msg": f"fixture not found: {os.path.basename(p)}"})
+        with open(p, encoding="utf-8") as f:
+            rec = json.load(f)
+        return _FixtureResponse(rec["status"], rec["body"])
+
+
+client = FinMindClient()
@@ -0,0 +1,312 @@
+// ---------------------------------------------------------
+// K 線圖元件 (常駐 iframe): 圖表只建立一次, 依 Python 送來的 ops 增量更新
+// 與 Streamlit 的溝通走 components v1 的 postMessage 協定
+// ---------------------------------------------------------
+const UP_COLOR = '#FF5252', DOWN_COLOR = '#00B746';
+const FORCE_WIDTH = 60;
+const lineOpts = { lineWidth: 1, priceLineVisible: false, lastValueVisible: false };
+const mainLayout = { backgroundColor: '#FFFFFF', textColor: '#333333', fontSize: 13.5 };
+const indicatorLayout = { backgroundColor: 'transparent', textColor: '#333333', fontSize: 13 };
+const indicatorLayout125 = { backgroundColor: 'transparent', textColor: '#333333', fontSize: 12.5 };
+const volObvLayout = { backgroundColor: 'transparent', textColor: '#333333', fontSize: 11.5 };
+const grid = { vertLines: { color: '#F0F0F0' }, horzLines: { color: '#F0F0F0' } };
+const crosshair = { mode: LightweightCharts.CrosshairMode.Normal };
+const timeScaleOpts = { borderColor: '#E0E0E0', timeVisible: true, rightOffset: 5 };
+
+const fmtAxisInt = p => Math.round(p).toString();
+const fmtAxisBigInt = p => {
+    let absVal = Math.abs(p);
+    if (absVal >= 100000000) return Math.round(p / 100000000).toString() + '億';
+    if (absVal >= 10000) return Math.round(p / 10000).toString() + '萬';
+    return Math.round(p).toString();
+};
+const fmtDec2 = p => p.toFixed(2);
+const fmtDec3 = p => p.toFixed(3);
+const fmtBigDec3 = p => {
+    let absVal = Math.abs(p);
+    if (absVal >= 100000000) return (p / 100000000).toFixed(3) + '億';
+    if (absVal >= 10000) return (p / 10000).toFixed(3) + '萬';
+    return p.toFixed(3);
+};
+
+// ---------------------------------------------------------
+// Streamlit 協定
+// ---------------------------------------------------------
+function send(type, data) { window.parent.postMessage({ isStreamlitMessage: true, type, ...data }, '*'); }
+const setFrameHeight = () => send('streamlit:setFrameHeight', { height: document.body.scrollHeight + 20 });
+
+// ---------------------------------------------------------
+// 資料: 共用時間軸 + 各欄 TypedArray
+// ---------------------------------------------------------
+let times = new Float64Array(0);
+let cols = {};
+let timeIndex = new Map();
+let markers = [];
+
+function decode(b64, kind) {
+    const bin = atob(b64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return kind === 'f8' ? new Float64Array(bytes.buffer) : new Float32Array(bytes.buffer);
+}
+
+function concat(a, b) {
+    const out = new (a instanceof Float64Array || b instanceof Float64Array ? Float64Array : Float32Array)(a.length + b.length);
+    out.set(a, 0);
+    out.set(b, a.length);
+    return out;
+}
+
+function decodeCols(payload) {
+    const out = {};
+    for (const [k, [kind, b64]] of Object.entries(payload.cols)) out[k] = decode(b64, kind);
+    return out;
+}
+
+function reindex() {
+    timeIndex = new Map();
+    times.forEach((t, i) => timeIndex.set(t, i));
+}
+
+// 折線序列: NaN (或 group 中任一欄為 NaN) 轉成只有 time 的空白點
+function linePoint(i, k, group) {
+    return group.some(x => Number.isNaN(cols[x][i])) ? { time: times[i] } : { time: times[i], value: cols[k][i] };
+}
+function candlePoint(i) {
+    const o = cols.open[i], h = cols.high[i], l = cols.low[i], c = cols.close[i];
+    if (Number.isNaN(o) || Number.isNaN(h) || Number.isNaN(l) || Number.isNaN(c)) return { time: times[i] };
+    return { time: times[i], open: o, high: h, low: l, close: c };
+}
+function volPoint(i) {
+    const v = cols.volume[i], o = cols.open[i], c = cols.close[i];
+    if (Number.isNaN(v) || Number.isNaN(o) || Number.isNaN(c)) return { time: times[i] };
+    return { time: times[i], value: v, color: c >= o ? UP_COLOR : DOWN_COLOR };
+}
+function histPoint(i, k, group) {
+    const p = linePoint(i, k, group);
+    return p.value === undefined ? p : { ...p, color: p.value >= 0 ? UP_COLOR : DOWN_COLOR };
+}
+
+// ---------------------------------------------------------
+// 面板定義: 每個序列 { key, kind, point(i) }
+// ---------------------------------------------------------
+const line = (key, color, group = [key], extra = {}) => ({ key, kind: 'line', opts: { ...lineOpts, color, ...extra }, point: i => linePoint(i, key, group) });
+const macdCols = ['dif', 'dea', 'hist'];
+const PANES = {
+    ma: { overlay: true, series: [line('ma5', '#FFA500'), line('ma10', '#2196F3'), line('ma20', '#E040FB'), line('ma60', '#00E676')] },
+    boll: { overlay: true, series: [line('mid', '#FF4081', ['mid'], { lineWidth: 1.5 }), line('up', '#FFD700'), line('low_band', '#00E5FF')] },
+    vol: { height: 100, layout: volObvLayout, priceFormatter: fmtBigDec3, tickMarkFormatter: fmtAxisBigInt, scaleMargins: { top: 0.2, bottom: 0 }, legendClass: 'legend-small',
+           series: [{ key: 'volume', kind: 'hist', opts: { title: 'VOL', priceLineVisible: false }, point: volPoint }] },
+    macd: { height: 150, layout: indicatorLayout,
+            series: [line('dif', '#E6A23C', macdCols), line('dea', '#2196F3', macdCols), { key: 'hist', kind: 'hist', opts: {}, point: i => histPoint(i, 'hist', macdCols) }] },
+    kdj: { height: 120, layout: indicatorLayout125, series: [line('k', '#E6A23C'), line('d', '#2196F3'), line('j', '#E040FB')] },
+    rsi: { height: 120, layout: indicatorLayout125, series: [line('rsi6', '#E6A23C'), line('rsi12', '#2196F3'), line('rsi24', '#E040FB')] },
+    obv: { height: 120, layout: volObvLayout, priceFormatter: fmtBigDec3, tickMarkFormatter: fmtAxisBigInt, legendClass: 'legend-small',
+           series: [line('obv', '#FFD700'), line('obv_ma', '#29B6F6')] },
+    bias: { height: 120, layout: indicatorLayout, series: [line('b6', '#2196F3'), line('b12', '#E6A23C'), line('b24', '#E040FB')] },
+};
+const PANE_ORDER = Object.keys(PANES);
+
+// ---------------------------------------------------------
+// 圖表
+// ---------------------------------------------------------
+const mainChart = LightweightCharts.createChart(document.getElementById('main-chart'), {
+    layout: mainLayout, grid, crosshair, timeScale: timeScaleOpts,
+    localization: { priceFormatter: fmtDec2 },
+    rightPriceScale: { visible: true, borderColor: '#E0E0E0', minimumWidth: FORCE_WIDTH, scaleMargins: { top: 0.1, bottom: 0.1 }, tickMarkFormatter: fmtDec2 },
+});
+const candleSeries = mainChart.addCandlestickSeries({
+    upColor: UP_COLOR, downColor: DOWN_COLOR, borderUpColor: UP_COLOR, borderDownColor: DOWN_COLOR, wickUpColor: UP_COLOR, wickDownColor: DOWN_COLOR,
+});
+const active = {};  // 面板名稱 -> { chart, el, series: [[定義, 序列物件]] }
+let syncing = false;
+
+function connect(chart) {
+    chart.priceScale('right').applyOptions({ minimumWidth: FORCE_WIDTH });
+    chart.subscribeCrosshairMove(updateLegends);
+    chart.timeScale().subscribeVisibleLogicalRangeChange(range => {
+        if (!range || syncing) return;
+        syncing = true;
+        allCharts().forEach(other => { if (other !== chart) other.timeScale().setVisibleLogicalRange(range); });
+        syncing = false;
+    });
+}
+const allCharts = () => [mainChart, ...PANE_ORDER.filter(p => active[p] && active[p].chart).map(p => active[p].chart)];
+
+function addPane(name) {
+    const def = PANES[name];
+    let chart = mainChart, el = null;
+    if (!def.overlay) {
+        el = document.createElement('div');
+        el.className = 'chart-container sub-chart';
+        el.style.height = def.height + 'px';
+        el.innerHTML = `<div class="legend ${def.legendClass || ''}"></div>`;
+        const next = PANE_ORDER.slice(PANE_ORDER.indexOf(name) + 1).find(p => active[p] && active[p].el);
+        document.getElementById('sub-charts').insertBefore(el, next ? active[next].el : null);
+        chart = LightweightCharts.createChart(el, {
+            layout: def.layout, grid, crosshair, timeScale: timeScaleOpts,
+            localization: { priceFormatter: def.priceFormatter || fmtDec3 },
+            rightPriceScale: { borderColor: '#E0E0E0', visible: true, minimumWidth: FORCE_WIDTH, scaleMargins: def.scaleMargins || { top: 0.1, bottom: 0.1 }, tickMarkFormatter: def.tickMarkFormatter || fmtAxisInt },
+        });
+    }
+    const series = def.series.map(s => [s, s.kind === 'hist' ? chart.addHistogramSeries(s.opts) : chart.addLineSeries(s.opts)]);
+    active[name] = { chart: def.overlay ? null : chart, el, series };
+    if (!def.overlay) {
+        connect(chart);
+        const range = mainChart.timeScale().getVisibleLogicalRange();
+        if (range) chart.timeScale().setVisibleLogicalRange(range);
+    }
+}
+
+function removePane(name) {
+    const pane = active[name];
+    if (!pane) return;
+    if (pane.chart) { pane.chart.remove(); pane.el.remove(); }
+    else pane.series.forEach(([, s]) => mainChart.removeSeries(s));
+    PANES[name].series.forEach(s => delete cols[s.key]);
+    delete active[name];
+}
+
+function build(point) {
+    const out = new Array(times.length);
+    for (let i = 0; i < times.length; i++) out[i] = point(i);
+    return out;
+}
+
+function draw(names) {
+    names.forEach(name => active[name].series.forEach(([def, s]) => s.setData(build(def.point))));
+}
+
+// 尾端少量 K 棒用 update 就地更新 (只能改最後一根或往後加), 其餘整段 setData
+function drawTail(from) {
+    for (let i = from; i < times.length; i++) {
+        candleSeries.update(candlePoint(i));
+        Object.values(active).forEach(pane => pane.series.forEach(([def, s]) => s.update(def.point(i))));
+    }
+}
+
+// ---------------------------------------------------------
+// ops
+// ---------------------------------------------------------
+function apply(op) {
+    if (op.op === 'reset') {
+        Object.keys(active).forEach(removePane);
+        times = decode(op.data.time, 'f8');
+        cols = decodeCols(op.data);
+        op.panes.forEach(addPane);
+        candleSeries.setData(build(candlePoint));
+        draw(Object.keys(active));
+    } else if (op.op === 'addPane') {
+        Object.assign(cols, decodeCols(op.data));
+        addPane(op.pane);
+        draw([op.pane]);
+    } else if (op.op === 'removePane') {
+        removePane(op.pane);
+    } else if (op.op === 'prepend') {
+        const fresh = decodeCols(op.data);
+        times = concat(decode(op.data.time, 'f8'), times);
+        for (const k of Object.keys(cols)) cols[k] = concat(fresh[k], cols[k]);
+        candleSeries.setData(build(candlePoint));
+        draw(Object.keys(active));
+    } else if (op.op === 'append') {
+        const t = decode(op.data.time, 'f8'), fresh = decodeCols(op.data);
+        let keep = times.length;
+        while (keep > 0 && times[keep - 1] >= t[0]) keep--;
+        const replaced = times.length - keep;
+        times = concat(times.subarray(0, keep), t);
+        for (const k of Object.keys(cols)) cols[k] = concat(cols[k].subarray(0, keep), fresh[k]);
+        if (t.length <= 5 && replaced <= 1 && keep > 0) drawTail(keep);
+        else { candleSeries.setData(build(candlePoint)); draw(Object.keys(active)); }
+    } else if (op.op === 'markers') {
+        markers = op.markers;
+        candleSeries.setMarkers(markers);
+    } else if (op.op === 'range') {
+        mainChart.timeScale().setVisibleRange({ from: op.from, to: op.to });
+    }
+}
+
+// ---------------------------------------------------------
+// 翻頁: 可見區間左緣接近已載入資料的第一根, 且 Python 端還有更舊資料時, 要求前一頁
+// ---------------------------------------------------------
+const EDGE_BARS = 20;
+let firstTime = null;  // Python 端資料的第一根時間
+let pending = null;    // 已送出要求時的 times[0], 避免重複要求
+function maybePage(range) {
+    if (!range || firstTime === null || times.length === 0) return;
+    if (range.from > EDGE_BARS || times[0] <= firstTime || pending === times[0]) return;
+    pending = times[0];
+    send('streamlit:setComponentValue', { value: { page: Date.now(), before: times[0] }, dataType: 'json' });
+}
+
+let applied = 0;  // 已套用的 seq
+function onRender(args) {
+    firstTime = args.first;
+    if (args.seq === applied) return;
+    const ops = args.ops || [];
+    if (args.base !== applied && !(ops.length && ops[0].op === 'reset')) {
+        // 與 Python 端記錄不同步 (例如 iframe 重建): 要求下一輪整份重送
+        send('streamlit:setComponentValue', { value: { resync: Date.now() }, dataType: 'json' });
+        return;
+    }
+    try {
+        ops.forEach(apply);
+        reindex();
+        applied = args.seq;
+        updateLegends(null);
+        maybePage(mainChart.timeScale().getVisibleLogicalRange());
+    } catch (e) {
+        document.getElementById('main-legend').innerHTML = '<span style="color:red;">Chart Error: ' + e.message + '</span>';
+    }
+    setFrameHeight();
+}
+
+window.addEventListener('message', event => {
+    if (event.data && event.data.type === 'streamlit:render') onRender(event.data.args);
+});
+window.addEventListener('resize', () => {
+    allCharts().forEach(c => c.resize(document.body.clientWidth, c.options().height));
+});
+connect(mainChart);
+mainChart.timeScale().subscribeVisibleLogicalRangeChange(maybePage);
+send('streamlit:componentReady', { apiVersion: 1 });
+setFrameHeight();
+
+// ---------------------------------------------------------
+// 圖例 (以時間找到列位置, 直接讀 TypedArray)
+// ---------------------------------------------------------
+function legendEl(name) { return name === 'main' ? document.getElementById('main-legend') : active[name] && active[name].el ? active[name].el.firstChild : null; }
+
+function updateLegends(param) {
+    let t;
+    if (!param || !param.time) {
+        if (times.length > 0) t = times[times.length - 1];
+        else return;
+    } else { t = param.time; }
+    const i = timeIndex.get(t);
+    if (i === undefined) return;
+    const v = k => cols[k][i];
+    const ok = (...ks) => ks.every(k => !Number.isNaN(cols[k][i]));
+
+    const mainLegendEl = legendEl('main');
+    mainLegendEl.innerHTML = '';
+    if (active.ma) { let h='<div class="legend-row"><span class="legend-label">MA(5,10,20,60)</span>'; if(ok('ma5'))h+=`<span class="legend-value" style="color:#FFA500">MA5:${fmtDec3(v('ma5'))}</span> `; if(ok('ma10'))h+=`<span class="legend-value" style="color:#2196F3">MA10:${fmtDec3(v('ma10'))}</span> `; if(ok('ma20'))h+=`<span class="legend-value" style="color:#E040FB">MA20:${fmtDec3(v('ma20'))}</span> `; if(ok('ma60'))h+=`<span class="legend-value" style="color:#00E676">MA60:${fmtDec3(v('ma60'))}</span>`; h+='</div>'; mainLegendEl.innerHTML=h; }
+    if (active.boll && ok('mid', 'up', 'low_band')) mainLegendEl.innerHTML += `<div class="legend-row"><span class="legend-label">BOLL(20,2)</span><span class="legend-value" style="color:#FF4081">MID:${fmtDec3(v('mid'))}</span><span class="legend-value" style="color:#FFD700">UP:${fmtDec3(v('up'))}</span><span class="legend-value" style="color:#00E5FF">LOW:${fmtDec3(v('low_band'))}</span></div>`;
+
+    const volLegendEl = legendEl('vol');
+    if (volLegendEl && ok('volume', 'open', 'close')) volLegendEl.innerHTML = `<div class="legend-row"><span class="legend-label">VOL</span><span class="legend-value" style="color: ${v('close') >= v('open') ? UP_COLOR : DOWN_COLOR}">VOL: ${fmtBigDec3(v('volume'))}</span></div>`;
+
+    const macdLegendEl = legendEl('macd');
+    if (macdLegendEl && ok('dif', 'dea', 'hist')) macdLegendEl.innerHTML=`<div class="legend-row"><span class="legend-label">MACD(12,26,9)</span><span class="legend-value" style="color:#E6A23C">DIF: ${fmtDec3(v('dif'))}</span><span class="legend-value" style="color:#2196F3">DEA: ${fmtDec3(v('dea'))}</span><span class="legend-value" style="color:#E040FB">MACD: ${fmtDec3(v('hist'))}</span></div>`;
+
+    const kdjLegendEl = legendEl('kdj');
+    if (kdjLegendEl && ok('k')) kdjLegendEl.innerHTML=`<div class="legend-row"><span class="legend-label">KDJ(9,3,3)</span><span class="legend-value" style="color:#E6A23C">K: ${fmtDec3(v('k'))}</span><span class="legend-value" style="color:#2196F3">D: ${fmtDec3(v('d'))}</span><span class="legend-value" style="color:#E040FB">J: ${fmtDec3(v('j'))}</span></div>`;
+
+    const rsiLegendEl = legendEl('rsi');
+    if (rsiLegendEl) rsiLegendEl.innerHTML=`<div class="legend-row"><span class="legend-label">RSI(6,12,24)</span><span class="legend-value" style="color:#E6A23C">RSI6: ${fmtDec3(v('rsi6'))}</span><span class="legend-value" style="color:#2196F3">RSI12: ${fmtDec3(v('rsi12'))}</span><span class="legend-value" style="color:#E040FB">RSI24: ${fmtDec3(v('rsi24'))}</span></div>`;
+
+    const obvLegendEl = legendEl('obv');
+    if (obvLegendEl && ok('obv')) obvLegendEl.innerHTML = `<div class="legend-row"><span class="legend-label">OBV(10)</span><span class="legend-value" style="color: #FFD700">OBV: ${fmtBigDec3(v('obv'))}</span> <span class="legend-value" style="color: #29B6F6">MA10: ${fmtBigDec3(v('obv_ma'))}</span></div>`;
+
+    const biasLegendEl = legendEl('bias');
+    if (biasLegendEl) biasLegendEl.innerHTML = `<div class="legend-row"><span class="legend-label">BIAS(6,12,24)</span><span class="legend-value" style="color: #2196F3">BIAS1: ${fmtDec3(v('b6'))}</span><span class="legend-value" style="color: #E6A23C">BIAS2: ${fmtDec3(v('b12'))}</span><span class="legend-value" style="color: #E040FB">BIAS3: ${fmtDec3(v('b24'))}</span></div>`;
+}
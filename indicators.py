@@ -0,0 +1,864 @@
+import copy
+import math
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from memcache import memory
+
+# ---------------------------------------------------------
+# 技術指標: 全量向量化計算 + 逐筆增量引擎
+# ---------------------------------------------------------
+MA_LENGTHS = (5, 10, 20, 60, 120)
+BIAS_LENGTHS = (6, 12, 24)
+RSI_LENGTHS = (6, 12, 24)
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+
+NAN = float('nan')
+
+try:
+    from numba import njit  # 選用: 有安裝時 EWM 遞迴改用 JIT 編譯
+except ImportError:
+    njit = None
+
+
+def _series(x, index):
+    """資料長度不足時 sma / ema / rma 回傳 None (同 pandas_ta), 統一轉成全 NaN"""
+    return x if x is not None else pd.Series(np.nan, index=index)
+
+
+class ReferenceTA:
+    """參考實作用到的 pandas_ta (0.3.14b) 函式: 同樣的 pandas 運算與長度不足時回傳 None 的行為。
+    不依賴 pandas_ta; 與其數值一致性由 benchmarks.validate_indicators 比對"""
+
+    @staticmethod
+    def sma(close, length):
+        if len(close) < length: return None
+        return close.rolling(length, min_periods=length).mean()
+
+    @staticmethod
+    def ema(close, length):
+        """前 length 根平均為起點, 之後 ewm(span, adjust=False)"""
+        if len(close) < length: return None
+        seeded = close.copy()
+        seeded.iloc[length - 1] = close.iloc[:length].mean()
+        seeded.iloc[:length - 1] = np.nan
+        return seeded.ewm(span=length, adjust=False).mean()
+
+    @staticmethod
+    def rma(close, length):
+        """Wilder 平滑: ewm(alpha=1/length), 前 length 根為 NaN"""
+        if len(close) < length: return None
+        return close.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+    @staticmethod
+    def obv(close, volume):
+        """成交量依漲跌正負累加; 第一根視為上漲"""
+        sign = np.sign(close.diff(1))
+        sign.iloc[0] = 1
+        return (sign * volume).cumsum()
+
+
+def compute_indicators_reference(data, ta=ReferenceTA):
+    """逐項以 pandas 計算的參考實作, 作為融合核心的數值與速度基準;
+    ta 提供 sma / ema / rma / obv (傳入 pandas_ta 模組即為原版組成方式)"""
+    close, idx = data['close'], data.index
+    out = pd.DataFrame(index=idx)
+    for n in MA_LENGTHS: out[f'MA{n}'] = _series(ta.sma(close, length=n), idx)
+
+    out['boll_mid'] = close.rolling(window=20).mean()
+    out['boll_std'] = close.rolling(window=20).std()
+    out['boll_upper'] = out['boll_mid'] + (2 * out['boll_std'])
+    out['boll_lower'] = out['boll_mid'] - (2 * out['boll_std'])
+
+    # 與 ta.macd 相同的組成方式, 保留快慢線供增量引擎接續
+    fast = _series(ta.ema(close, length=MACD_FAST), idx)
+    slow = _series(ta.ema(close, length=MACD_SLOW), idx)
+    macd = fast - slow
+    first = macd.first_valid_index()
+    signal = _series(ta.ema(macd.loc[first:], length=MACD_SIGNAL) if first is not None else None, idx).reindex(idx)
+    out[MACD_COLS[0]] = macd
+    out[MACD_COLS[1]] = macd - signal
+    out[MACD_COLS[2]] = signal
+
+    low_list = data['low'].rolling(9, min_periods=1).min()
+    high_list = data['high'].rolling(9, min_periods=1).max()
+    rsv = (close - low_list) / (high_list - low_list) * 100
+    out['k'] = rsv.ewm(alpha=1/3, adjust=False).mean()
+    out['d'] = out['k'].ewm(alpha=1/3, adjust=False).mean()
+    out['j'] = 3 * out['k'] - 2 * out['d']
+
+    # 與 ta.rsi 相同: 漲跌幅各自做 RMA
+    diff = close.diff(1)
+    positive, negative = diff.clip(lower=0), diff.clip(upper=0)
+    internals = {'ema_fast': fast, 'ema_slow': slow, 'rsv': rsv}
+    for n in RSI_LENGTHS:
+        pos_avg = _series(ta.rma(positive, length=n), idx)
+        neg_avg = _series(ta.rma(negative, length=n), idx)
+        out[f'RSI{n}'] = 100 * pos_avg / (pos_avg + neg_avg.abs())
+        internals[f'rsi_pos{n}'], internals[f'rsi_neg{n}'] = pos_avg, neg_avg
+
+    for n in BIAS_LENGTHS:
+        sma = _series(ta.sma(close, length=n), idx)
+        out[f'BIAS{n}'] = (close - sma) / sma * 100
+
+    out['OBV'] = _series(ta.obv(close, data['volume']), idx)
+    out['OBV_MA10'] = _series(ta.sma(out['OBV'], length=10), idx)
+    return out[COLUMNS], internals
+
+
+# ---------------------------------------------------------
+# 指標規格: 每個 (指標, 參數) 各自計算與保存, 只算被要求的部分
+# ---------------------------------------------------------
+class Indicator:
+    """指標規格; key = (名稱, 參數...) 作為記憶化的鍵。
+    子類別提供 columns (輸出欄位)、deps (依賴的指標)、compute (全量計算) 與 state (逐筆狀態)"""
+    name = None
+    deps = ()
+
+    def __init__(self, *params):
+        self.params = params
+        self.key = (self.name, *params)
+
+    def __eq__(self, other):
+        return isinstance(other, Indicator) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.params}"
+
+
+class SMA(Indicator):
+    name = 'sma'
+
+    def __init__(self, length):
+        super().__init__(length)
+        self.columns = [f'MA{length}']
+
+    def compute(self, ctx, out):
+        _window_mean(ctx.prefix(), self.params[0], out[:, 0])
+
+    def state(self):
+        return _SMAState(*self.params)
+
+
+class BOLL(Indicator):
+    name = 'boll'
+    columns = ['boll_mid', 'boll_std', 'boll_upper', 'boll_lower']
+
+    def __init__(self, length=20, mult=2):
+        super().__init__(length, mult)
+        self.deps = (SMA(length),)  # 中軌與同長度的 MA 共用
+
+    def compute(self, ctx, out):
+        length, mult = self.params
+        mid, std = out[:, 0], out[:, 1]
+        mid[:] = ctx.output(self.deps[0])[:, 0]
+        std[:] = np.nan
+        if ctx.n >= length:
+            # 以前綴和得到的均值置中後兩段式計算, 避免平方和相減的精度損失
+            dev = np.lib.stride_tricks.sliding_window_view(ctx.close, length) - mid[length - 1:, None]
+            std[length - 1:] = np.sqrt(np.einsum('ij,ij->i', dev, dev) / (length - 1))
+        out[:, 2] = mid + mult * std
+        out[:, 3] = mid - mult * std
+
+    def state(self):
+        return _BollState(*self.params)
+
+
+class MACD(Indicator):
+    name = 'macd'
+
+    def __init__(self, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+        super().__init__(fast, slow, signal)
+        self.columns = [f"MACD_{fast}_{slow}_{signal}", f"MACDh_{fast}_{slow}_{signal}", f"MACDs_{fast}_{slow}_{signal}"]
+
+    def compute(self, ctx, out):
+        fast_len, slow_len, signal_len = self.params
+        fast = _seeded_ema(ctx.close, fast_len, np.empty(ctx.n))
+        slow = _seeded_ema(ctx.close, slow_len, np.empty(ctx.n))
+        macd, hist, signal = out[:, 0], out[:, 1], out[:, 2]
+        np.subtract(fast, slow, out=macd)
+        signal[:] = np.nan
+        valid = np.flatnonzero(~np.isnan(macd))
+        if len(valid): _seeded_ema(macd[valid[0]:], signal_len, signal[valid[0]:])
+        np.subtract(macd, signal, out=hist)
+        return {'ema_fast': fast, 'ema_slow': slow}
+
+    def state(self):
+        return _MACDState(*self.params)
+
+
+class KDJ(Indicator):
+    name = 'kdj'
+    columns = ['k', 'd', 'j']
+
+    def __init__(self, length=9, k_smooth=3, d_smooth=3):
+        super().__init__(length, k_smooth, d_smooth)
+
+    def compute(self, ctx, out):
+        length, k_smooth, d_smooth = self.params
+        lo, hi = _window_extremum(ctx.low, length, False), _window_extremum(ctx.high, length, True)
+        rsv = (ctx.close - lo) / (hi - lo) * 100
+        k, d = _ewm(rsv, 1 / k_smooth, out=out[:, 0]), _ewm(out[:, 0], 1 / d_smooth, out=out[:, 1])
+        out[:, 2] = 3 * k - 2 * d
+        return {'rsv': rsv}
+
+    def state(self):
+        return _KDJState(*self.params)
+
+
+class RSI(Indicator):
+    name = 'rsi'
+
+    def __init__(self, length):
+        super().__init__(length)
+        self.columns = [f'RSI{length}']
+
+    def compute(self, ctx, out):
+        length = self.params[0]
+        positive, negative = ctx.shared('gain_loss', lambda: (np.maximum(ctx.diff(), 0.0), np.minimum(ctx.diff(), 0.0)))
+        pa = _ewm(positive, 1 / length, adjust=True, minp=length)
+        na = _ewm(negative, 1 / length, adjust=True, minp=length)
+        out[:, 0] = 100 * pa / (pa + np.abs(na))
+        return {'pos': pa, 'neg': na}
+
+    def state(self):
+        return _RSIState(*self.params)
+
+
+class BIAS(Indicator):
+    name = 'bias'
+
+    def __init__(self, length):
+        super().__init__(length)
+        self.columns = [f'BIAS{length}']
+        self.deps = (SMA(length),)
+
+    def compute(self, ctx, out):
+        sma = ctx.output(self.deps[0])[:, 0]
+        out[:, 0] = (ctx.close - sma) / sma * 100
+
+    def state(self):
+        return _BiasState()
+
+
+class OBV(Indicator):
+    name = 'obv'
+    columns = ['OBV']
+
+    def compute(self, ctx, out):
+        sign = np.sign(ctx.diff())
+        sign[:1] = 1.0
+        signed = sign * ctx.volume
+        obv = out[:, 0]
+        np.cumsum(np.where(np.isnan(signed), 0.0, signed), out=obv)
+        obv[np.isnan(signed)] = np.nan
+
+    def state(self):
+        return _OBVState()
+
+
+class OBVMA(Indicator):
+    name = 'obv_ma'
+    deps = (OBV(),)
+
+    def __init__(self, length=10):
+        super().__init__(length)
+        self.columns = [f'OBV_MA{length}']
+
+    def compute(self, ctx, out):
+        _window_mean(_prefix(ctx.output(self.deps[0])[:, 0]), self.params[0], out[:, 0])
+
+    def state(self):
+        return _WindowOfDep(*self.params)
+
+
+# 原本 get_data 一次算出的全部指標 (欄位順序即 COLUMNS)
+DEFAULT = ([SMA(n) for n in MA_LENGTHS] + [BOLL(), MACD(), KDJ()]
+           + [RSI(n) for n in RSI_LENGTHS] + [BIAS(n) for n in BIAS_LENGTHS] + [OBV(), OBVMA(10)])
+COLUMNS = [c for spec in DEFAULT for c in spec.columns]
+COL = {c: i for i, c in enumerate(COLUMNS)}
+MACD_COLS = MACD().columns
+
+
+def resolve(specs):
+    """去重並補上依賴, 依賴一定排在使用者之前"""
+    ordered, seen = [], set()
+
+    def visit(spec):
+        if spec in seen: return
+        for dep in spec.deps: visit(dep)
+        seen.add(spec)
+        ordered.append(spec)
+
+    for spec in specs: visit(spec)
+    return ordered
+
+
+# ---------------------------------------------------------
+# 融合指標核心: 共用前綴和與視窗, 一次寫入預先配置的輸出區塊
+# ---------------------------------------------------------
+def _ewm_loop(x, alpha, adjust, minp, out):
+    """pandas ewm(...).mean() 的演算法 (含 NaN 權重處理)"""
+    minp = max(minp, 1)
+    weighted, old_wt, nobs = np.nan, 1.0, 0
+    new_wt = 1.0 if adjust else alpha
+    for i in range(len(x)):
+        cur = x[i]
+        obs = np.isfinite(cur)  # pandas 視窗運算把 ±inf 當成缺值
+        if not obs: cur = np.nan
+        nobs += obs
+        if weighted == weighted:
+            old_wt *= 1.0 - alpha
+            if obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+                old_wt = old_wt + new_wt if adjust else 1.0
+        elif obs:
+            weighted = cur
+        out[i] = weighted if nobs >= minp else np.nan
+
+
+_ewm_jit = njit(cache=True)(_ewm_loop) if njit is not None else None
+
+
+def _ewm(x, alpha, adjust=False, minp=0, out=None):
+    if out is None: out = np.empty(len(x))
+    if _ewm_jit is not None: _ewm_jit(x, alpha, adjust, minp, out)
+    else: out[:] = pd.Series(x).ewm(alpha=alpha, adjust=adjust, min_periods=minp).mean().to_numpy()
+    return out
+
+
+def _seeded_ema(x, length, out):
+    """pandas_ta 的 ema: 第 length 根以前 length 根平均為起點, 之後 ewm(span, adjust=False)"""
+    out[:] = np.nan
+    if len(x) < length: return out
+    seeded = x.copy()
+    seeded[:length - 1] = np.nan
+    seeded[length - 1] = np.nanmean(x[:length])
+    return _ewm(seeded, 2.0 / (length + 1), out=out)
+
+
+def _prefix(x):
+    """NaN 視為 0 的前綴和, 與 NaN 個數前綴和 (供視窗判斷是否含缺值)"""
+    nan = np.isnan(x)
+    base = x[~nan][0] if (~nan).any() else 0.0  # 平移以降低大數相減的誤差
+    ps = np.zeros(len(x) + 1)
+    np.cumsum(np.where(nan, 0.0, x - base), out=ps[1:])
+    pn = np.zeros(len(x) + 1, dtype=np.int64)
+    np.cumsum(nan, out=pn[1:])
+    return ps, pn, base
+
+
+def _window_mean(prefix, length, out):
+    """rolling(length).mean(): 視窗未滿或含 NaN 為 NaN"""
+    ps, pn, base = prefix
+    out[:] = np.nan
+    if len(out) < length: return out
+    mean = (ps[length:] - ps[:-length]) / length + base
+    out[length - 1:] = np.where(pn[length:] - pn[:-length] > 0, np.nan, mean)
+    return out
+
+
+def _window_extremum(x, length, is_max):
+    """rolling(length, min_periods=1).max()/min(): 以倍增視窗 (1, 2, 4, ...) 組合, 只需 O(log length) 次向量運算"""
+    op = np.fmax if is_max else np.fmin
+    padded = np.concatenate([np.full(length - 1, np.nan), x])
+    acc, width = padded, 1
+    while width * 2 <= length:
+        acc = op(acc[:-width], acc[width:])
+        width *= 2
+    # acc[i] 為 padded[i:i+width] 的極值, 剩餘長度用一段重疊視窗補齊
+    rest = length - width
+    res = op(acc[:len(x)], acc[rest:rest + len(x)]) if rest else acc[:len(x)]
+    return res
+
+
+class _Context:
+    """一次全量計算共用的輸入與中間結果 (收盤前綴和、漲跌幅等只算一次)"""
+
+    def __init__(self, inputs, blocks):
+        self.close, self.high, self.low, self.volume = inputs
+        self.n = len(self.close)
+        self.blocks = blocks
+        self._memo = {}
+
+    def output(self, spec):
+        return self.blocks[spec.key]
+
+    def shared(self, name, fn):
+        if name not in self._memo: self._memo[name] = fn()
+        return self._memo[name]
+
+    def prefix(self):
+        return self.shared('prefix', lambda: _prefix(self.close))
+
+    def diff(self):
+        def calc():
+            diff = np.empty(self.n)
+            diff[:1] = np.nan
+            np.subtract(self.close[1:], self.close[:-1], out=diff[1:])
+            return diff
+        return self.shared('diff', calc)
+
+
+def run_kernel(inputs, specs, blocks):
+    """依序全量計算 specs (需已依賴排序), 結果寫入 blocks[key] 的 (n, 欄數) 區塊 (缺少者自動配置)。
+    依賴若已在 blocks 中則直接取用不重算; 回傳 key -> 增量引擎接續所需的中間序列"""
+    ctx = _Context(inputs, blocks)
+    aux = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for spec in specs:
+            if spec.key not in blocks: blocks[spec.key] = np.empty((ctx.n, len(spec.columns)), order='F')
+            aux[spec.key] = spec.compute(ctx, blocks[spec.key]) or {}
+    return aux
+
+
+def indicator_kernel(close, high, low, volume, out=None):
+    """計算 DEFAULT 全部指標並寫入 (n, len(COLUMNS)) 的輸出區塊 (可傳入預先配置的 out)。
+    同長度的收盤價 SMA (MA20 / BOLL 中軌, MA 與 BIAS) 都取自同一份前綴和"""
+    n = len(close)
+    if out is None: out = np.empty((n, len(COLUMNS)), order='F')  # 欄連續, 各指標整欄寫入
+    blocks = {s.key: out[:, COL[s.columns[0]]:COL[s.columns[0]] + len(s.columns)] for s in DEFAULT}
+    aux = run_kernel((close, high, low, volume), resolve(DEFAULT), blocks)
+    return out, aux
+
+
+def compute_indicators(data, close_col='close', out=None):
+    """DataFrame 介面: 回傳 (指標 DataFrame, 中間序列)"""
+    arrays = [data[c].to_numpy(dtype=float) for c in (close_col, 'high', 'low', 'volume')]
+    block, aux = indicator_kernel(*arrays, out=out)
+    return pd.DataFrame(block, index=data.index, columns=COLUMNS), aux
+
+
+# ---------------------------------------------------------
+# 逐筆狀態 (每根 K 棒 O(1) 更新)
+# ---------------------------------------------------------
+class _Window:
+    """定長滾動視窗: 平移後的累加和/平方和 + NaN 計數, 每 length 筆精確重算一次避免浮點漂移"""
+    __slots__ = ('length', 'buf', 'shift', 's1', 's2', 'nan', 'pushes')
+
+    def __init__(self, length):
+        self.length = length
+        self.buf = deque()
+        self.shift, self.s1, self.s2 = 0.0, 0.0, 0.0
+        self.nan = 0
+        self.pushes = 0
+
+    def push(self, x):
+        buf = self.buf
+        if len(buf) == self.length:
+            old = buf.popleft()
+            if old != old: self.nan -= 1
+            else:
+                d = old - self.shift
+                self.s1 -= d; self.s2 -= d * d
+        buf.append(x)
+        if x != x: self.nan += 1
+        else:
+            d = x - self.shift
+            self.s1 += d; self.s2 += d * d
+        self.pushes += 1
+        if self.pushes >= self.length: self._resync()
+
+    def _resync(self):
+        vals = [x for x in self.buf if x == x]
+        self.shift = vals[-1] if vals else 0.0
+        self.s1 = math.fsum(x - self.shift for x in vals)
+        self.s2 = math.fsum((x - self.shift) ** 2 for x in vals)
+        self.pushes = 0
+
+    def seed(self, values):
+        self.buf = deque(values[-self.length:])
+        self.nan = sum(1 for x in self.buf if x != x)
+        self._resync()
+
+    def mean(self):
+        if len(self.buf) < self.length or self.nan: return NAN
+        return self.shift + self.s1 / self.length
+
+    def std(self):
+        n = self.length
+        if len(self.buf) < n or self.nan or n < 2: return NAN
+        return math.sqrt(max(self.s2 - self.s1 * self.s1 / n, 0.0) / (n - 1))
+
+
+class _Extremum:
+    """滾動最大/最小值 (單調佇列, 攤銷 O(1)), 等同 rolling(length, min_periods=1)"""
+    __slots__ = ('length', 'is_max', 'q', 'i')
+
+    def __init__(self, length, is_max):
+        self.length, self.is_max = length, is_max
+        self.q = deque()
+        self.i = 0
+
+    def push(self, x):
+        i, q = self.i, self.q
+        self.i += 1
+        if x == x:
+            if self.is_max:
+                while q and q[-1][1] <= x: q.pop()
+            else:
+                while q and q[-1][1] >= x: q.pop()
+            q.append((i, x))
+        while q and q[0][0] <= i - self.length: q.popleft()
+        return q[0][1] if q else NAN
+
+
+class _EWM:
+    """逐筆 ewm(...).mean(), 依 pandas 的演算法處理 adjust 與 NaN 權重"""
+    __slots__ = ('alpha', 'adjust', 'minp', 'weighted', 'old_wt', 'nobs')
+
+    def __init__(self, alpha, adjust, minp=1):
+        self.alpha, self.adjust, self.minp = alpha, adjust, max(minp, 1)
+        self.weighted, self.old_wt, self.nobs = NAN, 1.0, 0
+
+    def update(self, x):
+        obs = math.isfinite(x)  # pandas 視窗運算把 ±inf 當成缺值
+        if not obs: x = NAN
+        self.nobs += obs
+        if self.weighted == self.weighted:
+            new_wt = 1.0 if self.adjust else self.alpha
+            self.old_wt *= 1.0 - self.alpha
+            if obs:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + new_wt * x) / (self.old_wt + new_wt)
+                self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        elif obs:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.minp else NAN
+
+    def seed(self, inputs, value):
+        """由輸入序列與最後一筆輸出還原狀態"""
+        obs = np.flatnonzero(np.isfinite(inputs))
+        self.nobs = len(obs)
+        if self.nobs == 0:
+            self.weighted, self.old_wt = NAN, 1.0
+            return
+        q, w = len(inputs) - 1, 1.0 - self.alpha
+        self.weighted = float(value)
+        if self.adjust: self.old_wt = float(np.sum(w ** (q - obs).astype(float)))
+        else: self.old_wt = w ** float(q - obs[-1])
+
+
+class _SeededEMA:
+    """pandas_ta 的 ema: 前 length 筆以 SMA 作為起點, 之後 ewm(span, adjust=False)"""
+    __slots__ = ('length', 'buf', 'ewm')
+
+    def __init__(self, length):
+        self.length = length
+        self.buf = []
+        self.ewm = _EWM(2.0 / (length + 1), adjust=False)
+
+    def update(self, x):
+        if len(self.buf) < self.length:
+            self.buf.append(x)
+            if len(self.buf) < self.length: return NAN
+            vals = [v for v in self.buf if v == v]
+            x = math.fsum(vals) / len(vals) if vals else NAN
+        return self.ewm.update(x)
+
+    def seed(self, inputs, value):
+        if len(inputs) < self.length:
+            self.buf = list(inputs)
+            return
+        self.buf = [NAN] * self.length  # 只用來標記暖機已完成
+        self.ewm.seed(inputs[self.length - 1:], value)
+
+
+# 各指標的逐筆狀態: step(bar, deps) 回傳該根的輸出列, bar = (收, 高, 低, 量, 漲跌, 是否第一根),
+# deps 為依賴指標在同一根的輸出列; seed(inputs, out, aux, deps, q) 以全量結果還原到第 q 根 (含) 之後
+class _SMAState:
+    __slots__ = ('win',)
+
+    def __init__(self, length):
+        self.win = _Window(length)
+
+    def step(self, bar, deps):
+        self.win.push(bar[0])
+        return (self.win.mean(),)
+
+    def seed(self, inputs, out, aux, deps, q):
+        self.win.seed(inputs[0][max(0, q + 1 - self.win.length):q + 1].tolist())
+
+
+class _BollState:
+    __slots__ = ('win', 'mult')
+
+    def __init__(self, length, mult):
+        self.win, self.mult = _Window(length), mult
+
+    def step(self, bar, deps):
+        self.win.push(bar[0])
+        mid, std = deps[0][0], self.win.std()
+        return (mid, std, mid + self.mult * std, mid - self.mult * std)
+
+    def seed(self, inputs, out, aux, deps, q):
+        self.win.seed(inputs[0][max(0, q + 1 - self.win.length):q + 1].tolist())
+
+
+class _MACDState:
+    __slots__ = ('fast', 'slow', 'signal')
+
+    def __init__(self, fast, slow, signal):
+        self.fast, self.slow, self.signal = _SeededEMA(fast), _SeededEMA(slow), _SeededEMA(signal)
+
+    def step(self, bar, deps):
+        macd = self.fast.update(bar[0]) - self.slow.update(bar[0])
+        # 訊號線從 MACD 第一個有效值才開始累計
+        signal = self.signal.update(macd) if (macd == macd or self.signal.buf) else NAN
+        return (macd, macd - signal, signal)
+
+    def seed(self, inputs, out, aux, deps, q):
+        s = slice(0, q + 1)
+        self.fast.seed(inputs[0][s], aux['ema_fast'][q])
+        self.slow.seed(inputs[0][s], aux['ema_slow'][q])
+        macd = out[s, 0]
+        valid = np.flatnonzero(~np.isnan(macd))
+        self.signal.seed(macd[valid[0]:] if len(valid) else macd[:0], out[q, 2])
+
+
+class _KDJState:
+    __slots__ = ('low', 'high', 'k', 'd')
+
+    def __init__(self, length, k_smooth, d_smooth):
+        self.low, self.high = _Extremum(length, False), _Extremum(length, True)
+        self.k, self.d = _EWM(1 / k_smooth, adjust=False), _EWM(1 / d_smooth, adjust=False)
+
+    def step(self, bar, deps):
+        c, h, l = bar[0], bar[1], bar[2]
+        lo, hi = self.low.push(l), self.high.push(h)
+        num, den = c - lo, hi - lo
+        if den != 0: rsv = num / den * 100
+        else: rsv = NAN if (num == 0 or num != num) else math.copysign(math.inf, num)
+        k = self.k.update(rsv)
+        d = self.d.update(k)
+        return (k, d, 3 * k - 2 * d)
+
+    def seed(self, inputs, out, aux, deps, q):
+        s = slice(0, q + 1)
+        for arr, ext in ((inputs[2], self.low), (inputs[1], self.high)):
+            ext.i = max(0, q + 1 - ext.length)
+            for x in arr[ext.i:q + 1].tolist(): ext.push(x)
+        self.k.seed(aux['rsv'][s], out[q, 0])
+        self.d.seed(out[s, 0], out[q, 1])
+
+
+class _RSIState:
+    __slots__ = ('pos', 'neg')
+
+    def __init__(self, length):
+        self.pos, self.neg = _EWM(1 / length, adjust=True, minp=length), _EWM(1 / length, adjust=True, minp=length)
+
+    def step(self, bar, deps):
+        diff = bar[4]
+        pa = self.pos.update(NAN if diff != diff else max(diff, 0.0))
+        na = self.neg.update(NAN if diff != diff else min(diff, 0.0))
+        den = pa + abs(na)
+        return (100 * pa / den if den != 0 else (NAN if pa == 0 or pa != pa else math.copysign(math.inf, pa)),)
+
+    def seed(self, inputs, out, aux, deps, q):
+        diff = np.diff(inputs[0][:q + 1], prepend=np.nan)
+        self.pos.seed(diff, aux['pos'][q])
+        self.neg.seed(diff, aux['neg'][q])
+
+
+class _BiasState:
+    __slots__ = ()
+
+    def step(self, bar, deps):
+        sma = deps[0][0]
+        return ((bar[0] - sma) / sma * 100 if sma != 0 else NAN,)
+
+    def seed(self, inputs, out, aux, deps, q):
+        pass
+
+
+class _OBVState:
+    __slots__ = ('obv',)
+
+    def __init__(self):
+        self.obv = 0.0
+
+    def step(self, bar, deps):
+        diff, v = bar[4], bar[3]
+        if bar[5]: sign = 1.0
+        else: sign = diff if (diff != diff or diff == 0) else math.copysign(1.0, diff)
+        sv = sign * v
+        if sv != sv: return (NAN,)
+        self.obv += sv
+        return (self.obv,)
+
+    def seed(self, inputs, out, aux, deps, q):
+        obv = out[:q + 1, 0]
+        valid = obv[~np.isnan(obv)]
+        self.obv = float(valid[-1]) if len(valid) else 0.0
+
+
+class _WindowOfDep:
+    """依賴指標輸出的滾動平均 (OBV_MA)"""
+    __slots__ = ('win',)
+
+    def __init__(self, length):
+        self.win = _Window(length)
+
+    def step(self, bar, deps):
+        self.win.push(deps[0][0])
+        return (self.win.mean(),)
+
+    def seed(self, inputs, out, aux, deps, q):
+        self.win.seed(deps[0][max(0, q + 1 - self.win.length):q + 1, 0].tolist())
+
+
+class IndicatorEngine:
+    """單一 (ticker, interval) 的增量指標引擎, 每個指標在第一次被要求時才計算並保存。
+    新增 K 棒每根 O(1) 更新; 最後 SNAPSHOTS 根被改寫 (盤中 K 棒) 時從快照回復後重算"""
+
+    SNAPSHOTS = 3
+    BOOTSTRAP_MIN = 200  # 資料少於此長度時直接逐筆計算
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.times = np.empty(0, dtype='int64')
+        self.inputs = np.empty((0, 4))
+        self.specs = []   # 已啟用的指標 (依賴排序)
+        self.blocks = {}  # key -> (容量, 欄數) 輸出區塊
+        self.states = {}  # key -> 逐筆狀態
+        self.snaps = {}   # 位置 p -> {key: 處理第 p 根之前的狀態}
+
+    @property
+    def nbytes(self):
+        """輸入與輸出區塊佔用的位元組數 (供記憶體快取計算預算)"""
+        return self.times.nbytes + self.inputs.nbytes + sum(b.nbytes for b in list(self.blocks.values()))
+
+    def _reserve(self, n):
+        if n <= len(self.inputs): return
+        cap = max(n, 2 * len(self.inputs), 256)
+
+        def grow(arr):
+            grown = np.full((cap, arr.shape[1]), np.nan, order='F')
+            grown[:self.n] = arr[:self.n]
+            return grown
+
+        self.inputs = grow(self.inputs)
+        self.blocks = {k: grow(b) for k, b in self.blocks.items()}
+        times = np.zeros(cap, dtype='int64')
+        times[:self.n] = self.times[:self.n]
+        self.times = times
+
+    def _first_changed(self, times, vals):
+        """回傳需重算的第一個位置; None 代表歷史被改寫, 需全量重建"""
+        m, N = self.n, len(times)
+        if m == 0: return None
+        lo = max(m - self.SNAPSHOTS, 0)
+        anchor = lo - 1
+        if times[0] != self.times[0]: return None
+        if anchor >= 0 and (anchor >= N or times[anchor] != self.times[anchor]
+                            or not np.array_equal(vals[anchor], self.inputs[anchor], equal_nan=True)): return None
+        for p in range(lo, min(m, N)):
+            if times[p] != self.times[p] or not np.array_equal(vals[p], self.inputs[p], equal_nan=True): return p
+        return min(m, N)
+
+    def _replay(self, specs, start):
+        """逐筆計算 specs 的第 start 根到最後一根, 最後幾根前記下快照"""
+        N = self.n
+        if not specs: return
+        for i in range(start, N):
+            if i >= N - self.SNAPSHOTS:
+                snap = self.snaps.setdefault(i, {})
+                for spec in specs: snap[spec.key] = copy.deepcopy(self.states[spec.key])
+            c, h, l, v = self.inputs[i].tolist()
+            diff = c - self.inputs[i - 1, 0] if i else NAN
+            bar = (c, h, l, v, float(diff), i == 0)
+            for spec in specs:
+                deps = [self.blocks[d.key][i].tolist() for d in spec.deps]
+                self.blocks[spec.key][i] = self.states[spec.key].step(bar, deps)
+
+    def _run(self, times, vals, start):
+        N = len(times)
+        self._reserve(N)
+        self.times[start:N] = times[start:]
+        self.inputs[start:N] = vals[start:]
+        self.n = N
+        self._replay(self.specs, start)
+        self.snaps = {p: s for p, s in self.snaps.items() if N - self.SNAPSHOTS <= p < N}
+
+    def _add(self, specs):
+        """啟用新指標: 以融合核心全量算出現有歷史, 還原狀態後逐筆重跑最後幾根以建立快照"""
+        N = self.n
+        for spec in specs:
+            self.blocks[spec.key] = np.full((len(self.inputs), len(spec.columns)), np.nan, order='F')
+            self.states[spec.key] = spec.state()
+        self.specs += specs
+        if N < self.BOOTSTRAP_MIN:
+            self._replay(specs, 0)
+            return
+        q = N - self.SNAPSHOTS - 1
+        inputs = tuple(self.inputs[:N, j].copy() for j in range(4))
+        views = {k: b[:N] for k, b in self.blocks.items()}
+        aux = run_kernel(inputs, specs, views)
+        for spec in specs:
+            deps = [views[d.key] for d in spec.deps]
+            self.states[spec.key].seed(inputs, views[spec.key], aux[spec.key], deps, q)
+        self._replay(specs, q + 1)
+
+    def update(self, data, specs=None, close_col='close', times=None):
+        """data: 含 close/high/low/volume 欄的 K 線; specs: 要取的指標 (預設 DEFAULT)。
+        times: K 棒時間 (預設取 data.index); 回傳對齊 data.index、只含 specs 欄位的 DataFrame"""
+        requested = DEFAULT if specs is None else specs
+        specs = resolve(requested)
+        if close_col != 'close': data = data.assign(close=data[close_col])
+        if times is None:
+            times = data.index.asi8 if isinstance(data.index, pd.DatetimeIndex) else np.asarray(data.index, dtype='int64')
+        times = np.asarray(times, dtype='int64')
+        vals = data[['close', 'high', 'low', 'volume']].to_numpy(dtype=float)
+        with self.lock:
+            p = self._first_changed(times, vals)
+            if p is not None and p < self.n and p not in self.snaps: p = None
+            if p is None:
+                # 歷史被改寫: 只重建這次要求的指標, 其餘等下次被要求時再算
+                self.reset()
+                self._run(times, vals, 0)
+            elif p < len(times) or p < self.n:
+                if p < self.n:
+                    self.states.update(copy.deepcopy(self.snaps[p]))
+                    self.n = p
+                self._run(times, vals, p)
+            missing = [s for s in specs if s.key not in self.states]
+            if missing: self._add(missing)
+            return self._frame(data.index, requested)
+
+    def _frame(self, index, specs):
+        specs = list(dict.fromkeys(specs))
+        if not specs: return pd.DataFrame(index=index)
+        columns = [c for spec in specs for c in spec.columns]
+        block = np.concatenate([self.blocks[spec.key][:self.n] for spec in specs], axis=1)
+        return pd.DataFrame(block, index=index, columns=columns)
+
+
+class EngineRegistry:
+    """(ticker, interval) -> IndicatorEngine; 存在共用記憶體快取中, 被淘汰的引擎下次使用時重新建立"""
+
+    def __init__(self):
+        self._engines = memory.view("engines")
+        self._lock = threading.Lock()
+
+    def get(self, ticker, interval):
+        with self._lock:
+            return self._engines.setdefault((ticker, interval), IndicatorEngine())
+
+    def update(self, ticker, interval, data, specs=None, **kwargs):
+        """get(ticker, interval).update(...), 之後重新量測引擎大小 (K 棒與指標增加時引擎會變大)"""
+        out = self.get(ticker, interval).update(data, specs, **kwargs)
+        self._engines.touch((ticker, interval))
+        return out
+
+
+engines = EngineRegistry()
@@ -0,0 +1,164 @@
+import time
+import pandas as pd
+from ohlcv_store import store
+from finmind import FinMindError
+from chip_store import chips
+from resample import RULES, timeframes
+from indicators import engines, SMA, BOLL, MACD, KDJ, RSI, BIAS, OBV, OBVMA
+from memcache import memory, compact_frame
+from shared_frames import shared
+from metrics import metrics
+from config import CACHE_COMPACT, SHARED_FRAMES
+
+# ---------------------------------------------------------
+# 圖表/策略資料層: app 與背景預熱 (prefetch) 共用同一條載入流程, 預熱結果 app 可直接沿用
+# ---------------------------------------------------------
+INTERVALS = ("1d", *RULES)
+DATA_TTL = 60  # get_data 結果重用的秒數
+STALE_TTL = 5  # 以過期資料算出的結果 (背景補抓中、上游故障) 重用的秒數
+
+
+# --- 籌碼 (FinMind) ---
+@metrics.stage("chips")
+def get_real_chip_data(ticker, start_date_str, stale=True):
+    """「外資買賣超」與「融資餘額增減」: 由本地籌碼倉庫提供, 倉庫只向 FinMind 補抓最後交易日之後的資料。
+    已有本地資料時過期也直接使用, 補抓在背景進行; 本地沒有資料且抓取失敗時丟出 FinMindError, 由呼叫端決定如何呈現"""
+    return chips.range(ticker, start=start_date_str, max_age=3600, stale=stale)
+
+
+# --- K 線 ---
+def load_data(ticker, interval="1d", stale=True):
+    """圖表與策略用的 K 線: 日 K 同步、週期聚合、籌碼合併、time 欄; 無資料回傳 None。
+    stale=True 時載入過的資料過期也直接使用, 補抓在背景進行"""
+    try:
+        # 只維護一份日 K (本地倉庫只補抓最後一根之後的資料), 週/月/季/年 K 由本地聚合
+        # 切換週期時 60 秒內不再碰網路; 過期時先用手上的資料, 補抓在背景進行 (各 session 共用同一個請求)
+        with metrics.stage("load.ohlcv"): daily = store.sync(ticker, "1d", max_age=60, stale=stale)
+        if daily is None or daily.empty: return None
+        with metrics.stage("load.resample"): data = timeframes.get(ticker, interval, daily).copy()
+
+        data = data.dropna(subset=['Open', 'High', 'Low', 'Close'])
+        data.columns = [str(col).lower() for col in data.columns]
+        close_col = 'close' if 'close' in data.columns else 'adj close'
+        if close_col not in data.columns: return None
+
+        if ticker.endswith('.TW') or ticker.endswith('.TWO'):
+            data['volume'] = data['volume'] / 1000
+
+        # --- ★ 真實籌碼資料合併 ---
+        if ticker.endswith('.TW') or ticker.endswith('.TWO'):
+            # 取 K 線圖最舊日期作為 API 抓取起點
+            start_dt_str = data.index.min().strftime('%Y-%m-%d')
+            try:
+                df_chip = get_real_chip_data(ticker, start_dt_str, stale=stale)
+            except FinMindError as e:
+                # 抓取失敗不補 0, 避免 S5 誤判為「籌碼發散」; 缺欄時策略顯示「無籌碼資料」
+                print(f"FinMind Error: {e}")
+                df_chip = None
+            
+            if df_chip is not None: data = merge_chips(data, df_chip)
+        else:
+            data['foreign_buy'] = 0
+            data['margin_diff'] = 0
+        # ----------------------------------------
+        
+        with metrics.stage("load.time_cols"): data = with_time_columns(data)
+        # 資料本身的時間 (日 K 上次與上游同步的時間; 背景補抓中的過期資料為補抓前的時間)
+        if data is not None: data.attrs['as_of'] = store.synced_at(ticker, "1d", daily)
+        return data
+    except Exception as e:
+        print(f"Data Error: {e}")
+        return None
+
+
+def merge_chips(data, df_chip):
+    """K 線左合併籌碼 (兩者皆以日期為 index); 沒有籌碼資料的日子補 0"""
+    # 左合併資料
+    data = data.join(df_chip, how='left')
+    # 填補空值以防程式報錯
+    data['foreign_buy'] = data['foreign_buy'].fillna(0)
+    data['margin_diff'] = data['margin_diff'].fillna(0)
+    return data
+
+
+def with_time_columns(data):
+    """以日期為 index 的 K 線 -> 加上 date_obj / time (秒) 欄並依時間排序; 找不到日期欄回傳 None"""
+    data = data.reset_index()
+    data.columns = [str(col).lower() for col in data.columns]
+    
+    date_col = None
+    for name in ['date', 'datetime', 'timestamp', 'index']:
+        if name in data.columns: date_col = name; break
+    if date_col is None:
+        for col in data.columns:
+            if pd.api.types.is_datetime64_any_dtype(data[col]): date_col = col; break
+    if date_col is None: return None
+        
+    data['date_obj'] = pd.to_datetime(data[date_col])
+    data['time'] = data['date_obj'].astype('int64') // 10**9 
+    data = data.sort_values('time')
+    
+    return data
+
+
+_data = memory.view("data")  # (ticker, interval) -> (as_of, DataFrame); 過期與否以 as_of 判斷
+
+
+@metrics.stage("get_data")
+def get_data(ticker, interval="1d", refresh=False):
+    """load_data 的快取版: DATA_TTL 秒內直接重用 (CACHE_COMPACT 時以精簡格式保存)。
+    SHARED_FRAMES 時結果發佈為同主機各程序共用的唯讀 mmap 檔, 同一時間只有一個程序在載入;
+    否則保存在本程序的記憶體快取, 佔用計入共用預算。
+    兩者的過期時間都以資料本身的時間 (attrs['as_of']) 起算, 不是載入的時間: 以過期資料載入的結果
+    (stale-while-revalidate 補抓中) 不會再被當成新資料重用一整個 DATA_TTL, 只重用 STALE_TTL 秒;
+    補抓完成後很快換成新資料, 上游持續故障時也不會每次呼叫都重新載入、重新發佈。
+    回傳的 DataFrame 由各 session 共用, 不可原地修改; refresh=True 時重新載入"""
+    loaded = []
+
+    def load():
+        loaded.append(True)
+        data = load_data(ticker, interval)
+        if data is None: return None
+        as_of = data.attrs.get('as_of')
+        if CACHE_COMPACT: data = compact_frame(data)
+        now = time.time()
+        # 資料已過期或時間不明 (背景補抓中、上游故障): 結果只再重用 STALE_TTL 秒
+        if as_of is None or now - as_of >= DATA_TTL: as_of = now - DATA_TTL + STALE_TTL
+        data.attrs['as_of'] = as_of
+        return data
+
+    if SHARED_FRAMES:
+        data = shared.publish(ticker, interval, load, max_age=DATA_TTL, refresh=refresh)
+    else:
+        key = (ticker, interval)
+        hit = None if refresh else _data.get(key)
+        data = hit[1] if hit is not None and time.time() - hit[0] < DATA_TTL else None
+        if data is None:
+            data = load()
+            if data is not None: _data[key] = (data.attrs['as_of'], data)
+    metrics.count("data.miss" if loaded else "data.hit")
+    return data
+
+
+# ---------------------------------------------------------
+# 指標 (依勾選狀態按需計算)
+# ---------------------------------------------------------
+# 每個開關對應的指標規格; 引擎以 (ticker, interval, 指標, 參數) 保存, 第一次被要求時才計算
+INDICATOR_SPECS = {
+    'ma': [SMA(5), SMA(10), SMA(20), SMA(60)],
+    'boll': [BOLL()],
+    'macd': [MACD()],
+    'kdj': [KDJ()],
+    'rsi': [RSI(6), RSI(12), RSI(24)],
+    'obv': [OBV(), OBVMA(10)],
+    'bias': [BIAS(6), BIAS(12), BIAS(24)],
+}
+
+
+@metrics.stage("indicators")
+def with_indicators(df, ticker, interval, specs):
+    # 增量引擎: 只有新增/改寫的最後幾根 K 棒需要計算
+    close_col = 'close' if 'close' in df.columns else 'adj close'
+    ind = engines.update(ticker, interval, df, specs, close_col=close_col, times=df['time'].to_numpy())
+    ind.columns = [str(col).lower() for col in ind.columns]
+    return pd.concat([df, ind], axis=1)
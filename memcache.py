@@ -0,0 +1,180 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import CACHE_MAX_MB, CACHE_POLICY
+
+# ---------------------------------------------------------
+# 記憶體快取: 全程序共用一個位元組預算, 超過時依 LRU (最久未用) 或 LFU (最少命中) 淘汰。
+# 各層 (K 線倉庫、籌碼、週期聚合、指標引擎、圖表資料...) 各自取得一個命名空間 view,
+# 用法與 dict 相同; 被淘汰的項目下次取用時由該層重新讀檔或重算
+# ---------------------------------------------------------
+REDUNDANT_COLS = ('date', 'boll_std')  # date_obj/time 已涵蓋原始日期欄; boll_std 只用於算上下軌
+FULL_PRECISION_COLS = ('open', 'high', 'low', 'close', 'adj close', 'volume', 'time')
+
+
+def nbytes(value):
+    """估計值佔用的位元組數 (DataFrame/ndarray 取實際緩衝區大小, 容器遞迴加總)"""
+    if isinstance(value, pd.DataFrame): return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)): return int(value.memory_usage(deep=True))
+    if isinstance(value, (str, bytes)): return sys.getsizeof(value)
+    if isinstance(value, (tuple, list)): return sys.getsizeof(value) + sum(nbytes(v) for v in value)
+    if isinstance(value, dict): return sys.getsizeof(value) + sum(nbytes(k) + nbytes(v) for k, v in value.items())
+    size = getattr(value, 'nbytes', None)  # ndarray, 以及自行提供 nbytes 的物件 (指標引擎、ChartFrame)
+    return int(size) if size is not None else sys.getsizeof(value)
+
+
+def compact_frame(df, columns=None):
+    """快取用的精簡表示: 只留 columns (預設全部) 並去掉冗餘欄; 指標等其餘 float64 欄轉成 float32,
+    價量與時間維持原精度。約為原本的一半大小"""
+    keep = [c for c in (columns if columns is not None else df.columns) if c in df.columns and c not in REDUNDANT_COLS]
+    df = df[keep]
+    narrow = {c: 'float32' for c in keep if c not in FULL_PRECISION_COLS and df[c].dtype == np.float64}
+    return df.astype(narrow) if narrow else df
+
+
+class ByteBudgetCache:
+    """key -> 值, 總大小不超過 budget 位元組; policy 為 'lru' 或 'lfu'。
+    單一值大於預算時不保存 (取用端照常得到結果, 只是不快取)"""
+
+    def __init__(self, budget, policy="lru"):
+        if policy not in ("lru", "lfu"): raise ValueError(f"unknown cache policy: {policy}")
+        self.budget = budget
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (命名空間, key) -> [值, 大小, 寫入時間, 命中次數]; 順序為最近使用
+        self._bytes = 0
+        self._stats = {}  # 命名空間 -> {'hits', 'misses', 'evictions'}
+
+    def view(self, namespace, ttl=None, mutable=False):
+        """namespace 的 dict 介面; ttl 秒後視為未命中; mutable=True 的值取用後可能變大 (如指標引擎), 每次命中重新量測"""
+        return CacheView(self, namespace, ttl, mutable)
+
+    def _count(self, namespace, field, n=1):
+        stats = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'evictions': 0})
+        stats[field] += n
+
+    def get(self, namespace, key, default=None, ttl=None, mutable=False):
+        k = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(k)
+            if entry is not None and ttl is not None and time.monotonic() - entry[2] >= ttl:
+                self._remove(k)
+                entry = None
+            if entry is None:
+                self._count(namespace, 'misses')
+                return default
+            self._count(namespace, 'hits')
+            entry[3] += 1
+            self._entries.move_to_end(k)
+            if mutable: self._resize(k, entry)
+            return entry[0]
+
+    def put(self, namespace, key, value, only_new=False, ttl=None):
+        """寫入並回傳 value; only_new=True 時已有未過期 (寫入未滿 ttl 秒, ttl 為 None 時不過期) 的值則保留舊值並回傳它"""
+        size = nbytes(value)
+        k = (namespace, key)
+        with self._lock:
+            old = self._entries.get(k)
+            if only_new and old is not None and (ttl is None or time.monotonic() - old[2] < ttl): return old[0]
+            if old is not None: self._remove(k)
+            if size > self.budget: return value
+            self._entries[k] = [value, size, time.monotonic(), old[3] if old is not None else 0]
+            self._bytes += size
+            self._evict(keep=k)
+        return value
+
+    def pop(self, namespace, key, default=None):
+        with self._lock:
+            entry = self._remove((namespace, key))
+        return entry[0] if entry is not None else default
+
+    def clear(self, namespace=None):
+        with self._lock:
+            for k in [k for k in self._entries if namespace is None or k[0] == namespace]: self._remove(k)
+
+    def touch(self, namespace, key):
+        """重新量測已存在項目的大小 (值被原地修改後呼叫), 不計入命中"""
+        k = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(k)
+            if entry is not None: self._resize(k, entry)
+
+    def keys(self, namespace):
+        with self._lock:
+            return [k[1] for k in self._entries if k[0] == namespace]
+
+    def _remove(self, k):
+        entry = self._entries.pop(k, None)
+        if entry is not None: self._bytes -= entry[1]
+        return entry
+
+    def _resize(self, k, entry):
+        size = nbytes(entry[0])
+        self._bytes += size - entry[1]
+        entry[1] = size
+        self._evict(keep=k)
+
+    def _evict(self, keep=None):
+        while self._bytes > self.budget and len(self._entries) > (keep is not None):
+            candidates = (k for k in self._entries if k != keep)
+            if self.policy == "lru": victim = next(candidates)
+            else: victim = min(candidates, key=lambda k: self._entries[k][3])  # 同命中數時 min 取最久未用者
+            self._remove(victim)
+            self._count(victim[0], 'evictions')
+
+    def stats(self):
+        """{'bytes', 'budget', 'entries', 'policy', 'namespaces': {名稱: {hits, misses, evictions, entries, bytes}}}"""
+        with self._lock:
+            spaces = {ns: dict(s, entries=0, bytes=0) for ns, s in self._stats.items()}
+            for (ns, _), entry in self._entries.items():
+                s = spaces.setdefault(ns, {'hits': 0, 'misses': 0, 'evictions': 0, 'entries': 0, 'bytes': 0})
+                s['entries'] += 1
+                s['bytes'] += entry[1]
+            return {'bytes': self._bytes, 'budget': self.budget, 'entries': len(self._entries), 'policy': self.policy, 'namespaces': spaces}
+
+
+class CacheView:
+    """ByteBudgetCache 中單一命名空間的 dict 介面 (get / [] / setdefault / pop / in / len), 另有 touch 重新量測"""
+
+    def __init__(self, cache, namespace, ttl=None, mutable=False):
+        self.cache = cache
+        self.namespace = namespace
+        self.ttl = ttl
+        self.mutable = mutable
+
+    def get(self, key, default=None):
+        return self.cache.get(self.namespace, key, default, self.ttl, self.mutable)
+
+    def __getitem__(self, key):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing: raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.cache.put(self.namespace, key, value)
+
+    def setdefault(self, key, value):
+        hit = self.get(key)
+        return hit if hit is not None else self.cache.put(self.namespace, key, value, only_new=True, ttl=self.ttl)
+
+    def pop(self, key, default=None):
+        return self.cache.pop(self.namespace, key, default)
+
+    def touch(self, key):
+        self.cache.touch(self.namespace, key)
+
+    def __contains__(self, key):
+        return key in self.cache.keys(self.namespace)
+
+    def __len__(self):
+        return len(self.cache.keys(self.namespace))
+
+    def clear(self):
+        self.cache.clear(self.namespace)
+
+
+memory = ByteBudgetCache(CACHE_MAX_MB * 2**20, CACHE_POLICY)
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from memcache import memory
+from config import METRICS_LOG, METRICS_PORT
+
+# ---------------------------------------------------------
+# 各階段耗時與事件計數: 全程序累計 (供 Prometheus 抓取) + 每次 rerun 的明細 (供除錯面板與結構化日誌)。
+# 用法: with metrics.stage("get_data"): ...   或   @metrics.stage("indicators")
+#       metrics.count("chart.payload_bytes", n)
+# app 每輪開頭 begin_run()、結尾 end_run(); 其間同一執行緒記錄的階段與計數都歸入該輪。
+# 背景執行緒 (預熱、背景補抓) 不屬於任何一輪, 只計入累計值
+# ---------------------------------------------------------
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # 秒, Prometheus histogram 上界
+
+
+class _Stage(ContextDecorator):
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def _recreate_cm(self):
+        # 當 decorator 用時每次呼叫各自一份 (起始時間、層數), 多執行緒與遞迴呼叫互不干擾
+        return _Stage(self.metrics, self.name)
+
+    def __enter__(self):
+        local = self.metrics._local
+        self._depth = getattr(local, 'depth', 0)
+        local.depth = self._depth + 1
+        self._t = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._t
+        self.metrics._local.depth = self._depth
+        self.metrics.record(self.name, elapsed, self._depth, started=self._t)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}  # 名稱 -> [次數, 總秒數, 最大秒數, 各 bucket 次數]
+        self._counters = {}  # 名稱 -> 累計值
+        self._local = threading.local()  # depth: 巢狀層數; run: 目前這輪的明細 (None = 不在 rerun 中)
+        self._server = None
+
+    def stage(self, name):
+        """計時區塊 (context manager 或 decorator); 巢狀使用時明細會縮排顯示"""
+        return _Stage(self, name)
+
+    def record(self, name, seconds, depth=0, started=None):
+        with self._lock:
+            s = self._stages.get(name)
+            if s is None: s = self._stages[name] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+            s[0] += 1
+            s[1] += seconds
+            s[2] = max(s[2], seconds)
+            for i, le in enumerate(BUCKETS):
+                if seconds <= le: s[3][i] += 1
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            if started is None: started = time.perf_counter() - seconds
+            run['stages'].append((name, started - run['start'], seconds, depth))
+
+    def count(self, name, n=1):
+        with self._lock: self._counters[name] = self._counters.get(name, 0) + n
+        run = getattr(self._local, 'run', None)
+        if run is not None: run['counters'][name] = run['counters'].get(name, 0) + n
+
+    # --- 每次 rerun 的明細 ---
+    def begin_run(self, **labels):
+        """開始記錄本執行緒這一輪; labels (如 ticker, interval) 一併寫入日誌"""
+        self._local.run = {'start': time.perf_counter(), 'ts': time.time(), 'labels': labels, 'stages': [], 'counters': {}}
+        self._local.depth = 0
+
+    def label(self, **labels):
+        run = getattr(self._local, 'run', None)
+        if run is not None: run['labels'].update(labels)
+
+    def current_run(self):
+        """目前這一輪到此為止的明細 {'ts', 'total', 'labels', 'stages', 'counters'}; 不在 rerun 中回傳 None。
+        stages 為 [(名稱, 開始 (距本輪開頭秒數), 秒, 層數)], 依開始時間排序"""
+        run = getattr(self._local, 'run', None)
+        if run is None: return None
+        return {'ts': run['ts'], 'total': time.perf_counter() - run['start'], 'labels': dict(run['labels']),
+                'stages': sorted(run['stages'], key=lambda s: s[1]), 'counters': dict(run['counters'])}
+
+    def end_run(self):
+        """結束這一輪並回傳明細 (同 current_run); 設定 METRICS_LOG 時寫一行 JSON"""
+        run = self.current_run()
+        self._local.run = None
+        if run is None: return None
+        self.record("rerun", run['total'])
+        if METRICS_LOG: self._log(run)
+        return run
+
+    def _log(self, run):
+        line = json.dumps({'ts': round(run['ts'], 3), 'total_ms': round(run['total'] * 1e3, 2), **run['labels'],
+                           'stages': [{'name': n, 'start_ms': round(t * 1e3, 2), 'ms': round(s * 1e3, 2), 'depth': d}
+                                      for n, t, s, d in run['stages']],
+                           'counters': run['counters']}, ensure_ascii=False)
+        try:
+            if METRICS_LOG == "-":
+                print(line, flush=True)
+            else:
+                with self._lock, open(METRICS_LOG, "a", encoding="utf-8") as f: f.write(line + "\n")
+        except OSError as e:
+            print(f"Metrics Log Error: {e}")
+
+    # --- 累計值與匯出 ---
+    def snapshot(self):
+        """{'stages': {名稱: {'count', 'total', 'max'}}, 'counters': {名稱: 值}}"""
+        with self._lock:
+            return {'stages': {n: {'count': s[0], 'total': s[1], 'max': s[2]} for n, s in self._stages.items()},
+                    'counters': dict(self._counters)}
+
+    def prometheus(self):
+        """Prometheus text exposition 格式: 階段耗時 histogram、事件計數與記憶體快取狀態"""
+        with self._lock:
+            stages = {n: (s[0], s[1], list(s[3])) for n, s in sorted(self._stages.items())}
+            counters = sorted(self._counters.items())
+        out = ["# HELP app_stage_seconds Time spent in each app stage.", "# TYPE app_stage_seconds histogram"]
+        for name, (count, total, buckets) in stages.items():
+            out += [f'app_stage_seconds_bucket{{stage="{name}",le="{le}"}} {n}' for le, n in zip(BUCKETS, buckets)]
+            out += [f'app_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}',
+                    f'app_stage_seconds_sum{{stage="{name}"}} {total}', f'app_stage_seconds_count{{stage="{name}"}} {count}']
+        out += ["# HELP app_events_total Counted events (cache loads, payload bytes, ...).", "# TYPE app_events_total counter"]
+        out += [f'app_events_total{{name="{name}"}} {value}' for name, value in counters]
+        cache = memory.stats()
+        out += ["# TYPE app_cache_bytes gauge", f"app_cache_bytes {cache['bytes']}",
+                "# TYPE app_cache_budget_bytes gauge", f"app_cache_budget_bytes {cache['budget']}"]
+        for field in ('hits', 'misses', 'evictions'):
+            out.append(f"# TYPE app_cache_{field}_total counter")
+            out += [f'app_cache_{field}_total{{namespace="{ns}"}} {s[field]}' for ns, s in sorted(cache['namespaces'].items())]
+        return "\n".join(out) + "\n"
+
+    def serve(self, port=METRICS_PORT):
+        """在背景執行緒提供 GET /metrics; 每個程序只啟動一次, port 為 0 時不啟動。回傳是否啟動了新的服務"""
+        with self._lock:
+            if self._server is not None or not port: return False
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = metrics.prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            try:
+                self._server = ThreadingHTTPServer(("", port), Handler)
+            except OSError as e:
+                # 同一主機多個副本共用設定時, 只有第一個程序取得 port
+                print(f"Metrics Server Error: {e}")
+                self._server = False
+                return False
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return True
+
+
+metrics = Metrics()
@@ -0,0 +1,164 @@
+import math
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from config import DATA_DIR
+from fileio import atomic_write
+from background import revalidate
+from memcache import memory
+from metrics import metrics
+from providers import provider as default_provider
+
+# ---------------------------------------------------------
+# 本地 K 線倉庫 (Parquet, 每個 ticker/interval 一個分區檔)
+# ---------------------------------------------------------
+def normalize_ohlcv(data):
+    """整理 yfinance 回傳格式: 攤平 MultiIndex、去時區、欄位首字大寫、依時間排序"""
+    if data is None or data.empty: return pd.DataFrame()
+    data = data.copy()
+    if isinstance(data.columns, pd.MultiIndex): data.columns = data.columns.get_level_values(0)
+    data.index = pd.DatetimeIndex(data.index).tz_localize(None).astype('datetime64[ns]')
+    data.index.name = 'Date'
+    data.columns = [str(c).capitalize() for c in data.columns]
+    data = data[~data.index.duplicated(keep='last')]
+    return data.sort_index()
+
+
+def _adjustment_shifted(stored, fresh):
+    """重疊區段 (不含最後一根可能未收盤的 K 棒) 收盤價不一致 -> 上游做了除權息/分割還原, 需整段重抓"""
+    common = stored.index[:-1].intersection(fresh.index)
+    if len(common) == 0 or 'Close' not in stored.columns or 'Close' not in fresh.columns: return False
+    a = stored.loc[common, 'Close'].to_numpy(dtype=float)
+    b = fresh.loc[common, 'Close'].to_numpy(dtype=float)
+    return not np.allclose(a, b, rtol=1e-6, atol=0, equal_nan=True)
+
+
+class OHLCVStore:
+    """保存完整歷史, 每次只向上游補抓最後一根之後的 K 棒再寫回 (跨程序重啟仍有效)"""
+
+    def __init__(self, root=None, provider=None):
+        self.root = root or os.path.join(DATA_DIR, "ohlcv")
+        self.provider = provider or default_provider
+        self.fetch = metrics.stage("fetch.ohlcv")(self.provider.ohlcv)  # (ticker, interval, start) -> 上游原始 DataFrame
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._hot = memory.view("ohlcv")  # (ticker, interval) -> (同步時間, DataFrame), 供短時間內重複請求直接取用
+
+    def path(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker.replace(os.sep, '_')}.parquet")
+
+    def tickers(self, interval="1d"):
+        """本地已有資料的 ticker 清單"""
+        d = os.path.join(self.root, interval)
+        if not os.path.isdir(d): return []
+        return sorted(f[:-len(".parquet")] for f in os.listdir(d) if f.endswith(".parquet"))
+
+    def _lock(self, ticker, interval):
+        with self._guard:
+            return self._locks.setdefault((ticker, interval), threading.Lock())
+
+    def read(self, ticker, interval):
+        p = self.path(ticker, interval)
+        if not os.path.exists(p): return None
+        try:
+            return pd.read_parquet(p)
+        except Exception as e:
+            print(f"Store Read Error ({p}): {e}")
+            return None
+
+    def read_columns(self, ticker, interval, columns):
+        """只讀指定欄位成 numpy 陣列 (時間索引放在 'Date' 鍵), 不建立 DataFrame; 供選股等大量批次讀取"""
+        p = self.path(ticker, interval)
+        if not os.path.exists(p): return None
+        try:
+            f = pq.ParquetFile(p)
+            meta = f.schema_arrow.pandas_metadata or {}
+            index_col = next((c for c in meta.get('index_columns', []) if isinstance(c, str)), None)
+            names = [c for c in columns if c in f.schema_arrow.names and c != index_col]
+            if index_col is not None: names.append(index_col)
+            table = f.read(columns=names)
+            out = {c: table.column(c).to_numpy() for c in names}
+            if index_col is not None: out['Date'] = out.pop(index_col)
+            return out
+        except Exception as e:
+            print(f"Store Read Error ({p}): {e}")
+            return None
+
+    def write(self, ticker, interval, data):
+        # 先寫暫存檔再 rename, 讀取端不會看到寫一半的檔案
+        with atomic_write(self.path(ticker, interval)) as tmp: data.to_parquet(tmp)
+
+    def sync(self, ticker, interval="1d", max_age=0, stale=False):
+        """補齊本地資料後回傳完整歷史; 上游失敗時退回本地既有資料。
+        max_age 秒內已同步過則直接回傳記憶體中的副本, 不碰網路。
+        stale=True 時, 載入過的資料 (記憶體或本地檔) 即使過期也立即回傳, 補抓改在背景進行;
+        只有本地完全沒有資料才等待上游。同一 (ticker, interval) 同時只會有一個上游請求, 其他呼叫者等它的結果"""
+        key = (ticker, interval)
+        lock = self._lock(ticker, interval)
+        hot = self._hot.get(key)
+        if hot is not None and max_age and time.monotonic() - hot[0] < max_age: return hot[1]
+        if stale:
+            if hot is None:
+                stored = self.read(ticker, interval)
+                # 本地檔視為已過期: 先回傳, 背景補齊
+                if stored is not None and not stored.empty: hot = self._hot.setdefault(key, (-math.inf, stored))
+            if hot is not None:
+                revalidate(lock, lambda: self._refresh(ticker, interval), f"{ticker} {interval}")
+                return hot[1]
+        with lock:
+            hot = self._hot.get(key)
+            if hot is not None and max_age and time.monotonic() - hot[0] < max_age: return hot[1]
+            return self._refresh(ticker, interval)
+
+    def synced_at(self, ticker, interval, data):
+        """data (sync 的回傳值) 上次與上游同步的時間 (time.time() 秒); 只從本地檔載入而本程序尚未同步成功時,
+        以檔案修改時間 (上次實際寫入) 代替。記憶體副本已被換成較新的資料時回傳 None"""
+        hot = self._hot.get((ticker, interval))
+        if hot is None or hot[1] is not data: return None
+        if hot[0] == -math.inf:
+            try:
+                return os.path.getmtime(self.path(ticker, interval))
+            except OSError:
+                return None
+        return time.time() - (time.monotonic() - hot[0])
+
+    def _refresh(self, ticker, interval):
+        """與上游同步並更新記憶體副本; 呼叫端需持有該 (ticker, interval) 的鎖"""
+        key = (ticker, interval)
+        hot = self._hot.get(key)
+        data = self._sync(ticker, interval, hot[1] if hot is not None else None)
+        if data is not None: self._hot[key] = (time.monotonic(), data)
+        return data
+
+    def _sync(self, ticker, interval, stored=None):
+        if stored is None: stored = self.read(ticker, interval)
+        if stored is None or stored.empty:
+            fresh = normalize_ohlcv(self.fetch(ticker, interval, None))
+            if fresh.empty: return None
+            self.write(ticker, interval, fresh)
+            return fresh
+
+        # 從倒數第 2 根開始重抓: 最後一根可能是盤中未收盤的 K 棒, 倒數第 2 根用來偵測還原價位移
+        overlap_start = stored.index[-min(2, len(stored))]
+        try:
+            fresh = normalize_ohlcv(self.fetch(ticker, interval, overlap_start))
+        except Exception as e:
+            print(f"Store Sync Error ({ticker} {interval}): {e}")
+            return stored
+        if fresh.empty: return stored
+
+        if _adjustment_shifted(stored, fresh):
+            full = normalize_ohlcv(self.fetch(ticker, interval, None))
+            if full.empty: return stored
+            self.write(ticker, interval, full)
+            return full
+
+        merged = pd.concat([stored[stored.index < fresh.index[0]], fresh])
+        self.write(ticker, interval, merged)
+        return merged
+
+
+store = OHLCVStore()
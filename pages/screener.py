@@ -0,0 +1,87 @@
+import time
+import streamlit as st
+from ohlcv_store import store
+from strategies import STRATEGY_TITLES, screen
+from backtest import backtest, strategy_names
+from chip_market import market_chips
+from universe import universe
+
+# ---------------------------------------------------------
+# 五大策略選股 (讀本地 K 線倉庫, 整個面板一次向量化判斷)
+# 只掃描本地已有日 K 的個股; 上市櫃全部需先以 python -m universe --backfill 補齊
+# ---------------------------------------------------------
+st.set_page_config(layout="wide", page_title="五大策略選股")
+st.markdown("### 🧭 五大策略選股")
+
+MARKETS = {"全部": None, "台股(市)": ".TW", "台股(櫃)": ".TWO", "美股": ""}
+
+
+def market_of(ticker):
+    if ticker.endswith('.TWO'): return ".TWO"
+    if ticker.endswith('.TW'): return ".TW"
+    return ""
+
+
+with st.sidebar:
+    scope = st.radio("範圍", ["上市櫃全部", "本地全部", "自選清單"], index=1, horizontal=True)
+    if scope == "上市櫃全部":
+        market = st.radio("市場", [m for m, s in MARKETS.items() if s != ""], horizontal=True)
+    elif scope == "本地全部":
+        market = st.radio("市場", list(MARKETS), index=1, horizontal=True)
+    else:
+        watchlist = st.text_area("代碼 (空白或逗號分隔, 需含 .TW/.TWO 後綴)", value="2330.TW 2317.TW 2454.TW AAPL NVDA")
+    interval_label = st.radio("週期", ["日K", "週K", "月K"], index=0, horizontal=True)
+    only_hits = st.checkbox("只顯示有觸發的個股", value=True)
+    use_chips = st.checkbox("S5 使用全市場籌碼 (python -m chip_market 匯入)", value=True)
+
+interval = {"日K": "1d", "週K": "1wk", "月K": "1mo"}[interval_label]
+
+if scope == "上市櫃全部":
+    tickers = universe.tickers(MARKETS[market])
+    if not tickers: st.warning("尚未匯入上市櫃清單: 請先執行 python -m universe --backfill")
+elif scope == "本地全部":
+    tickers = store.tickers("1d")
+    if MARKETS[market] is not None: tickers = [t for t in tickers if market_of(t) == MARKETS[market]]
+else:
+    tickers = [t.strip().upper() for t in watchlist.replace(',', ' ').split() if t.strip()]
+
+missing = universe.missing(tickers) if scope != "本地全部" else []
+st.caption(f"共 {len(tickers)} 檔 (只掃描本地倉庫已有日 K 的個股, 不會連網補抓)")
+if missing:
+    st.warning(f"{len(missing)} 檔本地尚無日 K, 不列入掃描與回測: {' '.join(missing[:20])}{' ...' if len(missing) > 20 else ''}"
+               " (python -m universe --backfill 補齊上市櫃, 或先於個股頁開啟)")
+
+c_scan, c_bt = st.columns(2)
+run_scan = c_scan.button("開始掃描", type="primary")
+run_bt = c_bt.button("歷史回測 (完整歷史)")
+
+if run_scan:
+    t0 = time.perf_counter()
+    chip_day, chips = market_chips.for_tickers(tickers) if use_chips else (None, None)
+    res = screen(tickers, interval=interval, chips=chips if chip_day is not None else None)
+    elapsed = time.perf_counter() - t0
+    if use_chips: st.caption(f"籌碼日期: {chip_day:%Y-%m-%d}" if chip_day is not None else "本地尚無全市場籌碼, S5 不列入")
+    if only_hits: res = res[res['hits'] > 0]
+    st.caption(f"掃描 {len(tickers) - len(missing)} 檔, 耗時 {elapsed:.2f} 秒, 符合 {len(res)} 檔")
+    st.dataframe(
+        res.rename(columns=STRATEGY_TITLES),
+        hide_index=True,
+        width="stretch",
+        column_config={"date": st.column_config.DateColumn("日期"), "close": st.column_config.NumberColumn("收盤", format="%.2f"), "hits": st.column_config.NumberColumn("觸發數")},
+    )
+
+if run_bt:
+    t0 = time.perf_counter()
+    stats = backtest(tickers, interval=interval)
+    with_chips = int(stats.loc[stats['strategy'] == 'S5', 'tickers'].max()) if len(stats) else 0
+    st.caption(f"回測 {len(tickers) - len(missing)} 檔完整歷史, 耗時 {time.perf_counter() - t0:.2f} 秒"
+               f" (S5 以本地逐日籌碼回測, {with_chips} 檔有籌碼歷史; python -m chip_market 匯入)")
+    stats = stats.assign(strategy=strategy_names(stats))
+    for col in ('avg_return', 'hit_rate', 'avg_drawdown', 'max_drawdown'): stats[col] = stats[col] * 100
+    st.dataframe(stats, hide_index=True, width="stretch", column_config={
+        "strategy": "策略", "horizon": st.column_config.NumberColumn("持有K棒"), "tickers": "檔數", "signals": "訊號數", "trades": "已完成",
+        "avg_return": st.column_config.NumberColumn("平均報酬", format="%.2f%%"),
+        "hit_rate": st.column_config.NumberColumn("勝率", format="%.1f%%"),
+        "avg_drawdown": st.column_config.NumberColumn("平均回撤", format="%.2f%%"),
+        "max_drawdown": st.column_config.NumberColumn("最大回撤", format="%.2f%%"),
+    })
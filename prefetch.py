@@ -0,0 +1,162 @@
+import atexit
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from config import DATA_DIR, PREFETCH_TOP_N, PREFETCH_WATCHLIST, PREFETCH_WORKERS
+from fileio import atomic_write
+from ohlcv_store import store
+from chip_store import chips
+from finmind import FinMindError
+from market_data import INTERVALS, INDICATOR_SPECS, get_data, with_indicators
+from strategies import STRATEGY_INDICATORS
+
+# ---------------------------------------------------------
+# 背景預熱: 啟動時與各市場收盤後, 在執行緒池中跑一遍 app 的載入流程
+# (日 K 同步、籌碼、各週期聚合、策略與預設指標), 使用者第一次開啟時直接命中快取
+# ---------------------------------------------------------
+# 市場 -> (時區, 收盤時間); 收盤後再等 SETTLE 讓上游資料定稿
+MARKETS = {
+    'TWSE': (ZoneInfo("Asia/Taipei"), (13, 30)),
+    'NYSE': (ZoneInfo("America/New_York"), (16, 0)),
+}
+SETTLE = timedelta(minutes=15)
+WARM_INDICATORS = ('ma', 'boll', 'macd', 'kdj', 'rsi')  # app 預設勾選的指標
+
+
+def market(ticker):
+    return 'TWSE' if ticker.endswith('.TW') or ticker.endswith('.TWO') else 'NYSE'
+
+
+def next_close(mkt, after):
+    """after 之後 mkt 的下一次收盤 + SETTLE (含時區的 datetime); 只略過週末, 不含國定假日"""
+    tz, (hour, minute) = MARKETS[mkt]
+    after = after.astimezone(tz)
+    day = after.date()
+    while True:
+        t = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz) + SETTLE
+        if t > after and t.weekday() < 5: return t
+        day += timedelta(days=1)
+
+
+class AccessStats:
+    """各 ticker 的瀏覽次數, 保存在 {DATA_DIR}/access.json (跨重啟保留), 供預熱挑選熱門 ticker"""
+
+    def __init__(self, path=None, flush_every=60):
+        self.path = path or os.path.join(DATA_DIR, "access.json")
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._counts = None
+        self._dirty = False
+        self._flushed = time.monotonic()
+
+    def _load(self):
+        if self._counts is not None: return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._counts = {str(k): int(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            self._counts = {}
+
+    def record(self, ticker):
+        with self._lock:
+            self._load()
+            self._counts[ticker] = self._counts.get(ticker, 0) + 1
+            self._dirty = True
+            if time.monotonic() - self._flushed >= self.flush_every: self._flush()
+
+    def top(self, n):
+        with self._lock:
+            self._load()
+            return sorted(self._counts, key=self._counts.get, reverse=True)[:n]
+
+    def flush(self):
+        with self._lock: self._flush()
+
+    def _flush(self):
+        self._flushed = time.monotonic()
+        if not self._dirty: return
+        try:
+            with atomic_write(self.path) as tmp, open(tmp, "w", encoding="utf-8") as f: json.dump(self._counts, f)
+            self._dirty = False
+        except OSError as e:
+            print(f"Access Stats Error: {e}")
+
+
+class Prefetcher:
+    """觀察清單 + 最熱門 top_n 檔, 最多 workers 檔同時預熱; 同一檔已在佇列中不會重複排入"""
+
+    def __init__(self, stats, watchlist=(), top_n=10, workers=2):
+        self.stats = stats
+        self.watchlist = list(watchlist)
+        self.top_n = top_n
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._pool = None
+
+    def tickers(self):
+        return list(dict.fromkeys([*self.watchlist, *self.stats.top(self.top_n)]))
+
+    def warm(self, ticker):
+        """在背景執行緒中等上游同步完成, 再以 app 相同的流程建立各週期資料與預設指標"""
+        store.sync(ticker, "1d", max_age=60)
+        if market(ticker) == 'TWSE':
+            try:
+                chips.sync(ticker, max_age=3600)
+            except FinMindError as e:
+                print(f"Prefetch Chip Error ({ticker}): {e}")
+        specs = STRATEGY_INDICATORS + [spec for name in WARM_INDICATORS for spec in INDICATOR_SPECS[name]]
+        for interval in INTERVALS:
+            data = get_data(ticker, interval, refresh=True)
+            if data is not None: with_indicators(data, ticker, interval, specs)
+
+    def _run(self, ticker):
+        try:
+            self.warm(ticker)
+        except Exception as e:
+            print(f"Prefetch Error ({ticker}): {e}")
+        finally:
+            with self._lock: self._pending.discard(ticker)
+
+    def submit(self, tickers):
+        """排入預熱; 回傳實際排入的 ticker"""
+        out = []
+        with self._lock:
+            if self._pool is None: return out
+            for t in tickers:
+                if t in self._pending: continue
+                self._pending.add(t)
+                self._pool.submit(self._run, t)
+                out.append(t)
+        return out
+
+    def start(self):
+        """每個程序只啟動一次 (重複呼叫無作用): 立即預熱一輪, 之後每個市場收盤後重新整理該市場的 ticker"""
+        with self._lock:
+            if self._pool is not None or self.workers <= 0: return False
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+        self.submit(self.tickers())
+        threading.Thread(target=self._schedule, name="prefetch-scheduler", daemon=True).start()
+        return True
+
+    def _schedule(self):
+        last = {m: datetime.now(timezone.utc) for m in MARKETS}
+        while True:
+            due = {m: next_close(m, last[m]) for m in MARKETS}
+            mkt = min(due, key=due.get)
+            wait = (due[mkt] - datetime.now(timezone.utc)).total_seconds()
+            # 分段等待: 系統休眠或時鐘調整後仍能在收盤後觸發
+            if wait > 0:
+                time.sleep(min(wait, 600))
+                continue
+            last[mkt] = datetime.now(timezone.utc)  # 錯過多次收盤 (例如休眠) 也只補一輪
+            self.submit([t for t in self.tickers() if market(t) == mkt])
+
+
+access_stats = AccessStats()
+atexit.register(access_stats.flush)
+prefetcher = Prefetcher(access_stats, PREFETCH_WATCHLIST, PREFETCH_TOP_N, PREFETCH_WORKERS)
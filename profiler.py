@@ -0,0 +1,131 @@
+import contextlib
+import html
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from config import DATA_DIR
+
+# ---------------------------------------------------------
+# 單次 rerun 的取樣剖析 (不需額外套件): 背景執行緒每 interval 秒讀一次目標執行緒的呼叫堆疊,
+# 累計成 folded stacks ("外層;...;內層 次數", flamegraph.pl / speedscope 可直接讀入), 並可畫成 SVG 火焰圖。
+# 只在除錯面板要求時對一次 rerun 開啟, 平常沒有任何負擔
+# ---------------------------------------------------------
+class SamplingProfiler:
+    """對 thread_id (預設為呼叫 start() 的執行緒) 取樣。root 為檔案路徑時, 堆疊從第一個位於該檔的框架開始
+    (略過 streamlit 執行腳本的外層), 該檔的框架全部離開 (腳本已結束或 st.stop()) 時自動停止;
+    最長取樣 limit 秒, 避免忘了停止"""
+
+    def __init__(self, root=None, interval=0.005, limit=60):
+        self.root = os.path.abspath(root) if root else None
+        self.interval, self.limit = interval, limit
+        self.counts = Counter()  # 堆疊 (外層 -> 內層的框架名稱 tuple) -> 取樣次數
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        self._target = thread_id or threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="rerun-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止取樣並回傳 counts"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread(): self._thread.join()
+        return self.counts
+
+    def _run(self):
+        deadline = time.monotonic() + self.limit
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self._target)
+            if frame is None: break
+            stack = self._stack(frame)
+            if stack is None: break
+            self.counts[stack] += 1
+
+    def _stack(self, frame):
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        if self.root is not None:
+            start = next((i for i, f in enumerate(frames) if f.f_code.co_filename == self.root), None)
+            if start is None: return None
+            frames = frames[start:]
+        # metrics.stage 當 decorator 時多出的 contextlib 框架不顯示
+        return tuple(_label(f.f_code) for f in frames if f.f_code.co_filename != contextlib.__file__)
+
+
+def _label(code):
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def folded(counts):
+    return "".join(f"{';'.join(stack)} {n}\n" for stack, n in sorted(counts.items()))
+
+
+def top_functions(counts, n=20):
+    """[(框架, 自身取樣數, 含子呼叫取樣數)], 依自身取樣數排序"""
+    own, total = Counter(), Counter()
+    for stack, c in counts.items():
+        own[stack[-1]] += c
+        for name in set(stack): total[name] += c
+    return [(name, c, total[name]) for name, c in own.most_common(n)]
+
+
+def flame_svg(counts, width=1200, row=16, interval=None):
+    """folded stacks -> 自含的 SVG 火焰圖 (外層在下, 寬度正比於取樣數, 滑鼠停留顯示框架與佔比)"""
+    tree = {}  # 名稱 -> [取樣數, 子節點]
+    for stack, c in counts.items():
+        level = tree
+        for name in stack:
+            node = level.setdefault(name, [0, {}])
+            node[0] += c
+            level = node[1]
+    total = sum(counts.values())
+    if not total: return f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{row}"></svg>'
+
+    rects, depth = [], [0]
+
+    def layout(level, x, d):
+        depth[0] = max(depth[0], d + 1)
+        for name, (c, children) in sorted(level.items()):
+            rects.append((name, c, x, d))
+            layout(children, x, d + 1)
+            x += c
+
+    layout(tree, 0, 0)
+    height = depth[0] * row
+    unit = f" ({interval * 1e3:g} ms)" if interval else ""
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">']
+    for name, c, x, d in rects:
+        w = c / total * width
+        if w < 0.5: continue
+        hue = zlib.crc32(name.split(" (")[0].encode()) % 40  # 同名函式同色, 紅~橙
+        label = html.escape(name)
+        text = label if len(name) * 7 < w - 4 else (html.escape(name[:int((w - 4) / 7) - 2]) + ".." if w > 30 else "")
+        out.append(f'<g><title>{label}: {c} samples{unit}, {c / total:.1%}</title>'
+                   f'<rect x="{x / total * width:.1f}" y="{height - (d + 1) * row}" width="{w:.1f}" height="{row - 1}" '
+                   f'fill="hsl({hue},80%,60%)"/>'
+                   + (f'<text x="{x / total * width + 2:.1f}" y="{height - d * row - 4}">{text}</text>' if text else "")
+                   + '</g>')
+    out.append("</svg>")
+    return "".join(out)
+
+
+def save_profile(counts, name, directory=None):
+    """把 folded stacks 與火焰圖存到 {DATA_DIR}/profiles/{時間}_{name}.folded / .svg; 回傳 folded 檔路徑 (失敗回傳 None)"""
+    directory = directory or os.path.join(DATA_DIR, "profiles")
+    base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{name.replace(os.sep, '_')}")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(base + ".folded", "w", encoding="utf-8") as f: f.write(folded(counts))
+        with open(base + ".svg", "w", encoding="utf-8") as f: f.write(flame_svg(counts))
+    except OSError as e:
+        print(f"Profile Error: {e}")
+        return None
+    return base + ".folded"
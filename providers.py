@@ -0,0 +1,96 @@
+import math
+import os
+import threading
+import pandas as pd
+from config import DATA_PROVIDER, PROVIDER_DIR
+from fileio import atomic_write
+from finmind import FinMindClient, Quota, RecordingSession, ReplaySession, client as finmind_client
+
+# ---------------------------------------------------------
+# 資料來源 (provider): K 線與籌碼的上游介面, 本地倉庫 (ohlcv_store / chip_store) 只透過它抓資料。
+#   live   - yfinance + FinMind (預設)
+#   record - 同 live, 並把每次回應存到 PROVIDER_DIR 當作重播用的 fixture
+#   replay - 只讀 PROVIDER_DIR 中錄製好的 fixture, 完全不連網 (壓測、離線展示)
+# yfinance 匯入要數百 ms, 延到第一次向上游抓 K 線時才匯入, 不拖慢程序啟動
+# fixture 版面: {dir}/ohlcv/{interval}/{ticker}.parquet (yfinance 原始欄位 Open/High/..., 以日期為 index)
+#              {dir}/finmind/*.json (finmind.RecordingSession 格式)
+# ---------------------------------------------------------
+class Provider:
+    """ohlcv: (ticker, interval, start) -> DataFrame (start 為 None 時為全部歷史, 否則為 start 當天起);
+    chip_records: [(dataset, params), ...] -> 同順序的 FinMind data list, 失敗者為該 Exception"""
+
+    def ohlcv(self, ticker, interval, start=None):
+        raise NotImplementedError
+
+    def chip_records(self, queries):
+        raise NotImplementedError
+
+
+class LiveProvider(Provider):
+    def __init__(self, client=None):
+        self.client = client or finmind_client
+
+    def ohlcv(self, ticker, interval, start=None):
+        import yfinance as yf
+        if start is None:
+            return yf.download(ticker, period="max", interval=interval, progress=False)
+        return yf.download(ticker, start=start.strftime('%Y-%m-%d'), interval=interval, progress=False)
+
+    def chip_records(self, queries):
+        return self.client.get_many(queries)
+
+
+def _ohlcv_fixture(directory, ticker, interval):
+    return os.path.join(directory, "ohlcv", interval, f"{ticker.replace(os.sep, '_')}.parquet")
+
+
+class ReplayProvider(Provider):
+    """從 directory 的 fixture 讀取; 沒有錄到的 ticker 回傳空表 (與上游查無資料相同), 籌碼則為 FinMindError"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.client = FinMindClient(session=ReplaySession(os.path.join(directory, "finmind")), retries=0,
+                                    quota=Quota(limit=math.inf))
+
+    def ohlcv(self, ticker, interval, start=None):
+        p = _ohlcv_fixture(self.directory, ticker, interval)
+        if not os.path.exists(p): return pd.DataFrame()
+        data = pd.read_parquet(p)
+        return data if start is None else data[data.index >= pd.Timestamp(start)]
+
+    def chip_records(self, queries):
+        return self.client.get_many(queries)
+
+
+class RecordingProvider(LiveProvider):
+    """向 provider (預設 live) 抓取並錄製到 directory; K 線合併進既有 fixture, 重播時可涵蓋多次增量抓取"""
+
+    def __init__(self, directory, provider=None):
+        super().__init__(FinMindClient(session=RecordingSession(os.path.join(directory, "finmind"))))
+        self.directory = directory
+        self.provider = provider or LiveProvider()
+        self._lock = threading.Lock()
+
+    def ohlcv(self, ticker, interval, start=None):
+        data = self.provider.ohlcv(ticker, interval, start)
+        if data is None or data.empty: return data
+        if isinstance(data.columns, pd.MultiIndex): data = data.set_axis(data.columns.get_level_values(0), axis=1)
+        p = _ohlcv_fixture(self.directory, ticker, interval)
+        with self._lock:
+            if start is not None and os.path.exists(p):
+                old = pd.read_parquet(p)
+                merged = pd.concat([old[old.index < data.index[0]], data])
+            else:
+                merged = data
+            with atomic_write(p) as tmp: merged.to_parquet(tmp)
+        return data
+
+
+def make_provider(kind=DATA_PROVIDER, directory=PROVIDER_DIR):
+    if kind == "live": return LiveProvider()
+    if kind == "replay": return ReplayProvider(directory)
+    if kind == "record": return RecordingProvider(directory)
+    raise ValueError(f"unknown data provider: {kind}")
+
+
+provider = make_provider()
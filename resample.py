@@ -0,0 +1,63 @@
+import threading
+import pandas as pd
+from memcache import memory
+
+# ---------------------------------------------------------
+# 多週期 K 線: 由同一份日 K 在本地聚合出週/月/季/年 K
+# ---------------------------------------------------------
+# interval -> (resample 規則, 額外參數, 對應的 Period 頻率)
+# 週/月 K 以區間起始日為標記 (與 yfinance 相同), 季/年 K 沿用原本的 QE/YE 區間結束日標記
+RULES = {
+    "1wk": ("W-MON", {"label": "left", "closed": "left"}, "W-SUN"),
+    "1mo": ("MS", {}, "M"),
+    "3mo": ("QE", {}, "Q"),
+    "1y": ("YE", {}, "Y"),
+}
+
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def resample_ohlcv(daily, interval):
+    """把日 K 聚合成指定週期; 1d 直接回傳"""
+    if interval == "1d" or daily is None or daily.empty: return daily
+    rule, kwargs, _ = RULES[interval]
+    agg = {c: OHLCV_AGG.get(c, 'last') for c in daily.columns}
+    out = daily.resample(rule, **kwargs).agg(agg)
+    return out.dropna(subset=[c for c in ('Open', 'High', 'Low', 'Close') if c in out.columns])
+
+
+class TimeframeCache:
+    """快取各週期聚合結果; 有新日 K 時只重算最後一個 (可能未完成的) 週期區間"""
+
+    def __init__(self):
+        self._entries = memory.view("timeframes")  # (ticker, interval) -> (聚合結果, 來源最後時間, 來源首筆收盤, 來源最後一根)
+        self._lock = threading.Lock()
+
+    def get(self, ticker, interval, daily):
+        if interval == "1d" or daily is None or daily.empty: return daily
+        key = (ticker, interval)
+        with self._lock:
+            entry = self._entries.get(key)
+        anchor = float(daily['Close'].iloc[0])
+        last_ts = daily.index[-1]
+        last_row = daily.iloc[-1]
+
+        if entry is not None and entry[2] == anchor and entry[1] <= last_ts:
+            agg, src_last, _, src_row = entry
+            # 盤中最後一根日 K 會被改寫, 時間相同但數值不同時也要重算
+            # Series.equals 把同位置的 NaN 視為相同 (== 遇到 NaN 永遠不相等, 每次都會重算)
+            if src_last == last_ts and src_row.equals(last_row) and len(agg): return agg
+            # 從來源最後一根所屬週期的起點開始重算, 之前已完成的週期直接沿用
+            period_start = src_last.to_period(RULES[interval][2]).start_time
+            tail = resample_ohlcv(daily[daily.index >= period_start], interval)
+            agg = pd.concat([agg[agg.index < tail.index[0]], tail]) if len(tail) else agg
+        else:
+            # 首次建立, 或歷史被改寫 (還原價調整/重新下載)
+            agg = resample_ohlcv(daily, interval)
+
+        with self._lock:
+            self._entries[key] = (agg, last_ts, anchor, last_row)
+        return agg
+
+
+timeframes = TimeframeCache()
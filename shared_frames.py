@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+from config import DATA_DIR
+from fileio import atomic_write
+
+try:
+    import fcntl  # 跨程序鎖; Windows 沒有, 退化成各程序各自載入
+except ImportError:
+    fcntl = None
+
+# ---------------------------------------------------------
+# 跨程序共用的計算結果: 同一台主機上多個 app 程序 (負載平衡後的多個副本)
+# 把 get_data 的 (ticker, interval) 結果寫成 Arrow IPC 檔, 其他程序以唯讀 mmap 直接使用,
+# 不反序列化、不各自持有一份複本 (資料頁由作業系統的頁快取共用)。
+# 更新時寫到暫存檔再 os.replace 原子替換: 讀者看到的永遠是完整的舊檔或新檔,
+# 已映射舊檔的讀者在解除映射前照常使用舊內容
+# ---------------------------------------------------------
+FORMAT = 1  # 檔案版面版本; 變更欄位編碼方式時遞增, 舊版面的檔案視為不存在
+
+
+class SharedFrames:
+    """(ticker, interval) -> 唯讀 DataFrame, 存於 {root}/{interval}/{ticker}.arrow。
+    檔案 schema metadata 記錄: format, version (每次發佈遞增), written (發佈時間), as_of (資料時間), ticker, interval, index。
+    檔案修改時間為 as_of, 年齡 (max_age) 以資料本身計算"""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(DATA_DIR, "frames")
+        self._lock = threading.Lock()
+        self._maps = {}  # 路徑 -> ((inode, mtime_ns), DataFrame); 映射不佔私有記憶體, 檔案數即上限
+
+    def path(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker.replace(os.sep, '_')}.arrow")
+
+    def _stat(self, p):
+        try:
+            return os.stat(p)
+        except OSError:
+            return None
+
+    def get(self, ticker, interval, max_age=None):
+        """已發佈的 DataFrame (欄位皆為唯讀 mmap 視圖); 不存在或超過 max_age 秒回傳 None"""
+        p = self.path(ticker, interval)
+        st = self._stat(p)
+        if st is None: return None
+        if max_age is not None and time.time() - st.st_mtime >= max_age: return None
+        sig = (st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            hit = self._maps.get(p)
+            if hit is not None and hit[0] == sig: return hit[1]
+        try:
+            df = self._map(p)
+        except (OSError, pa.ArrowException, ValueError, KeyError) as e:
+            print(f"Shared Frame Error ({ticker} {interval}): {e}")
+            return None
+        if df is None: return None
+        with self._lock: self._maps[p] = (sig, df)
+        return df
+
+    def metadata(self, ticker, interval):
+        """檔案的 metadata (dict); 不存在回傳 None"""
+        try:
+            with pa.memory_map(self.path(ticker, interval), 'r') as src:
+                meta = pa.ipc.open_file(src).schema.metadata or {}
+        except (OSError, pa.ArrowException):
+            return None
+        return {k.decode(): json.loads(v) for k, v in meta.items()}
+
+    def _map(self, p):
+        reader = pa.ipc.open_file(pa.memory_map(p, 'r'))
+        meta = reader.schema.metadata or {}
+        if json.loads(meta.get(b'format', b'0')) != FORMAT: return None
+        # split_blocks: 每欄各自一個 block, 無 null 的數值欄直接指向映射區, 不複製
+        df = reader.read_all().to_pandas(split_blocks=True)
+        index = json.loads(meta[b'index'])
+        if index is not None: df.index = range(*index)
+        return df
+
+    def put(self, ticker, interval, df, as_of=None):
+        """發佈 df (原子替換舊檔); 回傳新版本號。RangeIndex 以外的索引不保存 (讀回為 0..n-1)。
+        as_of: 資料本身的時間 (time.time() 秒), 檔案修改時間設為它, get 的 max_age 即以資料年齡計算; 省略為發佈時間"""
+        p = self.path(ticker, interval)
+        old = self.metadata(ticker, interval) or {}
+        version = old.get('version', 0) + 1
+        index = [df.index.start, df.index.stop, df.index.step] if isinstance(df.index, pd.RangeIndex) else None
+        written = time.time()
+        as_of = written if as_of is None else min(as_of, written)
+        meta = {'format': FORMAT, 'version': version, 'written': written, 'as_of': as_of,
+                'ticker': ticker, 'interval': interval, 'index': index}
+        # NaN 保留為浮點值 (不轉成 Arrow null), 讀回時才能零複製
+        table = pa.table({str(c): pa.array(df[c].to_numpy()) for c in df.columns},
+                         metadata={k: json.dumps(v) for k, v in meta.items()})
+        with atomic_write(p) as tmp:
+            with pa.OSFile(tmp, 'wb') as f, pa.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table)
+            os.utime(tmp, (written, as_of))
+        return version
+
+    def publish(self, ticker, interval, load, max_age=None, refresh=False):
+        """跨程序只讓一個程序執行 load() 並發佈, 其他程序等它完成後直接映射結果。
+        未 refresh 時已有 max_age 秒內的檔案就直接使用; refresh=True 時只接受本次呼叫之後才發佈的檔案。
+        load() 回傳的 DataFrame 可在 attrs['as_of'] 標記資料本身的時間, 以過期資料算出的結果發佈後即視為過期。
+        load() 回傳 None 時不發佈並回傳 None; 發佈失敗 (例如磁碟已滿) 時回傳 load() 的原始結果"""
+        started = time.time()
+        if not refresh:
+            df = self.get(ticker, interval, max_age)
+            if df is not None: return df
+        with self._flock(ticker, interval):
+            st = self._stat(self.path(ticker, interval))
+            if st is not None and (st.st_ctime >= started if refresh else max_age is None or time.time() - st.st_mtime < max_age):
+                df = self.get(ticker, interval)  # 等鎖期間另一個程序已發佈
+                if df is not None: return df
+            data = load()
+            if data is None: return None
+            try:
+                self.put(ticker, interval, data, as_of=data.attrs.get('as_of'))
+            except (OSError, pa.ArrowException, TypeError) as e:
+                print(f"Shared Frame Error ({ticker} {interval}): {e}")
+                return data
+            # 本程序也改用映射版本, 私有的 data 交給 GC
+            df = self.get(ticker, interval)
+            return df if df is not None else data
+
+    def _flock(self, ticker, interval):
+        return _FileLock(self.path(ticker, interval) + ".lock")
+
+
+class _FileLock:
+    """fcntl.flock 互斥鎖 (同一程序內的不同執行緒也互斥); 沒有 fcntl 時不鎖"""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        if fcntl is None: return self
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._f = open(self.path, "a")
+        fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+shared = SharedFrames()
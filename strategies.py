@@ -0,0 +1,285 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from indicators import SMA, BOLL, KDJ
+from ohlcv_store import store
+from resample import resample_ohlcv
+
+# ---------------------------------------------------------
+# 五大策略: 單一個股判斷 + 面板 (ticker × time) 向量化選股
+# ---------------------------------------------------------
+# 策略只用到 MA20/60/120、BOLL 與 KD
+STRATEGY_INDICATORS = [SMA(20), SMA(60), SMA(120), BOLL(), KDJ()]
+STRATEGY_TITLES = {'S1': '1. 盤整帶量突破', 'S2': '2. 均線黃金交叉', 'S3': '3. 布林通道擠壓', 'S4': '4. KD低檔金叉', 'S5': '5. 主力籌碼集中'}
+MIN_BARS = 30
+OHLCV_COLS = ['Open', 'High', 'Low', 'Close', 'Volume']
+LOOKBACK = 260  # 面板保留的 K 棒數: MA120 為精確值, KD 的起始值影響 (2/3)^n 已可忽略
+
+
+def check_5_strategies(df):
+    if len(df) < 30: return {}
+    curr = df.iloc[-1]
+    prev = df.iloc[-2]
+    results = {}
+    
+    # S1: 帶量突破
+    past_20 = df.iloc[-21:-1]
+    box_high = past_20['high'].max()
+    box_low = past_20['low'].min()
+    amp = (box_high - box_low) / box_low
+    vol_ma5 = df['volume'].iloc[-6:-1].mean()
+    if vol_ma5 == 0: vol_ma5 = 1
+    
+    cond1_box = amp < 0.15
+    cond1_break = curr['close'] > box_high
+    cond1_vol = curr['volume'] > (vol_ma5 * 2)
+    if cond1_box and cond1_break and cond1_vol: results['S1'] = {'active': True, 'msg': '🚀 帶量突破'}
+    elif not cond1_box: results['S1'] = {'active': False, 'msg': '波動過大'}
+    else: results['S1'] = {'active': False, 'msg': '整理中'}
+
+    # S2: 黃金交叉
+    cond2_cross = (prev['ma20'] < prev['ma60']) and (curr['ma20'] > curr['ma60'])
+    cond2_trend = curr['close'] > curr['ma120']
+    if cond2_cross and cond2_trend: results['S2'] = {'active': True, 'msg': '🌟 黃金交叉'}
+    elif curr['ma20'] > curr['ma60']: results['S2'] = {'active': False, 'msg': '多頭排列'}
+    else: results['S2'] = {'active': False, 'msg': '空頭/整理'}
+
+    # S3: 布林擠壓
+    bw = (curr['boll_upper'] - curr['boll_lower']) / curr['boll_mid']
+    cond3_squeeze = bw < 0.10
+    cond3_break = curr['close'] > curr['boll_upper']
+    if cond3_squeeze and cond3_break: results['S3'] = {'active': True, 'msg': '💥 擠壓噴出'}
+    elif cond3_squeeze: results['S3'] = {'active': False, 'msg': '壓縮蓄力'}
+    else: results['S3'] = {'active': False, 'msg': '通道張開'}
+
+    # S4: KD低檔金叉
+    cond4_low = curr['k'] < 20
+    cond4_cross = (prev['k'] < prev['d']) and (curr['k'] > curr['d'])
+    if cond4_low and cond4_cross: results['S4'] = {'active': True, 'msg': '🎣 低檔金叉'}
+    elif curr['k'] < 20: results['S4'] = {'active': False, 'msg': '超賣鈍化'}
+    else: results['S4'] = {'active': False, 'msg': '一般區間'}
+    
+    # S5: 主力籌碼集中 (外資真實買超 + 融資真實減少)
+    if 'margin_diff' in df.columns and 'foreign_buy' in df.columns:
+        cond5_margin = curr['margin_diff'] < 0  # 融資減少代表散戶退場
+        cond5_foreign = curr['foreign_buy'] > 0 # 外資大於零代表大戶進場
+        
+        if cond5_margin and cond5_foreign: 
+            results['S5'] = {'active': True, 'msg': '🔥 籌碼集中'}
+        elif cond5_margin: 
+            results['S5'] = {'active': False, 'msg': '散戶退場'}
+        elif cond5_foreign: 
+            results['S5'] = {'active': False, 'msg': '法人單買'}
+        else: 
+            results['S5'] = {'active': False, 'msg': '籌碼發散'}
+    else:
+        results['S5'] = {'active': False, 'msg': '無籌碼資料'}
+        
+    return results
+
+
+# ---------------------------------------------------------
+# 面板指標: 沿時間軸 (axis=1) 向量化, 一次算完所有 ticker
+# 各列靠右對齊, 歷史較短的 ticker 左側補 NaN
+# ---------------------------------------------------------
+def _shift(x, k=1):
+    out = np.full_like(x, np.nan)
+    out[:, k:] = x[:, :-k]
+    return out
+
+
+def _prefix(x):
+    """NaN 視為 0 的前綴和與非 NaN 個數前綴和 (沿 axis=1, 左側補 0)"""
+    valid = ~np.isnan(x)
+    ps = np.zeros((x.shape[0], x.shape[1] + 1))
+    np.cumsum(np.where(valid, x, 0.0), axis=1, out=ps[:, 1:])
+    pc = np.zeros(ps.shape, dtype=np.int64)
+    np.cumsum(valid, axis=1, out=pc[:, 1:])
+    return ps, pc
+
+
+def _rolling_mean(x, n):
+    """rolling(n).mean(): 視窗未滿或含 NaN 為 NaN"""
+    ps, pc = _prefix(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] < n: return out
+    full = pc[:, n:] - pc[:, :-n] == n
+    out[:, n - 1:] = np.where(full, (ps[:, n:] - ps[:, :-n]) / n, np.nan)
+    return out
+
+
+def _rolling_nanmean(x, n):
+    """最近 n 根略過 NaN 的平均 (全為 NaN 時為 NaN)"""
+    ps, pc = _prefix(x)
+    hi = np.arange(1, x.shape[1] + 1)
+    lo = np.maximum(hi - n, 0)
+    cnt = pc[:, hi] - pc[:, lo]
+    with np.errstate(invalid='ignore'):
+        return np.where(cnt > 0, (ps[:, hi] - ps[:, lo]) / cnt, np.nan)
+
+
+def _rolling_extremum(x, n, is_max):
+    """rolling(n, min_periods=1).max()/min(), 以倍增視窗組合"""
+    op = np.fmax if is_max else np.fmin
+    T = x.shape[1]
+    acc, width = np.concatenate([np.full((x.shape[0], n - 1), np.nan), x], axis=1), 1
+    while width * 2 <= n:
+        acc = op(acc[:, :-width], acc[:, width:])
+        width *= 2
+    rest = n - width
+    return op(acc[:, :T], acc[:, rest:rest + T]) if rest else acc[:, :T]
+
+
+def _rolling_std(x, n, mean):
+    """rolling(n).std(), 以視窗均值置中計算 (逐一累加視窗內各位置, 記憶體只需 O(ticker × time))"""
+    out = np.full(x.shape, np.nan)
+    T = x.shape[1]
+    if T < n: return out
+    m = mean[:, n - 1:]
+    acc = np.zeros(m.shape)
+    for j in range(n):
+        dev = x[:, j:j + T - n + 1] - m
+        acc += dev * dev
+    out[:, n - 1:] = np.sqrt(acc / (n - 1))
+    return out
+
+
+def _ewm(x, alpha):
+    """ewm(alpha, adjust=False).mean() 沿時間軸; pandas 對二維資料逐欄在 C 層遞迴, 不需逐根 Python 迴圈"""
+    return pd.DataFrame(x.T).ewm(alpha=alpha, adjust=False).mean().to_numpy().T
+
+
+def panel_indicators(close, high, low):
+    """策略所需指標 (與 STRATEGY_INDICATORS 相同定義), 輸入輸出皆為 (ticker, time) 陣列"""
+    length, mult = BOLL().params
+    kd_len, k_smooth, d_smooth = KDJ().params
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ma = {n: _rolling_mean(close, n) for n in {20, 60, 120, length}}
+        mid = ma[length]
+        std = _rolling_std(close, length, mid)
+        lo, hi = _rolling_extremum(low, kd_len, False), _rolling_extremum(high, kd_len, True)
+        k = _ewm((close - lo) / (hi - lo) * 100, 1 / k_smooth)
+        return {
+            'ma20': ma[20], 'ma60': ma[60], 'ma120': ma[120],
+            'boll_mid': mid, 'boll_upper': mid + mult * std, 'boll_lower': mid - mult * std,
+            'k': k, 'd': _ewm(k, 1 / d_smooth),
+        }
+
+
+def panel_conditions(close, high, low, volume, margin_diff=None, foreign_buy=None):
+    """每根 K 棒的五大策略條件 (布林陣列, 與 check_5_strategies 相同定義)。
+    margin_diff / foreign_buy 可為 (ticker, time) 陣列; 未提供或兩者皆 NaN 視為無籌碼資料 (S5 不觸發, 與個股頁缺籌碼欄時相同)"""
+    ind = panel_indicators(close, high, low)
+    missing = np.full(close.shape, np.nan)
+    margin = missing if margin_diff is None else np.broadcast_to(margin_diff, close.shape)
+    foreign = missing if foreign_buy is None else np.broadcast_to(foreign_buy, close.shape)
+    prev = lambda name: _shift(ind[name])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        box_high = _shift(_rolling_extremum(high, 20, True))
+        box_low = _shift(_rolling_extremum(low, 20, False))
+        vol_ma5 = _shift(_rolling_nanmean(volume, 5))
+        vol_ma5 = np.where(vol_ma5 == 0, 1.0, vol_ma5)
+        bw = (ind['boll_upper'] - ind['boll_lower']) / ind['boll_mid']
+        c = {
+            'valid': np.cumsum(~np.isnan(close), axis=1) >= MIN_BARS,
+            's1_box': (box_high - box_low) / box_low < 0.15,
+            's1_break': close > box_high,
+            's1_vol': volume > vol_ma5 * 2,
+            's2_cross': (prev('ma20') < prev('ma60')) & (ind['ma20'] > ind['ma60']),
+            's2_trend': close > ind['ma120'],
+            's2_bull': ind['ma20'] > ind['ma60'],
+            's3_squeeze': bw < 0.10,
+            's3_break': close > ind['boll_upper'],
+            's4_low': ind['k'] < 20,
+            's4_cross': (prev('k') < prev('d')) & (ind['k'] > ind['d']),
+            's5_data': ~(np.isnan(margin) & np.isnan(foreign)),
+            's5_margin': margin < 0,
+            's5_foreign': foreign > 0,
+        }
+    c['S1'] = c['s1_box'] & c['s1_break'] & c['s1_vol']
+    c['S2'] = c['s2_cross'] & c['s2_trend']
+    c['S3'] = c['s3_squeeze'] & c['s3_break']
+    c['S4'] = c['s4_low'] & c['s4_cross']
+    c['S5'] = c['s5_margin'] & c['s5_foreign']
+    return c
+
+
+def _messages(c):
+    """最後一根的條件 -> 與個股頁相同的狀態文字"""
+    last = {k: v[:, -1] for k, v in c.items()}
+    return {
+        'S1': np.select([last['S1'], ~last['s1_box']], ['🚀 帶量突破', '波動過大'], '整理中'),
+        'S2': np.select([last['S2'], last['s2_bull']], ['🌟 黃金交叉', '多頭排列'], '空頭/整理'),
+        'S3': np.select([last['S3'], last['s3_squeeze']], ['💥 擠壓噴出', '壓縮蓄力'], '通道張開'),
+        'S4': np.select([last['S4'], last['s4_low']], ['🎣 低檔金叉', '超賣鈍化'], '一般區間'),
+        'S5': np.select([~last['s5_data'], last['S5'], last['s5_margin'], last['s5_foreign']],
+                        ['無籌碼資料', '🔥 籌碼集中', '散戶退場', '法人單買'], '籌碼發散'),
+    }
+
+
+# ---------------------------------------------------------
+# 選股: 從本地倉庫讀取面板 -> 一次向量化判斷
+# ---------------------------------------------------------
+def _read_bars(source, ticker, interval, lookback):
+    """最後 lookback 根 K 棒 (None 為全部) -> {'Date', 'Open', 'High', 'Low', 'Close', 'Volume': 陣列}; 日 K 直接讀欄位不經 DataFrame"""
+    if interval == "1d":
+        bars = source.read_columns(ticker, "1d", OHLCV_COLS)
+        if not bars or 'Date' not in bars or 'Close' not in bars: return None
+    else:
+        data = source.read(ticker, "1d")
+        if data is None or data.empty: return None
+        data = resample_ohlcv(data, interval)
+        bars = {'Date': data.index.to_numpy(), **{c: data[c].to_numpy() for c in OHLCV_COLS if c in data.columns}}
+    ok = np.ones(len(bars['Date']), dtype=bool)
+    for c in ('Open', 'High', 'Low', 'Close'):
+        if c in bars: ok &= ~np.isnan(bars[c].astype(float))
+    idx = np.flatnonzero(ok)
+    if lookback is not None: idx = idx[-lookback:]
+    return {c: v[idx] for c, v in bars.items()} if len(idx) else None
+
+
+def load_panel(tickers, interval="1d", lookback=LOOKBACK, source=None, workers=8, dates=False):
+    """讀取本地倉庫 (不連網) 各 ticker 最後 lookback 根 K 棒 (None 為全部), 組成靠右對齊的 (ticker, time) 陣列。
+    回傳 (有資料的 tickers, {'close'/'high'/'low'/'volume': 陣列}, 各 ticker 最後日期);
+    dates=True 時面板另含各 K 棒日期 'date' (datetime64, 左側補 NaT), 供對齊逐日籌碼"""
+    source = source or store
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(lambda t: _read_bars(source, t, interval, lookback), tickers))
+    kept = [(t, f) for t, f in zip(tickers, frames) if f is not None]
+    N = len(kept)
+    if lookback is None: lookback = max((len(f['Date']) for _, f in kept), default=0)
+    panel = {c: np.full((N, lookback), np.nan) for c in ('close', 'high', 'low', 'volume')}
+    if dates: panel['date'] = np.full((N, lookback), np.datetime64('NaT'), dtype='datetime64[ns]')
+    last_dates = []
+    for i, (ticker, bars) in enumerate(kept):
+        m = len(bars['Date'])
+        for c in panel:
+            col = c.capitalize()
+            if col in bars: panel[c][i, lookback - m:] = bars[col]
+        # 與個股頁相同, 台股成交量以張為單位
+        if ticker.endswith('.TW') or ticker.endswith('.TWO'): panel['volume'][i] /= 1000
+        last_dates.append(pd.Timestamp(bars['Date'][-1]))
+    return [t for t, _ in kept], panel, last_dates
+
+
+def screen(tickers, interval="1d", chips=None, lookback=LOOKBACK, source=None):
+    """對一批 ticker 跑五大策略, 回傳依觸發數排序的結果表。
+    chips: 以 ticker 為索引、含 margin_diff / foreign_buy 欄的最新籌碼 (選用); 不在 chips 中的 ticker S5 為「無籌碼資料」"""
+    names, panel, last_dates = load_panel(list(dict.fromkeys(tickers)), interval, lookback, source)
+    cols = ['ticker', 'date', 'close', 'hits', *STRATEGY_TITLES]
+    if not names: return pd.DataFrame(columns=cols)
+    margin = foreign = None
+    if chips is not None:
+        chips = chips.reindex(names)
+        # 整列缺籌碼保留 NaN; 只缺一欄時補 0 (與個股頁合併籌碼後補 0 相同)
+        has = chips[['margin_diff', 'foreign_buy']].notna().any(axis=1).to_numpy()[:, None]
+        margin = np.where(has, chips['margin_diff'].fillna(0).to_numpy(dtype=float)[:, None], np.nan)
+        foreign = np.where(has, chips['foreign_buy'].fillna(0).to_numpy(dtype=float)[:, None], np.nan)
+    c = panel_conditions(panel['close'], panel['high'], panel['low'], panel['volume'], margin, foreign)
+    msgs = _messages(c)
+    valid = c['valid'][:, -1]
+    hits = sum(c[s][:, -1].astype(int) for s in STRATEGY_TITLES)
+    res = pd.DataFrame({'ticker': names, 'date': last_dates, 'close': panel['close'][:, -1], 'hits': hits, **msgs})
+    # 與個股頁相同: K 棒不足 MIN_BARS 根不判斷
+    res = res[valid].sort_values(['hits', 'ticker'], ascending=[False, True])
+    return res[cols].reset_index(drop=True)
@@ -0,0 +1,130 @@
+"""台股上市櫃股票清單 (全市場選股範圍) 與日 K 批次補齊
+
+    python -m universe                                   # 更新清單 (FinMind TaiwanStockInfo)
+    python -m universe --backfill [--market .TW]         # 更新清單後把清單內所有股票的日 K 補進本地倉庫
+    python -m universe --replay fixtures/finmind         # 清單改用錄製的回應 (K 線依 DATA_PROVIDER)
+
+選股只讀本地倉庫, 清單內本地尚無日 K 的股票不會被掃描; 首次使用或新股上市後需跑一次 --backfill
+"""
+import argparse
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from config import DATA_DIR
+from fileio import atomic_write
+from finmind import FinMindClient, Quota, RecordingSession, ReplaySession, client as finmind_client
+from ohlcv_store import store as ohlcv_store
+
+# ---------------------------------------------------------
+# 股票清單: {DATA_DIR}/universe.parquet (ticker, stock_id, name, market, industry)
+# 只收四碼普通股與 ETF (排除權證、特別股等), 上市加 .TW、上櫃加 .TWO
+# ---------------------------------------------------------
+STOCK_INFO = "TaiwanStockInfo"
+SUFFIX = {'twse': '.TW', 'tpex': '.TWO'}
+COLUMNS = ['ticker', 'stock_id', 'name', 'market', 'industry']
+
+
+def universe_frame(records):
+    """TaiwanStockInfo 原始資料 -> 每檔一列的清單 (同一股票可能因多個產業別出現多次)"""
+    if not records: return pd.DataFrame(columns=COLUMNS)
+    df = pd.DataFrame(records)
+    df = df[df['type'].isin(list(SUFFIX)) & df['stock_id'].astype(str).str.fullmatch(r"\d{4}")]
+    df = df.drop_duplicates('stock_id', keep='first')
+    out = pd.DataFrame({
+        'stock_id': df['stock_id'].astype(str),
+        'name': df.get('stock_name', pd.Series('', index=df.index)).astype(str),
+        'market': df['type'].map(SUFFIX),
+        'industry': df.get('industry_category', pd.Series('', index=df.index)).astype(str),
+    })
+    out.insert(0, 'ticker', out['stock_id'] + out['market'])
+    return out.sort_values('ticker').reset_index(drop=True)[COLUMNS]
+
+
+class Universe:
+    """讀取只碰本地檔; 只有 refresh / backfill 會連網"""
+
+    def __init__(self, path=None, client=None, store=None):
+        self.path = path or os.path.join(DATA_DIR, "universe.parquet")
+        self.client = client or finmind_client
+        self.store = store or ohlcv_store
+
+    def read(self):
+        if not os.path.exists(self.path): return pd.DataFrame(columns=COLUMNS)
+        try:
+            return pd.read_parquet(self.path)
+        except Exception as e:
+            print(f"Universe Read Error ({self.path}): {e}")
+            return pd.DataFrame(columns=COLUMNS)
+
+    def refresh(self):
+        """向 FinMind 重抓清單並寫回; 失敗時丟出 FinMindError, 本地既有清單不變"""
+        df = universe_frame(self.client.get(STOCK_INFO))
+        with atomic_write(self.path) as tmp: df.to_parquet(tmp, index=False)
+        return df
+
+    def tickers(self, market=None):
+        """清單內的 ticker; market 為 '.TW' / '.TWO' 時只取該市場"""
+        df = self.read()
+        if market is not None: df = df[df['market'] == market]
+        return df['ticker'].tolist()
+
+    def missing(self, tickers, interval="1d"):
+        """tickers 中本地倉庫尚無 K 線者 (選股不會掃描)"""
+        have = set(self.store.tickers(interval))
+        return [t for t in tickers if t not in have]
+
+    def backfill(self, tickers, interval="1d", workers=4, progress=None):
+        """把 tickers 的 K 線同步進本地倉庫 (已有的只補抓最新一段); 回傳 {'synced': n, 'empty': [...]}"""
+        empty = []
+
+        def run(ticker):
+            data = self.store.sync(ticker, interval)
+            if data is None or data.empty: empty.append(ticker)
+            if progress: progress(ticker)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, tickers))
+        return {'synced': len(tickers) - len(empty), 'empty': sorted(empty)}
+
+
+universe = Universe()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="更新台股上市櫃清單, 並可把清單內股票的日 K 補進本地倉庫")
+    parser.add_argument("--backfill", action="store_true", help="更新清單後同步所有股票的日 K")
+    parser.add_argument("--market", choices=list(SUFFIX.values()), default=None, help="只補齊上市 (.TW) 或上櫃 (.TWO)")
+    parser.add_argument("--only-missing", action="store_true", help="只補本地尚無 K 線的股票")
+    parser.add_argument("--workers", type=int, default=4)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="DIR", help="同時把 FinMind 回應錄製到 DIR")
+    group.add_argument("--replay", metavar="DIR", help="清單不連網, 改用 DIR 中錄製的回應")
+    args = parser.parse_args()
+
+    client = finmind_client
+    if args.record: client = FinMindClient(session=RecordingSession(args.record))
+    elif args.replay: client = FinMindClient(session=ReplaySession(args.replay), retries=0, quota=Quota(limit=math.inf))
+    u = Universe(client=client)
+    df = u.refresh()
+    print(f"universe: {len(df)} stocks ({', '.join(f'{m} {n}' for m, n in df['market'].value_counts().sort_index().items())})")
+    if not args.backfill: return
+
+    tickers = u.tickers(args.market)
+    if args.only_missing: tickers = u.missing(tickers)
+    done = [0]
+    lock = threading.Lock()
+
+    def progress(ticker):
+        with lock:
+            done[0] += 1
+            if done[0] % 100 == 0 or done[0] == len(tickers): print(f"  {done[0]}/{len(tickers)}")
+
+    res = u.backfill(tickers, workers=args.workers, progress=progress)
+    print(f"synced {res['synced']}, no data {len(res['empty'])}")
+    if res['empty']: print(f"  {' '.join(res['empty'][:50])}{' ...' if len(res['empty']) > 50 else ''}")
+
+
+if __name__ == "__main__":
+    main()